@@ -0,0 +1,84 @@
+"""
+Measures the import time of pyplanqk in fresh interpreters and checks it against a budget.
+
+The import time is the cumulative time python -X importtime reports for the module, so the start of the interpreter
+is not included. The heavy dependencies must not be imported with pyplanqk.
+
+Usage:
+    python benchmarks/bench_import.py --repeat 20 --budget 0.05
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List
+
+from common import get_metadata, summarize, write_json
+
+MODULES = ["pyplanqk", "pyplanqk.high_level_actions"]
+LAZY_MODULES = ["requests", "urllib3", "openapi_client", "dotenv", "dateutil"]
+
+# the results are written next to the benchmark, not into the working directory
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_import_output.json")
+
+CHECK = "import sys; import {module}; print(','.join(m for m in {lazy} if m in sys.modules))"
+
+
+def import_time(module: str) -> float:
+    """
+    The import_time function imports the module in a fresh interpreter and returns its cumulative import time.
+
+    Args:
+        module: str: Name of the module
+
+    Returns:
+        The import time in seconds
+    """
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stderr
+    for line in output.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match is not None and match.group(2) == module:
+            return int(match.group(1)) / 1e6
+    raise Exception(f"No import time of: {module}.")
+
+
+def eager_imports(module: str) -> List[str]:
+    command = [sys.executable, "-c", CHECK.format(module=module, lazy=LAZY_MODULES)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout.strip()
+    return [name for name in output.split(",") if name != ""]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="fresh interpreters per module")
+    parser.add_argument("--budget", type=float, default=0.05, help="allowed median import time in seconds")
+    parser.add_argument("--output", default=OUTPUT, help="file the results are written to")
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    for module in MODULES:
+        # the first import writes the bytecode cache
+        import_time(module)
+        result = summarize([import_time(module) for _ in range(args.repeat)])
+        result["eager_imports"] = eager_imports(module)
+        results[module] = result
+
+        print(f"{module:30} p50 {result['p50_s'] * 1000:8.2f} ms  max {result['max_s'] * 1000:8.2f} ms")
+        if result["p50_s"] > args.budget:
+            failures.append(f"{module}: p50 {result['p50_s']:.4f} s > budget {args.budget} s")
+        if len(result["eager_imports"]) > 0:
+            failures.append(f"{module}: imports {', '.join(result['eager_imports'])}")
+
+    write_json(args.output, {"metadata": get_metadata(), "budget_s": args.budget, "results": results})
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if len(failures) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Measures the client side overhead, memory and platform requests of the pyplanqk operations.
+
+The operations run against the local platform in its own process with zero latency and zero job duration, so the
+measured time is the time spent in pyplanqk, the generated client and the http stack.
+
+Usage:
+    python benchmarks/bench_operations.py --sizes 1KB,1MB
+    python benchmarks/bench_operations.py --save-baseline benchmarks/baselines/operations.json
+    python benchmarks/bench_operations.py --baseline benchmarks/baselines/operations.json
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from common import API_KEY, PlatformProcess, get_metadata, make_config, make_payload, parse_sizes, summarize, write_json
+
+from pyplanqk.high_level_actions import PyPlanQK
+from pyplanqk.low_level_actions import (
+    create_data_pool,
+    get_service,
+    get_service_job_result,
+    get_service_jobs,
+    get_version,
+    remove_data_pool,
+    remove_service_jobs,
+    trigger_service_job,
+)
+from pyplanqk.settings import use_platform_url
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "benchmark_service"
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_output.json")
+
+
+def get_repeat(size: int, repeat: int) -> int:
+    if size >= 100_000_000:
+        return 1
+    if size >= 10_000_000:
+        return min(repeat, 3)
+    return repeat
+
+
+def measure(platform: PlatformProcess, func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    The measure function runs func repeatedly and returns latency, cpu time, peak memory and requests per call.
+
+    Args:
+        platform: PlatformProcess: Platform which counts the requests
+        func: Callable[[], Any]: Operation to measure
+        repeat: int: Number of timed runs
+
+    Returns:
+        A dictionary with the measurements
+    """
+    func()
+    platform.reset_counts()
+
+    durations = []
+    cpu_times = []
+    for _ in range(repeat):
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+        cpu_times.append(time.process_time() - start_cpu)
+    request_counts = platform.request_counts()
+
+    tracemalloc.start()
+    func()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize(durations)
+    result["repeat"] = repeat
+    result["cpu_s"] = sum(cpu_times) / len(cpu_times)
+    result["peak_memory_bytes"] = peak_memory
+    result["requests"] = {route: count / repeat for route, count in sorted(request_counts.items())}
+    result["request_count"] = sum(request_counts.values()) / repeat
+    return result
+
+
+def remove_jobs(api_key: Dict[str, str]):
+    jobs = get_service_jobs(SERVICE_NAME, api_key)
+    remove_service_jobs([job["id"] for job in jobs], api_key)
+
+
+def run(sizes: List, repeat: int, services: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    api_key = {"apiKey": API_KEY}
+
+    with PlatformProcess("--echo-data") as platform, use_platform_url(platform.url):
+        plnqk = PyPlanQK(API_KEY)
+        for i in range(services - 1):
+            with make_config(f"{SERVICE_NAME}_{i}") as config:
+                plnqk.create_service(config)
+        with make_config(SERVICE_NAME) as config:
+            plnqk.create_service(config)
+
+        logger.info("Benchmark name resolution.")
+        results["get_service"] = measure(platform, lambda: get_service(SERVICE_NAME, api_key), repeat)
+        results["get_version"] = measure(platform, lambda: get_version(SERVICE_NAME, api_key), repeat)
+
+        for size_name, size in sizes:
+            logger.info("Benchmark payload size: %s.", size_name)
+            size_repeat = get_repeat(size, repeat)
+            data = make_payload(size)
+            params = {"mode": "train"}
+
+            def trigger(data=data):
+                return trigger_service_job(SERVICE_NAME, api_key, data=data, params=params, step=0.01)
+
+            results[f"trigger_service_job[{size_name}]"] = measure(platform, trigger, size_repeat)
+            job_id = trigger()["id"]
+            results[f"get_service_job_result[{size_name}]"] = measure(
+                platform, lambda job_id=job_id: get_service_job_result(job_id, api_key), size_repeat
+            )
+            remove_jobs(api_key)
+
+            def execute(data=data):
+                return plnqk.execute_service(SERVICE_NAME, data=data, params=params)
+
+            results[f"execute_service[{size_name}]"] = measure(platform, execute, size_repeat)
+            remove_jobs(api_key)
+
+            content = json.dumps(data).encode("utf-8")
+            del data
+
+            def upload(content=content):
+                file = io.BytesIO(content)
+                file.name = "data.json"
+                create_data_pool("benchmark_data_pool", API_KEY)
+                plnqk.create_data_pool("benchmark_data_pool_with_data", file)
+                remove_data_pool("benchmark_data_pool", API_KEY)
+                remove_data_pool("benchmark_data_pool_with_data", API_KEY)
+
+            results[f"create_data_pool[{size_name}]"] = measure(platform, upload, size_repeat)
+
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    The compare function lists the regressions of the results against a baseline.
+
+    Latency and memory regress if they grow by more than the tolerance, request counts regress if they grow at all.
+
+    Args:
+        results: Dict[str, Any]: Measurements of the current run
+        baseline: Dict[str, Any]: Measurements of the baseline run
+        tolerance: float: Allowed relative growth of latency and memory
+
+    Returns:
+        A list of messages, empty if there are no regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        for key in ["p50_s", "cpu_s", "peak_memory_bytes"]:
+            if result[key] > expected[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result[key]:.6g} > {expected[key]:.6g}")
+        if result["request_count"] > expected["request_count"]:
+            regressions.append(f"{name}: request_count {result['request_count']} > {expected['request_count']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="all", help="comma separated payload sizes, e.g. 1KB,1MB, or all")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per operation for small payloads")
+    parser.add_argument("--services", type=int, default=10, help="services on the platform for name resolution")
+    parser.add_argument("--output", default=OUTPUT, help="file the results are written to")
+    parser.add_argument("--baseline", default=None, help="baseline to compare the results with")
+    parser.add_argument("--save-baseline", default=None, help="file the results are saved to as new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative growth of latency and memory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = run(parse_sizes(args.sizes), args.repeat, args.services)
+    content = {"metadata": get_metadata(), "results": results}
+    write_json(args.output, content)
+    if args.save_baseline is not None:
+        write_json(args.save_baseline, content)
+
+    for name, result in results.items():
+        print(f"{name:45} p50 {result['p50_s'] * 1000:10.2f} ms  requests {result['request_count']:5.1f}")
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from pyplanqk.analytics import percentile
+
+API_KEY = "benchmark_api_key"
+
+SIZES = {
+    "1KB": 1_000,
+    "10KB": 10_000,
+    "100KB": 100_000,
+    "1MB": 1_000_000,
+    "10MB": 10_000_000,
+    "100MB": 100_000_000,
+    "500MB": 500_000_000,
+}
+
+TEST_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "data")
+
+
+def parse_sizes(text: str) -> List[Tuple[str, int]]:
+    """
+    The parse_sizes function turns a comma separated list of size names into names and bytes.
+
+    Args:
+        text: str: Sizes like "1KB,1MB" or "all"
+
+    Returns:
+        A list of name and size in bytes
+    """
+    if text == "all":
+        return list(SIZES.items())
+    return [(name, SIZES[name]) for name in text.split(",")]
+
+
+def make_payload(size: int) -> Dict[str, Any]:
+    """
+    The make_payload function creates a JSON serializable payload of about size bytes.
+
+    Args:
+        size: int: Size of the serialized payload in bytes
+
+    Returns:
+        A dictionary with a list of floats
+    """
+    value = 0.123456789
+    # every value is serialized as "0.123456789, "
+    count = max(1, (size - 12) // (len(json.dumps(value)) + 2))
+    return {"values": [value] * count}
+
+
+@contextmanager
+def make_config(name: str) -> Iterator[Dict[str, Any]]:
+    """
+    The make_config function creates the configuration of a service with the template of the tests.
+    The files of the configuration are closed when the with block ends.
+
+    Args:
+        name: str: Name of the service
+
+    Returns:
+        The service configuration
+    """
+    with open(os.path.join(TEST_DATA_PATH, "template.zip"), "rb") as user_code:
+        with open(os.path.join(TEST_DATA_PATH, "openapi-spec.yml"), "rb") as api_definition:
+            config = {}
+            config["name"] = name
+            config["user_code"] = user_code
+            config["api_definition"] = api_definition
+            config["description"] = "Service for benchmarking."
+            config["milli_cpus"] = 1000
+            config["memory_in_megabytes"] = 4096
+            config["runtime"] = "PYTHON_TEMPLATE"
+            config["gpu_count"] = 0
+            config["gpu_accelerator"] = "NONE"
+            yield config
+
+
+def summarize(durations: List[float]) -> Dict[str, Optional[float]]:
+    summary = {}
+    summary["mean_s"] = sum(durations) / len(durations)
+    summary["p50_s"] = percentile(durations, 50)
+    summary["p95_s"] = percentile(durations, 95)
+    summary["p99_s"] = percentile(durations, 99)
+    summary["max_s"] = max(durations)
+    return summary
+
+
+def get_metadata() -> Dict[str, Any]:
+    from pyplanqk.version import version  # pylint: disable=import-outside-toplevel
+
+    metadata = {}
+    metadata["pyplanqk"] = version
+    metadata["python"] = sys.version.split()[0]
+    metadata["platform"] = platform.platform()
+    metadata["cpus"] = os.cpu_count()
+    metadata["date"] = datetime.now(timezone.utc).isoformat()
+    return metadata
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class PlatformProcess:
+    """
+    Runs the local platform in its own process, so its work is not measured as client overhead.
+
+    Args:
+        options (list): command line options of python -m pyplanqk.local_platform
+    """
+
+    def __init__(self, *options: str):
+        self.options = list(options)
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "PlatformProcess":
+        command = [sys.executable, "-m", "pyplanqk.local_platform", "--port", str(self.port), *self.options]
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(100):
+            try:
+                requests.get(f"{self.url}/local/request-counts", timeout=1)
+                return self
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        self.process.kill()
+        raise RuntimeError("Local platform did not start.")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.url}/token"
+
+    def request_counts(self) -> Dict[str, int]:
+        return requests.get(f"{self.url}/local/request-counts", timeout=30).json()
+
+    def reset_counts(self):
+        requests.delete(f"{self.url}/local/request-counts", timeout=30)
+
+
+def write_json(path: str, content: Dict[str, Any]):
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=2)
@@ -0,0 +1,196 @@
+"""
+Drives concurrent service executions and reports throughput and end-to-end latency per concurrency level.
+
+By default the target is the local platform in its own process. With --url, --api-key and --service-name an existing
+service on another platform is used instead. The platform requests per job and the client cpu time per job show
+whether polling or JSON work in the client limits the throughput.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1,2,4,8,16,32 --workers threads
+    python benchmarks/load_test.py --workers processes --operation trigger_service_job --job-duration 0.5
+    python benchmarks/load_test.py --url https://platform.planqk.de/qc-catalog --api-key ... --service-name ...
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import API_KEY, SIZES, PlatformProcess, get_metadata, make_config, make_payload, summarize, write_json
+
+from pyplanqk.high_level_actions import PyPlanQK
+from pyplanqk.low_level_actions import trigger_service_job
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "load_test_service"
+
+WORKERS = ["threads", "processes"]
+OPERATIONS = ["execute_service", "trigger_service_job"]
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_test_output.json")
+
+
+def run_requests(
+    operation: str, service_name: str, api_key: str, payload_size: int, count: int, step: float
+) -> List[Tuple[float, bool]]:
+    """
+    The run_requests function runs count operations one after another and returns their latencies.
+
+    Args:
+        operation: str: execute_service or trigger_service_job
+        service_name: str: Name of the service
+        api_key: str: API key of the platform
+        payload_size: int: Size of the job data in bytes
+        count: int: Number of operations
+        step: float: Polling interval of trigger_service_job
+
+    Returns:
+        A list of latency in seconds and success of each operation
+    """
+    plnqk = PyPlanQK(api_key)
+    data = make_payload(payload_size)
+    params = {"mode": "load_test"}
+
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            if operation == "execute_service":
+                plnqk.execute_service(service_name, data=data, params=params)
+            else:
+                job = trigger_service_job(service_name, plnqk.api_key, data=data, params=params, step=step)
+                assert job["status"] == "SUCCEEDED"
+            succeeded = True
+        except Exception as e:
+            logger.error(e)
+            succeeded = False
+        latencies.append((time.perf_counter() - start, succeeded))
+    return latencies
+
+
+def run_level(workers: str, concurrency: int, args: Tuple) -> Tuple[List[Tuple[float, bool]], float]:
+    """
+    The run_level function runs the operations with the given number of concurrent workers.
+
+    Args:
+        workers: str: threads or processes
+        concurrency: int: Number of concurrent workers
+        args: Tuple: Arguments of run_requests for each worker
+
+    Returns:
+        The latencies of all operations and the wall time of the level in seconds
+    """
+    start = time.perf_counter()
+    executor_class = ThreadPoolExecutor if workers == "threads" else ProcessPoolExecutor
+    with executor_class(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_requests, *args) for _ in range(concurrency)]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    return [latency for result in results for latency in result], elapsed
+
+
+def run(
+    concurrency_levels: List[int],
+    workers: str,
+    operation: str,
+    requests_per_worker: int,
+    payload_size: int,
+    step: float,
+    platform: Optional[PlatformProcess],
+    service_name: str,
+    api_key: str,
+) -> List[Dict[str, Any]]:
+    levels = []
+    for concurrency in concurrency_levels:
+        logger.info("Run %s %s workers.", concurrency, workers)
+        if platform is not None:
+            platform.reset_counts()
+        args = (operation, service_name, api_key, payload_size, requests_per_worker, step)
+
+        start_cpu = time.process_time()
+        latencies, elapsed = run_level(workers, concurrency, args)
+        cpu_time = time.process_time() - start_cpu
+
+        succeeded = [latency for latency, ok in latencies if ok]
+        level: Dict[str, Any] = {"concurrency": concurrency}
+        level["requests"] = len(latencies)
+        level["errors"] = len(latencies) - len(succeeded)
+        level["elapsed_s"] = elapsed
+        level["throughput_per_s"] = len(succeeded) / elapsed
+        if len(succeeded) > 0:
+            level.update(summarize(succeeded))
+        # cpu time of worker processes is not included
+        if workers != "processes":
+            level["client_cpu_per_job_s"] = cpu_time / len(latencies)
+        if platform is not None:
+            counts = platform.request_counts()
+            level["platform_requests_per_job"] = sum(counts.values()) / len(latencies)
+            level["status_polls_per_job"] = counts.get("get_job", 0) / len(latencies)
+        levels.append(level)
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma separated concurrency levels")
+    parser.add_argument("--workers", choices=WORKERS, default="threads")
+    parser.add_argument("--operation", choices=OPERATIONS, default="execute_service")
+    parser.add_argument("--requests", type=int, default=20, help="operations per worker and level")
+    parser.add_argument("--size", choices=list(SIZES), default="1KB", help="payload size")
+    parser.add_argument("--step", type=float, default=0.05, help="polling interval of trigger_service_job")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of the local platform")
+    parser.add_argument("--job-duration", type=float, default=0.0, help="job duration of the local platform")
+    parser.add_argument("--url", default=None, help="platform url, the local platform is used if not set")
+    parser.add_argument("--api-key", default=API_KEY)
+    parser.add_argument("--service-name", default=SERVICE_NAME, help="existing service if --url is set")
+    parser.add_argument("--output", default=OUTPUT, help="file the results are written to")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    with ExitStack() as stack:
+        platform = None
+        if args.url is None:
+            options = ["--echo-data", "--latency", str(args.latency), "--job-duration", str(args.job_duration)]
+            platform = stack.enter_context(PlatformProcess(*options))
+            url = platform.url
+        else:
+            url = args.url
+        # the environment variable also reaches the worker processes
+        os.environ["PLANQK_PLATFORM_URL"] = url
+
+        if platform is not None:
+            with make_config(args.service_name) as config:
+                PyPlanQK(args.api_key).create_service(config)
+
+        levels = run(
+            concurrency_levels,
+            args.workers,
+            args.operation,
+            args.requests,
+            SIZES[args.size],
+            args.step,
+            platform,
+            args.service_name,
+            args.api_key,
+        )
+
+    metadata = get_metadata()
+    metadata.update({"workers": args.workers, "operation": args.operation, "size": args.size, "url": url})
+    write_json(args.output, {"metadata": metadata, "levels": levels})
+
+    print(f"{'concurrency':>11} {'jobs/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for level in levels:
+        percentiles = [level.get(key, float("nan")) * 1000 for key in ["p50_s", "p95_s", "p99_s"]]
+        print(
+            f"{level['concurrency']:>11} {level['throughput_per_s']:>9.1f} "
+            f"{percentiles[0]:>9.1f} {percentiles[1]:>9.1f} {percentiles[2]:>9.1f} {level['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
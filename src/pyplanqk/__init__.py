@@ -1 +1,12 @@
-from pyplanqk.high_level_actions import PyPlanQK
+from typing import Any
+
+__all__ = ["PyPlanQK"]
+
+
+def __getattr__(name: str) -> Any:
+    # the client is imported on first use, so importing a single submodule stays cheap
+    if name == "PyPlanQK":
+        from pyplanqk.high_level_actions import PyPlanQK  # pylint: disable=import-outside-toplevel
+
+        return PyPlanQK
+    raise AttributeError(f"module 'pyplanqk' has no attribute '{name}'")
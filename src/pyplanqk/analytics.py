@@ -0,0 +1,158 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_OBSERVED_JOBS = 10000
+
+_observed_completions: "OrderedDict[str, datetime]" = OrderedDict()
+_observed_lock = threading.Lock()
+
+
+def record_job_completion(job_id: str, observed_at: Optional[datetime] = None):
+    """
+    The record_job_completion function stores the time the client noticed that a job has finished.
+
+    Args:
+        job_id: str: Identify the job
+        observed_at: Optional[datetime]: Time of the poll which returned the final status, now if not given
+    """
+    if observed_at is None:
+        observed_at = datetime.now(timezone.utc)
+    with _observed_lock:
+        _observed_completions[job_id] = observed_at
+        _observed_completions.move_to_end(job_id)
+        while len(_observed_completions) > MAX_OBSERVED_JOBS:
+            _observed_completions.popitem(last=False)
+
+
+def get_observed_completion(job_id: str) -> Optional[datetime]:
+    """
+    The get_observed_completion function returns the time the client noticed that the job has finished.
+
+    Args:
+        job_id: str: Identify the job
+
+    Returns:
+        The time or None if the job was not awaited by this process
+    """
+    with _observed_lock:
+        return _observed_completions.get(job_id)
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        from dateutil.parser import isoparse  # pylint: disable=import-outside-toplevel
+
+        value = isoparse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _seconds_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds()
+
+
+def get_job_timing(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The get_job_timing function computes the queue wait, run time and polling overhead of a service job.
+
+    The queue wait is the time between creation and start of the job, the run time the time between start and end.
+    The polling overhead is the time between the end of the job on the platform and the poll of this client which
+    returned the final status.
+
+    Args:
+        job: Dict[str, Any]: Service job as returned by the platform
+
+    Returns:
+        A dictionary with the timestamps and the durations in seconds, unknown durations are None
+    """
+    created_at = _to_datetime(job.get("created_at"))
+    started_at = _to_datetime(job.get("started_at"))
+    ended_at = _to_datetime(job.get("ended_at"))
+    observed_at = get_observed_completion(job["id"])
+
+    timing = {}
+    timing["id"] = job["id"]
+    timing["status"] = job.get("status")
+    timing["created_at"] = created_at
+    timing["started_at"] = started_at
+    timing["ended_at"] = ended_at
+    timing["observed_at"] = observed_at
+    timing["queue_wait"] = _seconds_between(created_at, started_at)
+    timing["run_time"] = _seconds_between(started_at, ended_at)
+    timing["total_time"] = _seconds_between(created_at, ended_at)
+    timing["polling_overhead"] = _seconds_between(ended_at, observed_at)
+    return timing
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    The percentile function returns the q-th percentile of the values with linear interpolation.
+
+    Args:
+        values: List[float]: Values, do not need to be sorted
+        q: float: Percentile between 0 and 100
+
+    Returns:
+        The percentile or None if there are no values
+    """
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize_durations(values: List[Optional[float]]) -> Dict[str, Any]:
+    """
+    The summarize_durations function computes count, mean, median, p95 and maximum of durations.
+
+    Args:
+        values: List[Optional[float]]: Durations in seconds, None values are skipped
+
+    Returns:
+        A dictionary with the keys count, mean, p50, p95 and max
+    """
+    values = [value for value in values if value is not None]
+
+    summary = {}
+    summary["count"] = len(values)
+    summary["mean"] = sum(values) / len(values) if len(values) > 0 else None
+    summary["p50"] = percentile(values, 50)
+    summary["p95"] = percentile(values, 95)
+    summary["max"] = max(values) if len(values) > 0 else None
+    return summary
+
+
+def summarize_job_timings(timings: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The summarize_job_timings function aggregates the timings of several jobs.
+
+    Args:
+        timings: List[Dict[str, Any]]: Job timings as returned by get_job_timing
+
+    Returns:
+        A dictionary with the job count, the job count per status and summaries of the durations
+    """
+    statuses: Dict[str, int] = {}
+    for timing in timings:
+        statuses[timing["status"]] = statuses.get(timing["status"], 0) + 1
+
+    summary = {}
+    summary["job_count"] = len(timings)
+    summary["statuses"] = statuses
+    for key in ["queue_wait", "run_time", "total_time", "polling_overhead"]:
+        summary[key] = summarize_durations([timing[key] for timing in timings])
+    return summary
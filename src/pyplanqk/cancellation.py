@@ -0,0 +1,40 @@
+import logging
+import threading
+from typing import List, Set
+
+logger = logging.getLogger(__name__)
+
+
+class JobTracker:
+    """
+    Keeps the ids of the submitted service jobs which did not reach a final status yet.
+
+    The tracker is shared by all threads of a client, so the outstanding jobs can be cancelled in bulk on timeouts,
+    interrupts or shutdown.
+    """
+
+    def __init__(self):
+        self.job_ids: Set[str] = set()
+        self.lock = threading.Lock()
+
+    def add(self, job_id: str):
+        with self.lock:
+            self.job_ids.add(job_id)
+
+    def discard(self, job_id: str):
+        with self.lock:
+            self.job_ids.discard(job_id)
+
+    def outstanding(self) -> List[str]:
+        """
+        The outstanding function returns the ids of the jobs which are still running.
+
+        Returns:
+            A list of job ids
+        """
+        with self.lock:
+            return sorted(self.job_ids)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.job_ids)
@@ -0,0 +1,242 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from pyplanqk.metrics import increment, set_gauge
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+FAMILIES = ["services", "jobs", "applications", "data_pools", "gateway", "token"]
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while the circuit of its endpoint family is open.
+
+    Args:
+        family (str): endpoint family of the request
+        retry_in (float): seconds until the circuit lets a probe request through
+    """
+
+    def __init__(self, family: str, retry_in: float):
+        super().__init__(f"Circuit of {family} endpoints is open, retry in {retry_in:.1f} s.")
+        self.family = family
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an endpoint family of the platform while it fails.
+
+    After failure_threshold consecutive failures the circuit opens and requests fail fast with CircuitOpenError.
+    After reset_timeout seconds the circuit is half open and lets half_open_calls probe requests through. A
+    successful probe closes the circuit, a failed probe opens it again. Connection errors, timeouts and 5xx responses
+    are failures, all other responses are successes.
+
+    Args:
+        family (str): endpoint family, e.g. "jobs"
+        failure_threshold (int): consecutive failures which open the circuit
+        reset_timeout (float): seconds the circuit stays open before probing
+        half_open_calls (int): concurrent probe requests while half open
+        clock (callable): monotonic clock, replaceable in tests
+    """
+
+    def __init__(
+        self,
+        family: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.family = family
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        set_gauge("circuit_state", STATE_VALUES[CLOSED], family=family)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.info("Circuit of %s endpoints is %s.", self.family, state.replace("_", " "))
+        self.state = state
+        set_gauge("circuit_state", STATE_VALUES[state], family=self.family)
+
+    def before_request(self):
+        """
+        The before_request function checks if a request may be sent.
+
+        Raises:
+            CircuitOpenError: if the circuit is open or all probe requests are in flight
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            retry_in = self.opened_at + self.reset_timeout - self.clock()
+            if self.state == OPEN and retry_in <= 0:
+                self._set_state(HALF_OPEN)
+                self.probes = 0
+            if self.state == HALF_OPEN and self.probes < self.half_open_calls:
+                self.probes += 1
+                return
+        increment("circuit_rejected", family=self.family)
+        raise CircuitOpenError(self.family, max(0.0, retry_in))
+
+    def on_success(self):
+        with self.lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def release_probe(self):
+        # the request failed before it reached the platform, so it says nothing about the endpoints
+        with self.lock:
+            if self.state == HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def on_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+                self._set_state(OPEN)
+                increment("circuit_opened", family=self.family)
+
+    def call(self, send: Callable, method: str, url: str, **kwargs):
+        """
+        The call function sends a request through the circuit breaker.
+
+        Args:
+            send: Callable: Function which sends the request, e.g. Transport.send
+            method: str: Http method
+            url: str: Url of the request
+            **kwargs: Arguments of requests.request
+
+        Returns:
+            The response
+        """
+        self.before_request()
+        try:
+            response = send(method, url, **kwargs)
+        except Exception as e:
+            import requests  # pylint: disable=import-outside-toplevel
+
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                self.on_failure()
+            else:
+                self.release_probe()
+            raise e
+        if response.status_code >= 500:
+            self.on_failure()
+        else:
+            self.on_success()
+        return response
+
+
+def get_family(url: str) -> str:
+    """
+    The get_family function returns the endpoint family of a platform url.
+
+    Args:
+        url: str: Url of the request
+
+    Returns:
+        One of services, jobs, applications, data_pools, gateway, token or other
+    """
+    parts = urlsplit(url)
+    segments = [segment for segment in parts.path.split("/") if segment != ""]
+    if len(segments) > 0 and segments[-1] == "token":
+        return "token"
+    if (parts.hostname or "").startswith("gateway.") or "gateway" in segments:
+        return "gateway"
+    if "data-pools" in segments:
+        return "data_pools"
+    if "jobs" in segments:
+        return "jobs"
+    if "services" in segments:
+        return "services"
+    if "applications" in segments or "apps" in segments:
+        return "applications"
+    return "other"
+
+
+_options: Dict[str, float] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_enabled = True
+
+
+def get_circuit_breaker(family: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(family)
+        if breaker is None:
+            breaker = CircuitBreaker(family, **_options)
+            _breakers[family] = breaker
+        return breaker
+
+
+def configure_circuit_breakers(
+    failure_threshold: Optional[int] = None,
+    reset_timeout: Optional[float] = None,
+    half_open_calls: Optional[int] = None,
+    enabled: Optional[bool] = None,
+):
+    """
+    The configure_circuit_breakers function changes the circuit breakers of all endpoint families.
+
+    The circuits are shared by all clients of the process and start closed again after the change.
+
+    Args:
+        failure_threshold: Optional[int]: Consecutive failures which open a circuit
+        reset_timeout: Optional[float]: Seconds a circuit stays open before probing
+        half_open_calls: Optional[int]: Concurrent probe requests while half open
+        enabled: Optional[bool]: False to send all requests without circuit breakers
+    """
+    global _enabled  # pylint: disable=global-statement
+
+    options = {
+        "failure_threshold": failure_threshold,
+        "reset_timeout": reset_timeout,
+        "half_open_calls": half_open_calls,
+    }
+    with _breakers_lock:
+        _options.update({key: value for key, value in options.items() if value is not None})
+        if enabled is not None:
+            _enabled = enabled
+        _breakers.clear()
+
+
+def reset_circuit_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def send_with_circuit_breaker(send: Callable, method: str, url: str, **kwargs):
+    """
+    The send_with_circuit_breaker function sends a request through the circuit breaker of its endpoint family.
+
+    Args:
+        send: Callable: Function which sends the request, e.g. Transport.send
+        method: str: Http method
+        url: str: Url of the request
+        **kwargs: Arguments of requests.request
+
+    Returns:
+        The response
+    """
+    if not _enabled:
+        return send(method, url, **kwargs)
+    return get_circuit_breaker(get_family(url)).call(send, method, url, **kwargs)
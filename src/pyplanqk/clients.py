@@ -0,0 +1,58 @@
+# The generated openapi client is imported on first use, the api modules pull in all their models.
+# pylint: disable=import-outside-toplevel
+from typing import Any, Dict
+
+from pyplanqk.settings import get_platform_url
+from pyplanqk.transport import create_api_client
+
+
+def _create_api_client(api_key: Dict[str, str]) -> Any:
+    from openapi_client.configuration import Configuration
+
+    configuration = Configuration(host=get_platform_url(), api_key=api_key)
+    return create_api_client(configuration)
+
+
+def get_services_api(api_key: Dict[str, str]) -> Any:
+    """
+    The get_services_api function creates the client of the service platform services api.
+
+    Args:
+        api_key: Dict[str, str]: Api key of the platform
+
+    Returns:
+        The ServicePlatformServicesApi
+    """
+    from openapi_client.api.service_platform___services_api import ServicePlatformServicesApi
+
+    return ServicePlatformServicesApi(api_client=_create_api_client(api_key))
+
+
+def get_jobs_api(api_key: Dict[str, str]) -> Any:
+    """
+    The get_jobs_api function creates the client of the service platform jobs api.
+
+    Args:
+        api_key: Dict[str, str]: Api key of the platform
+
+    Returns:
+        The ServicePlatformJobsApi
+    """
+    from openapi_client.api.service_platform___jobs_api import ServicePlatformJobsApi
+
+    return ServicePlatformJobsApi(api_client=_create_api_client(api_key))
+
+
+def get_applications_api(api_key: Dict[str, str]) -> Any:
+    """
+    The get_applications_api function creates the client of the service platform applications api.
+
+    Args:
+        api_key: Dict[str, str]: Api key of the platform
+
+    Returns:
+        The ServicePlatformApplicationsApi
+    """
+    from openapi_client.api.service_platform___applications_api import ServicePlatformApplicationsApi
+
+    return ServicePlatformApplicationsApi(api_client=_create_api_client(api_key))
@@ -0,0 +1,124 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from pyplanqk.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+COALESCED_METHODS = ("GET", "HEAD")
+# headers which differ per call but do not change the response
+IGNORED_HEADERS = ("traceparent", "tracestate", "baggage")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Lets concurrent identical calls share one execution and its result.
+
+    The first caller of a key executes the call, callers with the same key arriving before it is finished wait for
+    its result instead of executing the call again. Results are not cached after the call is finished.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, _Call] = {}
+        self.lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        The do function executes func or waits for the execution of a concurrent caller with the same key.
+
+        Args:
+            key: Hashable: Identifies identical calls
+            func: Callable[[], Any]: Call to execute
+
+        Returns:
+            The result of the call
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            increment("coalesced_requests")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+_single_flight = SingleFlight()
+_enabled = True
+
+
+def set_request_coalescing(enabled: bool):
+    """
+    The set_request_coalescing function turns the coalescing of concurrent identical read requests on or off.
+
+    Args:
+        enabled: bool: True to let concurrent identical GET requests share one request to the platform
+    """
+    global _enabled  # pylint: disable=global-statement
+
+    _enabled = enabled
+
+
+def _request_key(method: str, url: str, kwargs: Dict[str, Any]) -> Optional[Tuple]:
+    if kwargs.get("data") is not None or kwargs.get("json") is not None or kwargs.get("files") is not None:
+        return None
+    headers = kwargs.get("headers") or {}
+    params = kwargs.get("params") or {}
+    try:
+        return (
+            method,
+            url,
+            tuple(sorted(params.items() if isinstance(params, dict) else params)),
+            tuple(sorted((key.lower(), value) for key, value in headers.items() if key.lower() not in IGNORED_HEADERS)),
+            kwargs.get("auth"),
+            kwargs.get("verify"),
+            kwargs.get("cert"),
+            tuple(sorted((kwargs.get("proxies") or {}).items())),
+        )
+    except TypeError:
+        # unhashable or unsortable arguments
+        return None
+
+
+def coalesce(send: Callable, method: str, url: str, **kwargs) -> Any:
+    """
+    The coalesce function sends a request, concurrent identical GET requests share one request to the platform.
+
+    Args:
+        send: Callable: Function which sends the request
+        method: str: Http method
+        url: str: Url of the request
+        **kwargs: Arguments of requests.request
+
+    Returns:
+        The response
+    """
+    method = method.upper()
+    key = _request_key(method, url, kwargs) if _enabled and method in COALESCED_METHODS else None
+    if key is None:
+        return send(method, url, **kwargs)
+    return _single_flight.do(key, lambda: send(method, url, **kwargs))
@@ -0,0 +1,291 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pyplanqk.circuit import CircuitOpenError
+from pyplanqk.metrics import increment, set_gauge
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_STATUSES = (429, 500, 502, 503, 504)
+# a request is only counted as overload if the platform said so, other server errors are failures of the request
+REQUEST_OVERLOAD_STATUSES = (429, 503)
+
+
+class AIMDController:
+    """
+    Adapts the number of concurrent jobs or requests to what the platform can handle.
+
+    Every success below the latency limit increases the concurrency limit additively by increase / limit, so the limit
+    grows by about increase per round of concurrent calls. A call which failed with 429, 5xx or a connection error cuts
+    the limit by the factor decrease, and so do slow_samples calls in a row which took longer than latency_tolerance
+    times the usual latency. A single slow call, e.g. a job with a longer run time, does not cut the limit. Calls
+    started before the last cut do not cut again, so a burst of failures from one round only cuts once.
+
+    Args:
+        name (str): name of the controller in the metrics
+        initial_limit (int): concurrency limit at the start
+        min_limit (int): lower bound of the limit
+        max_limit (int): upper bound of the limit
+        increase (float): additive increase of the limit per round of calls
+        decrease (float): factor applied to the limit on overload
+        latency_tolerance (float): calls slower than this multiple of the usual latency count as slow
+        slow_samples (int): slow calls in a row which count as overload
+        smoothing (float): weight of a new latency in the moving average of the usual latency
+        clock (callable): monotonic clock, replaceable in tests
+    """
+
+    def __init__(
+        self,
+        name: str = "requests",
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        slow_samples: int = 3,
+        smoothing: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.slow_samples = slow_samples
+        self.slow_calls = 0
+        self.smoothing = smoothing
+        self.clock = clock
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.usual_latency: Optional[float] = None
+        self.last_decrease = -math.inf
+        self.condition = threading.Condition()
+        set_gauge("concurrency_limit", self.limit, controller=self.name)
+
+    def get_limit(self) -> int:
+        with self.condition:
+            return int(self.limit)
+
+    def acquire(self) -> float:
+        """
+        The acquire function waits until fewer calls than the limit are in flight.
+
+        Returns:
+            The start time of the call, passed to release
+        """
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+            return self.clock()
+
+    def release(self, started: float, overloaded: bool = False):
+        """
+        The release function ends a call and adapts the limit to its outcome.
+
+        Args:
+            started: float: Start time returned by acquire
+            overloaded: bool: The call failed because the platform is overloaded, e.g. with 429 or 503
+        """
+        with self.condition:
+            self.in_flight -= 1
+            latency = self.clock() - started
+            slow = self.usual_latency is not None and latency > self.latency_tolerance * self.usual_latency
+            self.slow_calls = self.slow_calls + 1 if slow and not overloaded else 0
+            if overloaded:
+                self._decrease(started, "overload")
+            elif self.slow_calls >= self.slow_samples:
+                self.slow_calls = 0
+                self._decrease(started, "latency")
+            elif not slow:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            if not overloaded:
+                if self.usual_latency is None:
+                    self.usual_latency = latency
+                else:
+                    self.usual_latency += self.smoothing * (latency - self.usual_latency)
+            set_gauge("concurrency_limit", self.limit, controller=self.name)
+            self.condition.notify_all()
+
+    def cancel(self):
+        """
+        The cancel function ends a call without adapting the limit, for calls whose outcome says nothing about the load.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def _decrease(self, started: float, reason: str):
+        if started < self.last_decrease:
+            return
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        self.last_decrease = self.clock()
+        logger.info("Concurrency limit of %s cut to %d because of %s.", self.name, int(self.limit), reason)
+        increment("concurrency_decreases", controller=self.name, reason=reason)
+
+
+def is_overload(error: Exception) -> bool:
+    """
+    The is_overload function checks if a call failed because the platform could not handle the load.
+
+    Args:
+        error: Exception: Error of the call
+
+    Returns:
+        True for 429 and 5xx responses, open circuits, connection errors and timeouts
+    """
+    if isinstance(error, (CircuitOpenError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status in OVERLOAD_STATUSES:
+        return True
+    import requests  # pylint: disable=import-outside-toplevel
+
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def run_adaptive(func: Callable[[Any], Any], items: List[Any], controller: AIMDController) -> List[Dict[str, Any]]:
+    """
+    The run_adaptive function calls func for every item concurrently, as many at a time as the controller allows.
+
+    Args:
+        func: Callable[[Any], Any]: Function called with every item
+        items: List[Any]: Items
+        controller: AIMDController: Controller of the number of concurrent calls
+
+    Returns:
+        A list with a dictionary with the keys result and error for every item, in the order of the items
+    """
+    outcomes: List[Dict[str, Any]] = [{"result": None, "error": None} for _ in items]
+
+    def run(index: int, started: float):
+        overloaded = False
+        try:
+            outcomes[index]["result"] = func(items[index])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            overloaded = is_overload(e)
+            outcomes[index]["error"] = e
+        finally:
+            controller.release(started, overloaded)
+
+    # the workers use the options of the caller, e.g. its retry policy
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=controller.max_limit) as executor:
+        for index in range(len(items)):
+            started = controller.acquire()
+            executor.submit(context.copy().run, run, index, started)
+    return outcomes
+
+
+def run_graph(
+    tasks: Dict[str, Callable[[], Any]], dependencies: Dict[str, List[str]], max_workers: int = 8
+) -> Dict[str, Dict[str, Any]]:
+    """
+    The run_graph function runs tasks concurrently in the order of their dependencies.
+    A task starts as soon as all its dependencies succeeded. Tasks with a failed dependency are not run and fail too.
+
+    Args:
+        tasks: Dict[str, Callable[[], Any]]: Tasks by key
+        dependencies: Dict[str, List[str]]: Keys of the tasks which must succeed before the task with the key,
+            keys without a task are ignored
+        max_workers: int: Number of tasks run at the same time
+
+    Returns:
+        A dictionary with a dictionary with the keys result and error for every task
+    """
+    waiting = {key: [dep for dep in dependencies.get(key, []) if dep in tasks] for key in tasks}
+    outcomes: Dict[str, Dict[str, Any]] = {}
+
+    def run(key: str) -> Dict[str, Any]:
+        try:
+            return {"result": tasks[key](), "error": None}
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            return {"result": None, "error": e}
+
+    # the workers use the options of the caller, e.g. its retry policy
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        running: Dict[Any, str] = {}
+        while len(outcomes) < len(tasks):
+            ready = [key for key, deps in waiting.items() if all(dep in outcomes for dep in deps)]
+            for key in ready:
+                failed = [dep for dep in waiting.pop(key) if outcomes[dep]["error"] is not None]
+                if len(failed) > 0:
+                    outcomes[key] = {"result": None, "error": Exception(f"Dependency: {failed[0]} failed.")}
+                else:
+                    running[executor.submit(context.copy().run, run, key)] = key
+            if len(ready) > 0:
+                continue
+            if len(running) == 0:
+                raise Exception(f"Cyclic dependencies between: {sorted(waiting)}.")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcomes[running.pop(future)] = future.result()
+    return outcomes
+
+
+_current_controller: ContextVar[Optional[AIMDController]] = ContextVar("pyplanqk_concurrency", default=None)
+
+
+@contextmanager
+def use_concurrency_controller(controller: Optional[AIMDController]) -> Iterator[Optional[AIMDController]]:
+    """
+    The use_concurrency_controller function limits the concurrent requests of the calls inside the with block.
+
+    Args:
+        controller: Optional[AIMDController]: Concurrency controller, None to keep the current one
+
+    Returns:
+        The concurrency controller used in the with block
+    """
+    if controller is None:
+        yield _current_controller.get()
+        return
+    token = _current_controller.set(controller)
+    try:
+        yield controller
+    finally:
+        _current_controller.reset(token)
+
+
+def send_with_concurrency_limit(send: Callable, method: str, url: str, **kwargs) -> Any:
+    """
+    The send_with_concurrency_limit function sends the request once the concurrency controller of the client allows it.
+    Responses with 429 or 503, connection errors and timeouts cut the limit. Other errors, e.g. an invalid request or
+    an open circuit, say nothing about the load of the platform and count as neither success nor overload.
+
+    Args:
+        send: Callable: Function which sends the request
+        method: str: Http method
+        url: str: Url of the request
+        **kwargs: Arguments of requests.request
+
+    Returns:
+        The response
+    """
+    controller = _current_controller.get()
+    if controller is None:
+        return send(method, url, **kwargs)
+    started = controller.acquire()
+    try:
+        response = send(method, url, **kwargs)
+    except Exception as e:
+        import requests  # pylint: disable=import-outside-toplevel
+
+        if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+            controller.release(started, overloaded=True)
+        else:
+            controller.cancel()
+        raise e
+    controller.release(started, overloaded=response.status_code in REQUEST_OVERLOAD_STATUSES)
+    return response
@@ -0,0 +1,74 @@
+import hashlib
+import re
+from typing import Any, Dict, Optional
+
+CONTENT_HASH_PATTERN = re.compile(r"\s*\[pyplanqk:content-hash=([0-9a-f]{64})\]\s*$")
+CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_content(value: Any) -> str:
+    hasher = hashlib.sha256()
+    if value is None:
+        return hasher.hexdigest()
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray)):
+        hasher.update(value)
+        return hasher.hexdigest()
+
+    # read files in chunks and rewind them, so they can still be uploaded
+    position = value.tell()
+    for chunk in iter(lambda: value.read(CHUNK_SIZE), b""):
+        hasher.update(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+    value.seek(position)
+    return hasher.hexdigest()
+
+
+def get_content_hash(config: Dict[str, Any]) -> str:
+    """
+    The get_content_hash function computes the hash of the user code and the api definition of a service.
+
+    Args:
+        config: Dict[str, Any]: Configuration of the service with the user_code and api_definition files
+
+    Returns:
+        The sha256 hash as hex string
+    """
+    hasher = hashlib.sha256()
+    for key in ["user_code", "api_definition"]:
+        hasher.update(f"{key}={_hash_content(config.get(key))};".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def add_content_hash(description: Optional[str], content_hash: str) -> str:
+    """
+    The add_content_hash function appends the content hash to the description of a service, replacing an older one.
+
+    Args:
+        description: Optional[str]: Description of the service
+        content_hash: str: Content hash as returned by get_content_hash
+
+    Returns:
+        The description with the content hash
+    """
+    description = CONTENT_HASH_PATTERN.sub("", description or "")
+    marker = f"[pyplanqk:content-hash={content_hash}]"
+    if description == "":
+        return marker
+    return f"{description}\n\n{marker}"
+
+
+def read_content_hash(description: Optional[str]) -> Optional[str]:
+    """
+    The read_content_hash function returns the content hash stored in the description of a service.
+
+    Args:
+        description: Optional[str]: Description of the service
+
+    Returns:
+        The content hash or None if the service was not deployed with one
+    """
+    match = CONTENT_HASH_PATTERN.search(description or "")
+    if match is None:
+        return None
+    return match.group(1)
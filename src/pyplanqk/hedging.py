@@ -0,0 +1,259 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from pyplanqk.analytics import percentile
+from pyplanqk.circuit import get_family
+from pyplanqk.metrics import increment
+from pyplanqk.ratelimit import get_rate_class
+
+logger = logging.getLogger(__name__)
+
+HEDGED_METHODS = ("GET",)
+MAX_PRIMARY_THREADS = 64
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_primary_threads = threading.BoundedSemaphore(MAX_PRIMARY_THREADS)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor  # pylint: disable=global-statement
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="pyplanqk-hedging")
+        return _executor
+
+
+def get_latency_key(method: str, url: str) -> str:
+    """
+    The get_latency_key function returns the key the latencies of a request are kept under.
+    Status reads and listings of the same endpoint family take very different times, so they are kept apart.
+
+    Args:
+        method: str: Http method
+        url: str: Url of the request
+
+    Returns:
+        The endpoint family and rate class, e.g. jobs:status_reads
+    """
+    return f"{get_family(url)}:{get_rate_class(method, url)}"
+
+
+def _start_thread(func: Callable[[], Any]) -> Optional[Future]:
+    # the request runs at once in a thread of its own instead of waiting for a free worker of the pool,
+    # None if MAX_PRIMARY_THREADS requests already run in threads of their own
+    if not _primary_threads.acquire(blocking=False):
+        return None
+    future: Future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(func())
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            future.set_exception(e)
+        finally:
+            _primary_threads.release()
+
+    threading.Thread(target=copy_context().run, args=(run,), name="pyplanqk-hedging-primary", daemon=True).start()
+    return future
+
+
+class HedgingPolicy:
+    """
+    Sends a second read request if the first one takes longer than most requests of its kind.
+
+    The latencies of the GET requests are observed per endpoint family and rate class, so status reads and listings
+    have delays of their own. Once min_samples latencies are known, a
+    request which has not answered after the given percentile of them is sent again and the first response is used.
+    At most max_extra_ratio of the requests are hedged, so a slow platform does not get twice the load. A request
+    which may be hedged runs in a thread of its own, at most MAX_PRIMARY_THREADS at once across all policies, further
+    requests are sent in the thread of the caller without a hedge.
+
+    Args:
+        percentile (float): percentile of the observed latencies after which a request is hedged
+        min_delay (float): minimum seconds before a request is hedged
+        max_extra_ratio (float): maximum ratio of hedged requests to all requests
+        history (int): latencies kept per endpoint family and rate class
+        min_samples (int): latencies needed before requests are hedged
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,  # pylint: disable=redefined-outer-name
+        min_delay: float = 0.01,
+        max_extra_ratio: float = 0.1,
+        history: int = 200,
+        min_samples: int = 20,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_extra_ratio = max_extra_ratio
+        self.history = history
+        self.min_samples = min_samples
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.history))
+        self.requests = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def observe(self, key: str, latency: float):
+        with self.lock:
+            self.latencies[key].append(latency)
+
+    def get_delay(self, key: str) -> Optional[float]:
+        """
+        The get_delay function returns the seconds after which a request is hedged.
+
+        Args:
+            key: str: Latency key of the request, see get_latency_key
+
+        Returns:
+            The delay or None if not enough latencies are known
+        """
+        with self.lock:
+            latencies = list(self.latencies[key])
+        if len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(latencies, self.percentile))
+
+    def can_hedge(self) -> bool:
+        with self.lock:
+            return self.hedges + 1 <= self.max_extra_ratio * self.requests
+
+    def acquire_hedge(self) -> bool:
+        with self.lock:
+            if self.hedges + 1 > self.max_extra_ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def send(self, send: Callable, method: str, url: str, **kwargs) -> Any:
+        """
+        The send function sends a request and hedges it if it is slow.
+
+        Args:
+            send: Callable: Function which sends the request
+            method: str: Http method
+            url: str: Url of the request
+            **kwargs: Arguments of requests.request
+
+        Returns:
+            The first response
+        """
+        if method.upper() not in HEDGED_METHODS:
+            return send(method, url, **kwargs)
+
+        family = get_family(url)
+        key = get_latency_key(method, url)
+        with self.lock:
+            self.requests += 1
+        delay = self.get_delay(key)
+
+        def timed_send() -> Any:
+            start = time.perf_counter()
+            response = send(method, url, **kwargs)
+            self.observe(key, time.perf_counter() - start)
+            return response
+
+        # without a possible hedge the request is sent in the thread of the caller
+        if delay is None or not self.can_hedge():
+            return timed_send()
+
+        # the caller waits for the first response, so the primary request gets a thread of its own. It never queues
+        # behind other requests, which would trigger hedges under load. Only the hedges use the shared pool. The
+        # threads are bounded, beyond MAX_PRIMARY_THREADS requests at once they are sent without a hedge.
+        primary = _start_thread(timed_send)
+        if primary is None:
+            return timed_send()
+        done, _ = wait([primary], timeout=delay)
+        if len(done) > 0 or not self.acquire_hedge():
+            return primary.result()
+
+        logger.debug("%s %s slower than %.3f s, send hedged request.", method, url, delay)
+        increment("hedged_requests", family=family)
+        hedge = _get_executor().submit(copy_context().run, timed_send)
+        return _first_result(primary, hedge, family)
+
+
+def _first_result(primary: Future, hedge: Future, family: str) -> Any:
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    while len(pending) > 0:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    increment("hedge_wins", family=family)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+_current_policy: ContextVar[Optional[HedgingPolicy]] = ContextVar("pyplanqk_hedging_policy", default=None)
+_default_policy: Optional[HedgingPolicy] = None
+
+
+def get_hedging_policy() -> Optional[HedgingPolicy]:
+    policy = _current_policy.get()
+    if policy is None:
+        return _default_policy
+    return policy
+
+
+def set_default_hedging_policy(policy: Optional[HedgingPolicy]):
+    """
+    The set_default_hedging_policy function enables hedging for all calls which do not set their own policy.
+
+    Args:
+        policy: Optional[HedgingPolicy]: Hedging policy, None to disable hedging
+    """
+    global _default_policy  # pylint: disable=global-statement
+
+    _default_policy = policy
+
+
+@contextmanager
+def use_hedging_policy(policy: Optional[HedgingPolicy]) -> Iterator[Optional[HedgingPolicy]]:
+    """
+    The use_hedging_policy function enables hedging for the calls inside the with block.
+
+    Args:
+        policy: Optional[HedgingPolicy]: Hedging policy, None to keep the current one
+
+    Returns:
+        The hedging policy used in the with block
+    """
+    if policy is None:
+        yield get_hedging_policy()
+        return
+    token = _current_policy.set(policy)
+    try:
+        yield policy
+    finally:
+        _current_policy.reset(token)
+
+
+def send_with_hedging(send: Callable, method: str, url: str, **kwargs) -> Any:
+    """
+    The send_with_hedging function sends a request with the current hedging policy, if there is one.
+
+    Args:
+        send: Callable: Function which sends the request
+        method: str: Http method
+        url: str: Url of the request
+        **kwargs: Arguments of requests.request
+
+    Returns:
+        The response
+    """
+    policy = get_hedging_policy()
+    if policy is None:
+        return send(method, url, **kwargs)
+    return policy.send(send, method, url, **kwargs)
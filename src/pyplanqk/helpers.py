@@ -1,26 +1,34 @@
 import logging
 import os
 import time
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, Optional, Tuple
 
-import requests
-
-from openapi_client.api_client import ApiClient
-from openapi_client.apis import ServicePlatformJobsApi, ServicePlatformServicesApi
-from openapi_client.configuration import Configuration
+from pyplanqk.analytics import record_job_completion
+from pyplanqk.clients import get_jobs_api, get_services_api
+from pyplanqk.polling import PollScheduler
+from pyplanqk.tracing import current_span, inject_trace_headers, span, traced
+from pyplanqk.transport import send
 
 logger = logging.getLogger(__name__)
 
+FINAL_BUILD_STATUSES = ["SUCCESS", "FAILED", "CANCELLED"]
+
 
+@traced("wait_for_service_to_be_created")
 def wait_for_service_to_be_created(
         service_id: str,
         version_id: str,
         api_key: Dict[str, str],
         timeout: int = 500,
         step: int = 1,
-) -> bool:
+        scheduler: Optional[PollScheduler] = None,
+        service_name: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     The wait_for_service_to_be_created function waits for a service to be created.
+    It returns as soon as the build status is final, also if it already is on the first poll.
 
     Args:
         service_id: str: Specify the service_id of a service
@@ -29,42 +37,132 @@ def wait_for_service_to_be_created(
         str]: Define the type of the parameter
         timeout: int: Set the maximum time to wait for the service to be created
         step: int: Specify the time interval between each check
+        scheduler: Optional[PollScheduler]: Adapt the time interval to the build durations seen before
+        service_name: Optional[str]: Name the build durations are kept under, the service_id if not given
         : Get the service id and version id
 
     Returns:
-        True if the service is created successfully
+        A dictionary with the final build status, the duration of the wait in seconds and the number of polls
 
-    Doc Author:
-        Trelent
+    Raises:
+        TimeoutError: The build did not finish within the timeout
+        Exception: The build failed or was cancelled
     """
     logger.debug("Wait for service to be created")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
-
-    timer = 0
-    build_status = services_api.get_build_status(service_id, version_id)
-    assert build_status is not None
-    while build_status["status"] != "SUCCESS" or build_status["status"] != "FAILED":
-        time.sleep(step)
-        timer += step
-        if timer > timeout:
-            return False
-        # Check build status again to see if job failed or succeeded
-        build_status = services_api.get_build_status(service_id=service_id, version_id=version_id)
-        assert build_status is not None
-        if build_status["status"] == "SUCCESS":
-            logger.debug("")
-            return True
-        if build_status["status"] in ["FAILED", "CANCELLED"]:
-            logger.debug("")
-            return False
-
-        logger.debug("%d|%s Creating service...", timer + 1, timeout)
-    return True
+    services_api = get_services_api(api_key)
+
+    if service_name is None:
+        service_name = service_id
+
+    start = time.monotonic()
+    polls = 0
+    while True:
+        polls += 1
+        current_span().set_attribute("poll_count", polls)
+        with span("poll", service_id=service_id) as poll:
+            build_status = services_api.get_build_status(service_id=service_id, version_id=version_id)
+            assert build_status is not None
+            status = build_status["status"]
+            poll.set_attribute("status", status)
+        elapsed = time.monotonic() - start
+        if status in FINAL_BUILD_STATUSES:
+            break
+        if elapsed >= timeout:
+            raise TimeoutError(f"Service: {service_name} not created after {timeout} s, last build status: {status}.")
+
+        sleep = step
+        if scheduler is not None:
+            sleep = scheduler.next_step("build", service_name, elapsed, step)
+        logger.debug("%d|%s Creating service...", elapsed, timeout)
+        with span("sleep"):
+            time.sleep(max(0.0, min(sleep, timeout - elapsed)))
+
+    result = {"status": status, "duration": elapsed, "polls": polls}
+    if status != "SUCCESS":
+        raise Exception(f"Build of service: {service_name} ended with: {status} after {polls} polls.")
+    if scheduler is not None:
+        scheduler.observe("build", service_name, elapsed)
+    return result
+
+
+@traced("wait_for_services_to_be_created")
+def wait_for_services_to_be_created(
+    builds: Dict[str, Tuple[str, str]],
+    api_key: Dict[str, str],
+    timeout: int = 500,
+    step: float = 5,
+    scheduler: Optional[PollScheduler] = None,
+    max_workers: int = 8,
+) -> Dict[str, str]:
+    """
+    The wait_for_services_to_be_created function waits for the builds of several services at once.
+    Every round polls the build status of all unfinished services concurrently, so the wait takes as long as the
+    slowest build instead of the sum of the builds.
 
+    Args:
+        builds: Dict[str, Tuple[str, str]]: Service id and version id of every service name
+        api_key: Dict[str, str]: Pass the api_key as a dictionary
+        timeout: int: Set the maximum time to wait for all services to be created
+        step: float: Specify the time interval between two rounds of polls
+        scheduler: Optional[PollScheduler]: Adapt the time interval to the build durations seen before
+        max_workers: int: Number of build statuses polled at the same time
 
+    Returns:
+        A dictionary with the final build status of every service name: SUCCESS, FAILED or CANCELLED, TIMEOUT if the
+        build did not finish in time and ERROR if its status could not be read
+    """
+    logger.debug("Wait for %d services to be created", len(builds))
+
+    services_api = get_services_api(api_key)
+
+    def poll(service_name: str) -> str:
+        service_id, version_id = builds[service_name]
+        try:
+            with span("poll", service_id=service_id) as poll_span:
+                build_status = services_api.get_build_status(service_id=service_id, version_id=version_id)
+                poll_span.set_attribute("status", build_status["status"])
+            return build_status["status"]
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("Build status of service: %s could not be read.", service_name)
+            logger.error(e)
+            return "ERROR"
+
+    start = time.monotonic()
+    statuses: Dict[str, str] = {}
+    pending = sorted(builds)
+    polls = 0
+    # the poll workers use the options of the caller, e.g. its retry policy
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(builds)))) as executor:
+        while len(pending) > 0:
+            polls += 1
+            current_span().set_attribute("poll_count", polls)
+            results = list(executor.map(lambda service_name: context.copy().run(poll, service_name), pending))
+            elapsed = time.monotonic() - start
+            for service_name, status in zip(pending, results):
+                if status in FINAL_BUILD_STATUSES + ["ERROR"]:
+                    statuses[service_name] = status
+                if status == "SUCCESS" and scheduler is not None:
+                    scheduler.observe("build", service_name, elapsed)
+            pending = [service_name for service_name in pending if service_name not in statuses]
+            if len(pending) == 0:
+                break
+            if elapsed >= timeout:
+                for service_name in pending:
+                    statuses[service_name] = "TIMEOUT"
+                break
+
+            sleep = step
+            if scheduler is not None:
+                sleep = min(scheduler.next_step("build", service_name, elapsed, step) for service_name in pending)
+            logger.debug("%d|%s Creating %d services...", elapsed, timeout, len(pending))
+            with span("sleep"):
+                time.sleep(max(0.0, min(sleep, timeout - elapsed)))
+    return statuses
+
+
+@traced("wait_for_application_job_to_be_finished")
 def wait_for_application_job_to_be_finished(url: str, access_token: str, timeout: int = 500, step: int = 1) -> bool:
     """
     The wait_for_application_job_to_be_finished function waits for the application job to be finished.
@@ -88,17 +186,27 @@ def wait_for_application_job_to_be_finished(url: str, access_token: str, timeout
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
     }
+    inject_trace_headers(headers)
 
     status_timer = 0
-    execution_status = requests.get(url=url, headers=headers, timeout=30).json()["status"]
+    polls = 1
+    current_span().set_attribute("poll_count", polls)
+    with span("poll") as poll:
+        execution_status = send("GET", url, headers=headers, timeout=30).json()["status"]
+        poll.set_attribute("status", execution_status)
     while execution_status not in ["SUCCEEDED", "FAILED"]:
-        time.sleep(step)
+        with span("sleep"):
+            time.sleep(step)
         status_timer += step
         if status_timer > timeout:
             logger.debug("")
             logger.debug("Execution timeout")
             return False
-        execution_status = requests.get(url=url, headers=headers, timeout=30).json()["status"]
+        polls += 1
+        current_span().set_attribute("poll_count", polls)
+        with span("poll") as poll:
+            execution_status = send("GET", url, headers=headers, timeout=30).json()["status"]
+            poll.set_attribute("status", execution_status)
         if execution_status == "SUCCEEDED":
             logger.debug("Execution succeeded")
             return True
@@ -110,10 +218,13 @@ def wait_for_application_job_to_be_finished(url: str, access_token: str, timeout
     return True
 
 
+@traced("wait_for_service_job_to_be_finished")
 def wait_for_service_job_to_be_finished(job_id: str,
                                         api_key: Dict[str, str],
                                         timeout: int = 500,
-                                        step: int = 1) -> bool:
+                                        step: int = 1,
+                                        scheduler: Optional[PollScheduler] = None,
+                                        service_name: Optional[str] = None) -> bool:
     """
     The wait_for_service_job_to_be_finished function is used to wait for a service job to be finished.
         It takes the following parameters:
@@ -129,6 +240,8 @@ def wait_for_service_job_to_be_finished(job_id: str,
         str]: Define the job_id as a string
         timeout: int: Set the time limit for waiting for a job to finish
         step: int: Define the time interval between each status check
+        scheduler: Optional[PollScheduler]: Adapt the time interval to the job durations seen before
+        service_name: Optional[str]: Name the job durations are kept under
 
     Returns:
         True if the service job is finished
@@ -138,27 +251,46 @@ def wait_for_service_job_to_be_finished(job_id: str,
     """
     logger.debug("Wait for service job to be finished")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
+    start = time.monotonic()
     status_timer = 0
-    status = service_jobs_api.get_job(job_id).status
+    polls = 1
+    current_span().set_attribute("poll_count", polls)
+    with span("poll", job_id=job_id) as poll:
+        status = service_jobs_api.get_job(job_id).status
+        poll.set_attribute("status", status)
+    if status in ["SUCCEEDED", "FAILED"]:
+        record_job_completion(job_id)
 
     while status not in ["SUCCEEDED", "FAILED"]:
-        time.sleep(step)
-        status_timer += step
-        if status_timer > timeout:
-            logger.debug("")
-            logger.debug("Execution timeout")
-            return False
-        status = service_jobs_api.get_job(job_id).status
+        sleep = step
+        if scheduler is not None:
+            sleep = scheduler.next_step("job", service_name, time.monotonic() - start, step)
+        # the last sleep ends at the timeout, so the wait does not overrun it by a whole step
+        sleep = max(0.0, min(sleep, timeout - status_timer))
+        with span("sleep"):
+            time.sleep(sleep)
+        status_timer += sleep
+        polls += 1
+        current_span().set_attribute("poll_count", polls)
+        with span("poll", job_id=job_id) as poll:
+            status = service_jobs_api.get_job(job_id).status
+            poll.set_attribute("status", status)
+        if status in ["SUCCEEDED", "FAILED"]:
+            record_job_completion(job_id)
         if status == "SUCCEEDED":
             logger.debug("Execution succeeded")
+            if scheduler is not None:
+                scheduler.observe("job", service_name, time.monotonic() - start)
             return True
         if status == "FAILED":
             logger.debug("Execution failed")
             return False
+        if status_timer >= timeout:
+            logger.debug("")
+            logger.debug("Execution timeout")
+            return False
 
         logger.debug("%d|%s Wait for job...", status_timer + 1, timeout)
     return True
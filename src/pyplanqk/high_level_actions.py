@@ -1,36 +1,188 @@
+import atexit
 import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
-from dotenv import load_dotenv
-
-from pyplanqk.helpers import get_path_delimiter, wait_for_service_to_be_created
+from pyplanqk.analytics import get_job_timing
+from pyplanqk.cancellation import JobTracker
+from pyplanqk.concurrency import AIMDController, run_adaptive, use_concurrency_controller
+from pyplanqk.hedging import HedgingPolicy, use_hedging_policy
+from pyplanqk.helpers import (
+    FINAL_BUILD_STATUSES,
+    get_path_delimiter,
+    wait_for_service_to_be_created,
+    wait_for_services_to_be_created,
+)
 from pyplanqk.low_level_actions import (
+    ServiceUpdateNotSupportedError,
     add_data_to_data_pool,
     create_data_pool,
     create_managed_service,
+    get_build_status,
     get_data_pool,
     get_data_pool_file_information,
     get_service,
     get_service_job_result,
-    get_version,
+    get_service_job_timings,
+    get_service_version,
+    get_services,
+    recreate_managed_service,
+    remove_service_jobs,
     trigger_service_job,
+    update_managed_service,
 )
+from pyplanqk.polling import PollScheduler
+from pyplanqk.ratelimit import RateLimiter, use_rate_limiter
+from pyplanqk.retry import RetryPolicy, use_retry_policy
+from pyplanqk.tracing import current_span, traced
+
+if TYPE_CHECKING:
+    from pyplanqk.warming import WarmKeeper
 
 logger = logging.getLogger(__name__)
 
-load_dotenv(".env")
-PLANKQ_TOKEN_URL = os.getenv("PLANKQ_TOKEN_URL")
+# seconds a ping job of keep_warm may take before it is cancelled
+WARM_PING_TIMEOUT = 60
+
+# The feature modules are imported on first use to keep the import of pyplanqk fast.
+# pylint: disable=import-outside-toplevel
+
+
+def _client_options(method: Callable) -> Callable:
+    # the options of the client apply to all platform calls of the method
+    @wraps(method)
+    def wrapper(self: "PyPlanQK", *args, **kwargs):
+        with use_retry_policy(self.retry_policy), use_hedging_policy(self.hedging_policy):
+            with use_rate_limiter(self.rate_limiter), use_concurrency_controller(self.concurrency_controller):
+                return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+# clients created with cancel_on_exit, one exit hook closes all of them
+_exit_clients: "weakref.WeakSet[PyPlanQK]" = weakref.WeakSet()
+_exit_lock = threading.Lock()
+_exit_hook_registered = False
+
+
+def _cancel_on_exit():
+    with _exit_lock:
+        clients = list(_exit_clients)
+        _exit_clients.clear()
+    for client in clients:
+        # the thread pools of concurrent.futures are shut down before the exit hooks run, so cancel one by one
+        client._close(max_workers=1)  # pylint: disable=protected-access
+
+
+def _register_cancel_on_exit(client: "PyPlanQK"):
+    global _exit_hook_registered  # pylint: disable=global-statement
+
+    with _exit_lock:
+        _exit_clients.add(client)
+        if not _exit_hook_registered:
+            atexit.register(_cancel_on_exit)
+            _exit_hook_registered = True
 
 
 class PyPlanQK:
-    def __init__(self, api_key):
+    def __init__(
+        self,
+        api_key,
+        poll_scheduler: Optional[PollScheduler] = None,
+        cancel_on_abort: bool = False,
+        cancel_on_exit: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_controller: Optional[AIMDController] = None,
+        local_services: Optional[Dict[str, Any]] = None,
+    ):
         self.api_key = {"apiKey": api_key}
-        self.token_url = PLANKQ_TOKEN_URL
+        self.token_url = os.getenv("PLANKQ_TOKEN_URL")
+        if poll_scheduler is None:
+            poll_scheduler = PollScheduler()
+        self.poll_scheduler = poll_scheduler
+        self.job_tracker = JobTracker()
+        self.cancel_on_abort = cancel_on_abort
+        self.retry_policy = retry_policy
+        self.hedging_policy = hedging_policy
+        self.rate_limiter = rate_limiter
+        self.concurrency_controller = concurrency_controller
+        self.local_services = dict(local_services or {})
+        self.local_runtimes: Dict[str, Any] = {}
+        self.local_runtimes_lock = threading.Lock()
+        self.warm_keeper: Optional["WarmKeeper"] = None
+        if cancel_on_exit:
+            _register_cancel_on_exit(self)
+
+    def __enter__(self) -> "PyPlanQK":
+        return self
 
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        The close function cancels all service jobs of this client which are still running and stops the local
+        runtimes and the warm keeping.
+
+        Args:
+            self: Bind the method to an object
+        """
+        with _exit_lock:
+            _exit_clients.discard(self)
+        self._close()
+
+    def _close(self, max_workers: int = 8):
+        if len(self.job_tracker) > 0:
+            self.cancel_outstanding_jobs(max_workers=max_workers)
+        if self.warm_keeper is not None:
+            self.warm_keeper.stop()
+        with self.local_runtimes_lock:
+            runtimes = list(self.local_runtimes.values())
+            self.local_runtimes.clear()
+        for runtime in runtimes:
+            runtime.close()
+
+    @_client_options
+    @traced("PyPlanQK.cancel_outstanding_jobs")
+    def cancel_outstanding_jobs(self, max_workers: int = 8) -> Dict[str, bool]:
+        """
+        The cancel_outstanding_jobs function cancels all service jobs of this client which are still running.
+        Jobs are outstanding if they were triggered by this client and their wait timed out, was interrupted or is
+        still running in another thread.
+
+        Args:
+            self: Bind the method to an object
+            max_workers: int: Number of jobs cancelled at the same time
+
+        Returns:
+            A dictionary with True for every cancelled job id and False for every job which could not be cancelled
+        """
+        job_ids = self.job_tracker.outstanding()
+        logger.info("Cancel %d outstanding service jobs.", len(job_ids))
+
+        cancelled = remove_service_jobs(job_ids, self.api_key, max_workers=max_workers)
+        for job_id, result in cancelled.items():
+            if result:
+                self.job_tracker.discard(job_id)
+        return cancelled
+
+    @_client_options
+    @traced("PyPlanQK.create_service")
     def create_service(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """
         The create_service function creates a service on PlanQK.
+        The hash of the user code and api definition is stored in the description of the service. If the service
+        already exists with the same hash it is returned as it is, if the code changed the service is updated in place.
+        On platforms without in-place updates the service is deleted and created again, it gets a new id and is not
+        published.
+        The user_code can also be the path of a source directory, which is packaged with package_user_code.
             Args:
                 config (dict): A dictionary containing the configuration for creating a service.
 
@@ -48,23 +200,29 @@ class PyPlanQK:
         service_name = None
         try:
             service_name = config["name"]
+            current_span().set_attribute("service_name", service_name)
             logger.info("Create service: %s.", service_name)
             service = get_service(service_name, self.api_key)
-
-            if service is not None:
-                logger.info("Service: %s already created.", service_name)
-
+            build_ids = self._deploy(config, service)
+            if build_ids is None:
+                logger.info("Service: %s already created and unchanged.", service_name)
                 return service
 
-            service = create_managed_service(config, self.api_key)
+            service_id, version_id = build_ids
+            build = wait_for_service_to_be_created(
+                service_id,
+                version_id,
+                self.api_key,
+                timeout=500,
+                step=5,
+                scheduler=self.poll_scheduler,
+                service_name=service_name,
+            )
 
-            version = get_version(service_name, self.api_key)
-            service_id = service["id"]
-            version_id = version["id"]
-            wait_for_service_to_be_created(service_id, version_id, self.api_key, timeout=500, step=5)
+            current_span().set_attribute("build_duration", build["duration"])
 
             service = get_service(service_name, self.api_key)
-            logger.info("Service: %s created.", service_name)
+            logger.info("Service: %s created in %.1f s with %d polls.", service_name, build["duration"], build["polls"])
             return service
         except Exception as e:
             if service_name is not None:
@@ -74,15 +232,121 @@ class PyPlanQK:
             logger.error(e)
             raise e
 
+    def _deploy(self, config: Dict[str, Any], service: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+        # returns the service and version id of the build to wait for, None if the service is built with the same code
+        from pyplanqk.deployment import add_content_hash, get_content_hash, read_content_hash
+
+        if isinstance(config.get("user_code"), (str, os.PathLike)):
+            from pyplanqk.packaging import package_user_code
+
+            with open(package_user_code(os.fspath(config["user_code"])), "rb") as user_code:
+                return self._deploy(dict(config, user_code=user_code), service)
+        content_hash = get_content_hash(config)
+        config = dict(config)
+        config["description"] = add_content_hash(config.get("description"), content_hash)
+        if service is None:
+            service = create_managed_service(config, self.api_key)
+            return service["id"], service["service_definitions"][0]["id"]
+
+        version = get_service_version(service["id"], service["service_definitions"][0]["id"], self.api_key)
+        if read_content_hash(version.get("description")) == content_hash:
+            build_status = get_build_status(service["id"], version["id"], self.api_key)
+            if build_status == "SUCCESS":
+                return None
+            if build_status not in FINAL_BUILD_STATUSES:
+                return service["id"], version["id"]
+        logger.info("Code of service: %s changed, update it.", config["name"])
+        try:
+            update_managed_service(service["id"], version["id"], config, self.api_key)
+        except ServiceUpdateNotSupportedError:
+            logger.info("Service: %s can not be updated in place, create it again.", config["name"])
+            service = recreate_managed_service(service["id"], config, self.api_key)
+            return service["id"], service["service_definitions"][0]["id"]
+        return service["id"], version["id"]
+
+    @_client_options
+    @traced("PyPlanQK.create_services")
+    def create_services(
+        self, configs: List[Dict[str, Any]], timeout: int = 500, max_workers: int = 8
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        The create_services function creates several services on PlanQK concurrently.
+        The user code of the services is uploaded in parallel and the builds are awaited together. Services which
+        already exist with the same code are not created again, services whose code changed are updated in place.
+
+        Args:
+            self: Bind the method to an object
+            configs: List[Dict[str, Any]]: Configurations of the services, as for create_service
+            timeout: int: Set the maximum time to wait for all builds
+            max_workers: int: Number of uploads and build status polls at the same time
+
+        Returns:
+            A dictionary with the outcome of every service name, a dictionary with the keys status, service and error.
+            The status is EXISTS, SUCCESS, FAILED, CANCELLED, TIMEOUT or ERROR
+        """
+        logger.info("Create %d services.", len(configs))
+
+        try:
+            existing = {service["name"]: service for service in get_services(self.api_key)}
+            outcomes: Dict[str, Dict[str, Any]] = {}
+            builds: Dict[str, Tuple[str, str]] = {}
+            if len(configs) > 0:
+                # the workers use the options of the client
+                context = copy_context()
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(configs))) as executor:
+                    futures = {
+                        config["name"]: executor.submit(
+                            context.copy().run, self._deploy, config, existing.get(config["name"])
+                        )
+                        for config in configs
+                    }
+                for service_name, future in futures.items():
+                    try:
+                        build_ids = future.result()
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        logger.error("Creation of service: %s failed.", service_name)
+                        logger.error(e)
+                        outcomes[service_name] = {"status": "ERROR", "service": None, "error": e}
+                        continue
+                    if build_ids is None:
+                        logger.info("Service: %s already created and unchanged.", service_name)
+                        outcomes[service_name] = {"status": "EXISTS", "service": None, "error": None}
+                    else:
+                        builds[service_name] = build_ids
+
+            statuses = wait_for_services_to_be_created(
+                builds, self.api_key, timeout=timeout, scheduler=self.poll_scheduler, max_workers=max_workers
+            )
+            for service_name, status in statuses.items():
+                outcomes[service_name] = {"status": status, "service": None, "error": None}
+                if status != "SUCCESS":
+                    logger.error("Build of service: %s ended with: %s.", service_name, status)
+
+            services = {service["name"]: service for service in get_services(self.api_key)}
+            for service_name, outcome in outcomes.items():
+                outcome["service"] = services.get(service_name)
+            logger.info("Services: %s created.", [name for name, status in statuses.items() if status == "SUCCESS"])
+            return {config["name"]: outcomes[config["name"]] for config in configs}
+        except Exception as e:
+            logger.error("Creation of services failed.")
+            logger.error(e)
+            raise e
+
+    @_client_options
+    @traced("PyPlanQK.execute_service")
     def execute_service(
         self,
         service_name: str,
         params: Dict[str, Any],
         data: Dict[str, Any] = None,
         data_ref: Dict[str, Any] = None,
+        timeout: int = 500,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         The execute_service function is used to execute a service.
+        Services in local_services of the client are run with their user code in local processes instead, without
+        data pool references and idempotency keys.
 
         Args:
             self: Bind the function to a class
@@ -93,6 +357,8 @@ class PyPlanQK:
             Any]: Specify the type of data that is returned by the function
             data_ref: Dict[str: Pass the data pool reference
             Any]: Define the type of the data that is passed to the function
+            timeout: int: Set the maximum time to wait for the job to finish
+            idempotency_key: Optional[str]: Key which identifies the job, a job is submitted only once per key
             : Pass the service name to the function
 
         Returns:
@@ -104,6 +370,16 @@ class PyPlanQK:
         logger.info("Execute service: %s.", service_name)
 
         try:
+            if service_name in self.local_services:
+                if data_ref is not None:
+                    raise Exception("Data pool references are not supported by local services.")
+                if idempotency_key is not None:
+                    raise Exception("Idempotency keys are not supported by local services.")
+                logger.debug("run service job locally with data upload: %s.", data)
+                result = self._get_local_runtime(service_name).run(data, params, timeout=timeout)
+                logger.info("Local service execution: %s finished.", service_name)
+                return result
+
             if data_ref is not None:
                 logger.debug("triggering service job with data pool: %s.", data_ref)
                 job = trigger_service_job(
@@ -112,6 +388,11 @@ class PyPlanQK:
                     mode="DATA_POOL",
                     data_ref=data_ref,
                     params=params,
+                    scheduler=self.poll_scheduler,
+                    timeout=timeout,
+                    tracker=self.job_tracker,
+                    cancel_on_abort=self.cancel_on_abort,
+                    idempotency_key=idempotency_key,
                 )
             else:
                 logger.debug("triggering service job with data upload: %s.", data)
@@ -121,9 +402,20 @@ class PyPlanQK:
                     mode="DATA_UPLOAD",
                     data=data,
                     params=params,
+                    scheduler=self.poll_scheduler,
+                    timeout=timeout,
+                    tracker=self.job_tracker,
+                    cancel_on_abort=self.cancel_on_abort,
+                    idempotency_key=idempotency_key,
                 )
 
+            if self.warm_keeper is not None:
+                self.warm_keeper.record_activity(service_name)
             job_id = job["id"]
+            current_span().set_attribute("job_id", job_id)
+            if job["status"] not in ["SUCCEEDED", "FAILED", "CANCELLED"]:
+                # the job keeps running on the platform, its result can be fetched later with the job id
+                raise TimeoutError(f"Service job: {job_id} not finished after {timeout} s.")
             result = get_service_job_result(job_id, self.api_key)
             logger.info("Service execution: %s finished.", service_name)
             return result
@@ -132,6 +424,124 @@ class PyPlanQK:
             logger.error(e)
             raise e
 
+    def _get_local_runtime(self, service_name: str) -> Any:
+        from pyplanqk.local_runtime import LocalRuntime  # pylint: disable=import-outside-toplevel
+
+        with self.local_runtimes_lock:
+            runtime = self.local_runtimes.get(service_name)
+            if runtime is None:
+                runtime = LocalRuntime(self.local_services[service_name])
+                self.local_runtimes[service_name] = runtime
+            return runtime
+
+    @_client_options
+    @traced("PyPlanQK.execute_service_batch")
+    def execute_service_batch(
+        self,
+        service_name: str,
+        jobs: List[Dict[str, Any]],
+        timeout: int = 500,
+        controller: Optional[AIMDController] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The execute_service_batch function executes a service for several inputs concurrently.
+        The number of jobs in flight is adapted to the platform with an AIMD controller: it grows while the jobs finish
+        in their usual time and is cut when jobs fail with 429, 5xx or time out, or take much longer than usual.
+
+        Args:
+            self: Bind the method to an object
+            service_name: str: Specify the name of the service to be executed
+            jobs: List[Dict[str, Any]]: Arguments of execute_service for every job: params and data or data_ref,
+                optionally idempotency_key
+            timeout: int: Set the maximum time to wait for each job to finish
+            controller: Optional[AIMDController]: Controller of the jobs in flight, must not be the concurrency
+                controller of the client
+
+        Returns:
+            A list with a dictionary with the keys result and error for every job, in the order of the jobs
+        """
+        logger.info("Execute %d jobs of service: %s.", len(jobs), service_name)
+        if controller is None:
+            controller = AIMDController(name="jobs")
+
+        outcomes = run_adaptive(lambda job: self.execute_service(service_name, timeout=timeout, **job), jobs, controller)
+        failed = [index for index, outcome in enumerate(outcomes) if outcome["error"] is not None]
+        if len(failed) > 0:
+            logger.error("Jobs: %s of service: %s failed.", failed, service_name)
+        current_span().set_attribute("failed_jobs", len(failed))
+        return outcomes
+
+    @_client_options
+    @traced("PyPlanQK.keep_warm")
+    def keep_warm(
+        self,
+        service_name: str,
+        params: Dict[str, Any],
+        data: Optional[Dict[str, Any]] = None,
+        interval: Optional[float] = None,
+        check_interval: float = 10,
+    ) -> "WarmKeeper":
+        """
+        The keep_warm function sends a lightweight job to the service whenever it was idle for too long, so the next
+        job does not pay the cold start. The interval is learned from the job timings of the service, see WarmKeeper.
+
+        Args:
+            self: Bind the method to an object
+            service_name: str: Specify the name of the service
+            params: Dict[str, Any]: Parameters of the ping jobs, e.g. a mode which returns at once
+            data: Optional[Dict[str, Any]]: Input data of the ping jobs
+            interval: Optional[float]: Fixed seconds of idle time before a ping, learned if not given
+            check_interval: float: Seconds between two checks of the idle times
+
+        Returns:
+            The warm keeper of the client, its report returns the pings and their cost
+        """
+        from pyplanqk.warming import WarmKeeper
+
+        logger.info("Keep service: %s warm.", service_name)
+
+        if self.warm_keeper is None:
+            self.warm_keeper = WarmKeeper(self._warm_ping, self._warm_timings)
+        self.warm_keeper.add(service_name, params, data=data, interval=interval)
+        self.warm_keeper.start(check_interval=check_interval)
+        return self.warm_keeper
+
+    def stop_keeping_warm(self, service_name: Optional[str] = None):
+        """
+        The stop_keeping_warm function stops pinging a service, or all services if no name is given.
+
+        Args:
+            self: Bind the method to an object
+            service_name: Optional[str]: Specify the name of the service
+        """
+        if self.warm_keeper is None:
+            return
+        if service_name is None:
+            self.warm_keeper.stop()
+        else:
+            self.warm_keeper.remove(service_name)
+
+    def _warm_ping(self, service_name: str, data: Optional[Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+        job = trigger_service_job(
+            service_name=service_name,
+            api_key=self.api_key,
+            mode="DATA_UPLOAD",
+            data=data,
+            params=params,
+            timeout=WARM_PING_TIMEOUT,
+            scheduler=self.poll_scheduler,
+            tracker=self.job_tracker,
+            cancel_on_abort=True,
+        )
+        if hasattr(job, "to_dict"):
+            job = job.to_dict()
+        return get_job_timing(job)
+
+    def _warm_timings(self, service_name: str) -> List[Dict[str, Any]]:
+        return get_service_job_timings(service_name, self.api_key)["jobs"]
+
+    @_client_options
+    @traced("PyPlanQK.create_data_pool")
     def create_data_pool(self, data_pool_name: Optional[str], file) -> Dict[str, Any]:
         """
         The create_data_pool function creates a data pool with the given name and adds the file to it.
@@ -172,3 +582,101 @@ class PyPlanQK:
             logger.error("file: %s could not be added to data pool.", file.name)
             logger.error(e)
             raise e
+
+    @_client_options
+    @traced("PyPlanQK.plan")
+    def plan(self, spec: Dict[str, Any], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        The plan function returns the changes which make the platform match a declarative spec of services,
+        applications with their subscriptions and data pools, see pyplanqk.reconcile.plan.
+
+        Args:
+            self: Bind the method to an object
+            spec: Dict[str, Any]: Desired state with the keys services, applications and data_pools
+            max_workers: int: Number of requests sent at the same time
+
+        Returns:
+            A list of changes, passed to apply
+        """
+        from pyplanqk.reconcile import plan
+
+        logger.info("Plan changes.")
+
+        return plan(spec, self.api_key, max_workers=max_workers)
+
+    @_client_options
+    @traced("PyPlanQK.apply")
+    def apply(
+        self, changes: List[Dict[str, Any]], timeout: int = 500, max_workers: int = 8
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        The apply function makes the changes returned by plan concurrently in the order of their dependencies.
+
+        Args:
+            self: Bind the method to an object
+            changes: List[Dict[str, Any]]: Changes returned by plan
+            timeout: int: Set the maximum time to wait for each build
+            max_workers: int: Number of changes made at the same time
+
+        Returns:
+            A dictionary with a dictionary with the keys result and error for the key of every change
+        """
+        from pyplanqk.reconcile import apply
+
+        logger.info("Apply %d changes.", len(changes))
+
+        return apply(changes, self.api_key, timeout=timeout, scheduler=self.poll_scheduler, max_workers=max_workers)
+
+    @_client_options
+    @traced("PyPlanQK.teardown")
+    def teardown(
+        self,
+        services: Optional[List[str]] = None,
+        applications: Optional[List[str]] = None,
+        data_pools: Optional[List[str]] = None,
+        max_workers: int = 16,
+    ) -> Dict[str, Dict[str, bool]]:
+        """
+        The teardown function removes services, applications with their subscriptions and data pools concurrently in
+        the order of their dependencies, see pyplanqk.teardown.teardown.
+
+        Args:
+            self: Bind the method to an object
+            services: Optional[List[str]]: Names of the services
+            applications: Optional[List[str]]: Names of the applications
+            data_pools: Optional[List[str]]: Names of the data pools
+            max_workers: int: Number of requests sent at the same time
+
+        Returns:
+            A dictionary with the keys services, applications, subscriptions and data_pools, each with True for every
+            removed resource and False for every resource which could not be removed
+        """
+        from pyplanqk.teardown import teardown
+
+        logger.info("Teardown of services: %s, applications: %s, data pools: %s.", services, applications, data_pools)
+
+        return teardown(
+            self.api_key, services=services, applications=applications, data_pools=data_pools, max_workers=max_workers
+        )
+
+    @_client_options
+    @traced("PyPlanQK.get_service_job_timings")
+    def get_service_job_timings(self, service_name: str) -> Dict[str, Any]:
+        """
+        The get_service_job_timings function returns the queue wait, run time and polling overhead of the service jobs.
+
+        Args:
+            self: Bind the method to an object
+            service_name: str: Specify the name of the service
+
+        Returns:
+            A dictionary with the timing of every job and the summaries of the durations
+        """
+        logger.info("Get job timings of service: %s.", service_name)
+
+        try:
+            return get_service_job_timings(service_name, self.api_key)
+        except Exception as e:
+            logger.error("Job timings of service: %s failed.", service_name)
+            logger.error(e)
+            raise e
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from pyplanqk.analytics import get_job_timing
+from pyplanqk.retry import was_not_sent
+
+logger = logging.getLogger(__name__)
+
+MAX_LEDGER_ENTRIES = 10000
+# tolerated difference between the clocks of the client and the platform
+MAX_CLOCK_SKEW = timedelta(seconds=30)
+# the platform may have created the job although the response got lost
+AMBIGUOUS_STATUSES = (500, 502, 504)
+
+
+class IdempotencyLedger:
+    """
+    Maps the idempotency keys of the submitted service jobs to their job ids.
+
+    The ledger is shared by all clients of the process, so a job submitted with a key is never submitted again with
+    the same key. A key is reserved while its job is submitted, concurrent submissions with the same key wait for
+    the first one. The oldest keys are dropped after max_entries submissions.
+
+    Args:
+        max_entries (int): number of keys which are kept
+    """
+
+    def __init__(self, max_entries: int = MAX_LEDGER_ENTRIES):
+        self.max_entries = max_entries
+        self.job_ids: "OrderedDict[str, str]" = OrderedDict()
+        # submissions in flight by key
+        self.pending: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            return self.job_ids.get(key)
+
+    def record(self, key: str, job_id: str):
+        with self.lock:
+            self._record(key, job_id)
+
+    def _record(self, key: str, job_id: str):
+        self.job_ids[key] = job_id
+        self.job_ids.move_to_end(key)
+        while len(self.job_ids) > self.max_entries:
+            self.job_ids.popitem(last=False)
+
+    def submit(self, key: str, submit: Callable[[], str]) -> Tuple[str, bool]:
+        """
+        The submit function submits the job of a key once.
+
+        The key is reserved before submit is called, so concurrent calls with the same key wait for the first call
+        and return its job id. If the first call fails, the waiting calls fail with the same error and the key can
+        be submitted again.
+
+        Args:
+            key: str: Idempotency key of the job
+            submit: Callable[[], str]: Submits the job and returns its id
+
+        Returns:
+            The job id and True if this call submitted the job, False if the job of the key was submitted before
+        """
+        with self.lock:
+            job_id = self.job_ids.get(key)
+            if job_id is not None:
+                return job_id, False
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result(), False
+
+        try:
+            job_id = submit()
+        except BaseException as e:
+            with self.lock:
+                del self.pending[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self._record(key, job_id)
+            del self.pending[key]
+        future.set_result(job_id)
+        return job_id, True
+
+    def claimed(self) -> Set[str]:
+        """
+        The claimed function returns the ids of the jobs which belong to a key.
+
+        Returns:
+            A set of job ids
+        """
+        with self.lock:
+            return set(self.job_ids.values())
+
+
+_ledger = IdempotencyLedger()
+
+
+def get_ledger() -> IdempotencyLedger:
+    return _ledger
+
+
+def new_idempotency_key() -> str:
+    return uuid.uuid4().hex
+
+
+def _canonical(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return json.dumps(json.loads(value), sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return value
+
+
+def _canonical_ref(data_ref: Any) -> Optional[Dict[str, Any]]:
+    if data_ref is None:
+        return None
+    if hasattr(data_ref, "to_dict"):
+        data_ref = data_ref.to_dict()
+    # the models of the openapi client use snake case, the requests camel case
+    return {key.replace("_", "").lower(): value for key, value in data_ref.items() if value is not None}
+
+
+def fingerprint(
+    parameters: Optional[str], input_data: Optional[str] = None, input_data_ref: Any = None
+) -> Optional[str]:
+    """
+    The fingerprint function hashes the input of a job independent of the JSON formatting.
+
+    Args:
+        parameters: Optional[str]: Parameters of the job as JSON string
+        input_data: Optional[str]: Input data of the job as JSON string
+        input_data_ref: Any: Reference to the input data in a data pool, a dictionary or a model
+
+    Returns:
+        The sha256 hash of the canonical JSON or None if the job has no input
+    """
+    if parameters is None and input_data is None and input_data_ref is None:
+        return None
+    canonical = json.dumps(
+        [_canonical(parameters), _canonical(input_data), _canonical_ref(input_data_ref)],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _get_field(job: Dict[str, Any], *names: str) -> Any:
+    for name in names:
+        try:
+            value = job[name]
+        except (KeyError, TypeError, AttributeError):
+            continue
+        if value is not None:
+            return value
+    return None
+
+
+def is_ambiguous(error: Exception) -> bool:
+    """
+    The is_ambiguous function checks if a failed job submission may have created the job on the platform.
+
+    Args:
+        error: Exception: Error of the submission
+
+    Returns:
+        True if the job may exist, False if the platform surely did not create it
+    """
+    import requests  # pylint: disable=import-outside-toplevel
+
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return not was_not_sent(error)
+    return getattr(error, "status", None) in AMBIGUOUS_STATUSES
+
+
+def find_submitted_job(
+    jobs: List[Dict[str, Any]],
+    parameters: str,
+    submitted_after: datetime,
+    ledger: Optional[IdempotencyLedger] = None,
+    input_data: Optional[str] = None,
+    input_data_ref: Any = None,
+    max_clock_skew: timedelta = MAX_CLOCK_SKEW,
+) -> Optional[Dict[str, Any]]:
+    """
+    The find_submitted_job function looks for the job created by a submission whose response got lost.
+
+    A job matches if it has the same parameters and input data, was created after the submission started and does
+    not belong to another idempotency key. The submission time is taken from the local clock, so jobs created up to
+    max_clock_skew before it are accepted. Jobs whose input is not listed by the platform never match.
+
+    Args:
+        jobs: List[Dict[str, Any]]: Jobs of the service
+        parameters: str: Parameters of the submission as JSON string
+        submitted_after: datetime: Time the first submission started, by the local clock
+        ledger: Optional[IdempotencyLedger]: Ledger with the jobs of other keys, the shared ledger if not given
+        input_data: Optional[str]: Input data of the submission as JSON string
+        input_data_ref: Any: Reference to the input data of the submission in a data pool
+        max_clock_skew: timedelta: Tolerated difference between the clocks of the client and the platform
+
+    Returns:
+        The earliest matching job or None
+    """
+    ledger = ledger or _ledger
+    claimed = ledger.claimed()
+    expected = fingerprint(parameters, input_data, input_data_ref)
+    earliest = submitted_after - max_clock_skew
+
+    candidates = []
+    for job in jobs:
+        if job["id"] in claimed:
+            continue
+        actual = fingerprint(
+            job.get("parameters"),
+            _get_field(job, "input_data", "inputData"),
+            _get_field(job, "input_data_ref", "inputDataRef"),
+        )
+        if actual != expected:
+            continue
+        created_at = get_job_timing(job)["created_at"]
+        if created_at is not None and created_at >= earliest:
+            candidates.append((created_at, job))
+    if len(candidates) == 0:
+        return None
+    return min(candidates, key=lambda candidate: candidate[0])[1]
@@ -0,0 +1,797 @@
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from pyplanqk.settings import use_platform_url
+
+logger = logging.getLogger(__name__)
+
+FINAL_JOB_STATUSES = ["SUCCEEDED", "FAILED", "CANCELLED"]
+
+
+class PlatformError(Exception):
+    """
+    An error response of the local platform.
+
+    Args:
+        status (int): http status code of the response
+        detail (str): message put into the response body
+        retry_after (float): value of the Retry-After header, not sent if None
+    """
+
+    def __init__(self, status: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _echo_params(data: Any, params: Any) -> Dict[str, Any]:
+    return {"params": params}
+
+
+def _echo_data(data: Any, params: Any) -> Any:
+    return data
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[str]:
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class LocalPlatform:
+    """
+    Stand-in for the PlanQK platform which runs in a background thread of the current process.
+
+    It serves the service, job, application, subscription, data pool, gateway and token endpoints used by pyplanqk.
+    Builds and jobs finish after the configured durations, jobs are executed by calling handler(data, params).
+    The requests per route are counted, GET /local/request-counts returns and DELETE resets the counts.
+    Used as context manager the platform url of pyplanqk points to the local platform inside the with block.
+
+    Args:
+        host (str): interface the server listens on
+        port (int): port the server listens on, a free port if 0
+        latency (float): seconds every request is delayed
+        build_duration (float): seconds until a created service is built
+        queue_duration (float): seconds a job is pending before it runs
+        job_duration (float): seconds a job runs
+        build_failure_rate (float): probability that a build fails
+        job_failure_rate (float): probability that a job fails
+        error_rate (float): probability that a request is answered with 503
+        handler (callable): computes the result of a job from data and params, echoes the params by default
+        seed (int): seed of the random failures
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        build_duration: float = 0.0,
+        queue_duration: float = 0.0,
+        job_duration: float = 0.0,
+        build_failure_rate: float = 0.0,
+        job_failure_rate: float = 0.0,
+        error_rate: float = 0.0,
+        handler: Callable[[Any, Any], Any] = _echo_params,
+        seed: Optional[int] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.build_duration = build_duration
+        self.queue_duration = queue_duration
+        self.job_duration = job_duration
+        self.build_failure_rate = build_failure_rate
+        self.job_failure_rate = job_failure_rate
+        self.error_rate = error_rate
+        self.handler = handler
+        self.random = random.Random(seed)
+
+        self.lock = threading.RLock()
+        self.services: Dict[str, Dict[str, Any]] = {}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.gateway_jobs: Dict[str, Dict[str, Any]] = {}
+        # jobs whose handler has not run yet
+        self.pending_jobs: Dict[str, Dict[str, Any]] = {}
+        self.applications: Dict[str, Dict[str, Any]] = {}
+        self.subscriptions: Dict[str, List[Dict[str, Any]]] = {}
+        self.data_pools: Dict[str, Dict[str, Any]] = {}
+        self.data_source_descriptors: Dict[str, List[Dict[str, Any]]] = {}
+        self.files: Dict[str, bytes] = {}
+        self.request_counts: Counter = Counter()
+        self.injected_failures: List[Dict[str, Any]] = []
+
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.platform_url_context = None
+
+    @property
+    def url(self) -> str:
+        assert self.server is not None, "Local platform not started."
+        return f"http://{self.host}:{self.server.server_address[1]}"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.url}/token"
+
+    def start(self) -> "LocalPlatform":
+        """
+        The start function starts the server in a daemon thread.
+
+        Returns:
+            The started platform
+        """
+        platform = self
+
+        class Handler(_RequestHandler):
+            local_platform = platform
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="local-platform", daemon=True)
+        self.thread.start()
+        logger.info("Local platform started: %s.", self.url)
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            logger.info("Local platform stopped.")
+
+    def __enter__(self) -> "LocalPlatform":
+        self.start()
+        self.platform_url_context = use_platform_url(self.url)
+        self.platform_url_context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.platform_url_context.__exit__(exc_type, exc_value, traceback)
+        self.stop()
+
+    def fail_next(self, route: str, status: int = 503, count: int = 1, retry_after: Optional[float] = None):
+        """
+        The fail_next function answers the next requests of a route with an error.
+
+        Args:
+            route: str: Name of the route as counted in request_counts, e.g. "get_job", or "*" for every route
+            status: int: Http status code of the error
+            count: int: Number of requests which fail
+            retry_after: Optional[float]: Value of the Retry-After header
+        """
+        with self.lock:
+            self.injected_failures.append({"route": route, "status": status, "count": count, "retry_after": retry_after})
+
+    def reset_counts(self):
+        with self.lock:
+            self.request_counts.clear()
+
+    def _check_failures(self, route: str):
+        with self.lock:
+            self.request_counts[route] += 1
+            for failure in self.injected_failures:
+                if failure["route"] in [route, "*"] and failure["count"] > 0:
+                    failure["count"] -= 1
+                    raise PlatformError(failure["status"], "Injected failure.", failure["retry_after"])
+            if self.error_rate > 0 and self.random.random() < self.error_rate:
+                raise PlatformError(503, "Service unavailable.")
+
+    # services
+
+    def _definition_dto(self, service: Dict[str, Any]) -> Dict[str, Any]:
+        definition = service["definition"]
+        return {
+            "id": definition["id"],
+            "name": service["name"],
+            "description": service["description"],
+            "lifecycle": definition["lifecycle"],
+            "type": "MANAGED",
+            "runtime": definition["runtime"],
+            "milliCpus": definition["milli_cpus"],
+            "memoryInMegabytes": definition["memory_in_megabytes"],
+            "gpuCount": definition["gpu_count"],
+            "gpuAccelerator": definition["gpu_accelerator"],
+            "gatewayEndpoint": f"{self.url}/gateway/{service['id']}",
+            "createdAt": _timestamp(definition["created"]),
+        }
+
+    def _service_dto(self, service: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": service["id"],
+            "name": service["name"],
+            "createdAt": _timestamp(service["created"]),
+            "serviceDefinitions": [self._definition_dto(service)],
+        }
+
+    def _get_service(self, service_id: str, version_id: Optional[str] = None) -> Dict[str, Any]:
+        service = self.services.get(service_id)
+        if service is None or (version_id is not None and service["definition"]["id"] != version_id):
+            raise PlatformError(404, "Service not found.")
+        return service
+
+    def _build_status(self, service: Dict[str, Any]) -> str:
+        definition = service["definition"]
+        if time.time() - definition["build_started"] < self.build_duration:
+            return "WORKING"
+        return "FAILED" if definition["build_fails"] else "SUCCESS"
+
+    def get_services(self, query: Dict[str, str]) -> List[Dict[str, Any]]:
+        lifecycle = query.get("lifecycle")
+        services = list(self.services.values())
+        if lifecycle is not None:
+            services = [service for service in services if service["definition"]["lifecycle"] == lifecycle]
+        return [self._service_dto(service) for service in services]
+
+    def create_managed_service(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        if "name" not in fields:
+            raise PlatformError(400, "Name is missing.")
+
+        now = time.time()
+        service = {
+            "id": str(uuid.uuid4()),
+            "name": fields["name"],
+            "description": fields.get("description", ""),
+            "created": now,
+            "user_code": fields.get("userCode", b""),
+            "api_definition": fields.get("apiDefinition", b""),
+            "definition": {
+                "id": str(uuid.uuid4()),
+                "lifecycle": "CREATED",
+                "runtime": fields.get("runtime", "PYTHON_TEMPLATE"),
+                "milli_cpus": int(fields.get("milliCpus", 500)),
+                "memory_in_megabytes": int(fields.get("memoryInMegabytes", 2048)),
+                "gpu_count": int(fields.get("gpuCount", 0)),
+                "gpu_accelerator": fields.get("gpuAccelerator", "NONE"),
+                "created": now,
+                "build_started": now,
+                "build_fails": self.random.random() < self.build_failure_rate,
+            },
+        }
+        self.services[service["id"]] = service
+        return self._service_dto(service)
+
+    def update_source_code(self, service_id: str, version_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        service = self._get_service(service_id, version_id)
+        if "sourceCode" not in fields:
+            raise PlatformError(400, "Source code is missing.")
+        # new source code is built again
+        service["user_code"] = fields["sourceCode"]
+        service["definition"]["build_started"] = time.time()
+        service["definition"]["build_fails"] = self.random.random() < self.build_failure_rate
+        return self._definition_dto(service)
+
+    def set_lifecycle(self, service_id: str, version_id: str, lifecycle: str) -> Dict[str, Any]:
+        service = self._get_service(service_id, version_id)
+        if self._build_status(service) != "SUCCESS":
+            raise PlatformError(409, "Service not built.")
+        service["definition"]["lifecycle"] = lifecycle
+        return self._definition_dto(service)
+
+    # jobs
+
+    def _new_job(self, definition_id: Optional[str], data: Any, params: Any) -> Dict[str, Any]:
+        return {
+            "id": str(uuid.uuid4()),
+            "definition_id": definition_id,
+            "data": data,
+            "params": params,
+            "status": "PENDING",
+            "created": time.time(),
+            "started": None,
+            "ended": None,
+            "result": None,
+            "output": None,
+            "fails": self.random.random() < self.job_failure_rate,
+        }
+
+    def _update_job(self, job: Dict[str, Any]):
+        if job["status"] in FINAL_JOB_STATUSES:
+            return
+
+        now = time.time()
+        start = job["created"] + self.queue_duration
+        end = start + self.job_duration
+        if now < start:
+            return
+        job["started"] = start
+        job["status"] = "RUNNING"
+        if now < end:
+            return
+
+        if job["fails"]:
+            job["ended"] = end
+            job["status"] = "FAILED"
+            job["result"] = {"code": "500", "detail": "Injected job failure."}
+            return
+        # the job keeps running until its handler has returned
+        if job["output"] is None:
+            return
+        job["ended"] = end
+        job["result"], job["status"] = job["output"]
+
+    def _run_handlers(self):
+        """
+        The _run_handlers function runs the handler of every job which is due, without holding the lock, so a slow
+        handler does not block the requests of other clients.
+        """
+        now = time.time()
+        due = []
+        with self.lock:
+            for job_id, job in list(self.pending_jobs.items()):
+                if job["created"] + self.queue_duration + self.job_duration <= now:
+                    del self.pending_jobs[job_id]
+                    if not job["fails"]:
+                        due.append(job)
+
+        for job in due:
+            try:
+                output = {"result": self.handler(job["data"], job["params"]), "metadata": None}, "SUCCEEDED"
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                output = {"code": "500", "detail": f"{type(e).__name__}: {e}"}, "FAILED"
+            with self.lock:
+                job["output"] = output
+
+    def _job_dto(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        self._update_job(job)
+        service = next(
+            (service for service in self.services.values() if service["definition"]["id"] == job["definition_id"]),
+            None,
+        )
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "serviceDefinition": self._definition_dto(service) if service is not None else None,
+            "inputData": json.dumps(job["data"]) if job.get("data_ref") is None else None,
+            "inputDataRef": job.get("data_ref"),
+            "parameters": json.dumps(job["params"]),
+            "result": json.dumps(job["result"]) if job["result"] is not None else None,
+            "createdAt": _timestamp(job["created"]),
+            "startedAt": _timestamp(job["started"]),
+            "endedAt": _timestamp(job["ended"]),
+            "persistResult": True,
+        }
+
+    def _read_data_pool_file(self, data_ref: Dict[str, Any]) -> Any:
+        file_id = data_ref.get("fileId")
+        if file_id not in self.files:
+            raise PlatformError(404, "File of data pool not found.")
+        return json.loads(self.files[file_id])
+
+    def decode_job_input(self, body: Dict[str, Any]) -> Tuple[Any, Any]:
+        if body.get("inputDataRef") is not None:
+            data = self._read_data_pool_file(body["inputDataRef"])
+        else:
+            data = json.loads(body.get("inputData") or "null")
+        params = json.loads(body.get("parameters") or "null")
+        return data, params
+
+    def create_job(self, body: Dict[str, Any], data: Any, params: Any) -> Dict[str, Any]:
+        definition_id = body.get("serviceDefinitionId", body.get("serviceDefinition"))
+        if not any(service["definition"]["id"] == definition_id for service in self.services.values()):
+            raise PlatformError(404, "Service definition not found.")
+
+        job = self._new_job(definition_id, data, params)
+        job["data_ref"] = body.get("inputDataRef")
+        self.jobs[job["id"]] = job
+        self.pending_jobs[job["id"]] = job
+        return self._job_dto(job)
+
+    def _get_job(self, job_id: str) -> Dict[str, Any]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise PlatformError(404, "Job not found.")
+        return job
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        job = self._get_job(job_id)
+        self._update_job(job)
+        if job["status"] not in FINAL_JOB_STATUSES:
+            job["status"] = "CANCELLED"
+            job["ended"] = time.time()
+            self.pending_jobs.pop(job_id, None)
+        return self._job_dto(job)
+
+    # applications
+
+    def create_application(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        application = {"id": str(uuid.uuid4()), "name": body["name"]}
+        self.applications[application["id"]] = application
+        self.subscriptions[application["id"]] = []
+        return application
+
+    def _get_application(self, application_id: str) -> Dict[str, Any]:
+        application = self.applications.get(application_id)
+        if application is None:
+            raise PlatformError(404, "Application not found.")
+        return application
+
+    def create_subscription(self, application_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self._get_application(application_id)
+        service_id = body.get("serviceId")
+        self._get_service(service_id)
+        subscription = {"id": str(uuid.uuid4()), "applicationId": application_id, "serviceId": service_id}
+        self.subscriptions[application_id].append(subscription)
+        return subscription
+
+    # data pools
+
+    def create_data_pool(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        data_pool = {"id": str(uuid.uuid4()), "name": body["name"], "createdAt": _timestamp(time.time())}
+        self.data_pools[data_pool["id"]] = data_pool
+        self.data_source_descriptors[data_pool["id"]] = []
+        return data_pool
+
+    def _get_data_pool(self, data_pool_id: str) -> Dict[str, Any]:
+        data_pool = self.data_pools.get(data_pool_id)
+        if data_pool is None:
+            raise PlatformError(404, "Data pool not found.")
+        return data_pool
+
+    def add_data_source_descriptor(self, data_pool_id: str, files: Dict[str, Tuple[str, bytes]]) -> Dict[str, Any]:
+        self._get_data_pool(data_pool_id)
+        if "file" not in files:
+            raise PlatformError(400, "File is missing.")
+        file_name, content = files["file"]
+        file_id = str(uuid.uuid4())
+        self.files[file_id] = content
+        descriptor = {"id": str(uuid.uuid4()), "files": [{"id": file_id, "name": file_name, "size": len(content)}]}
+        self.data_source_descriptors[data_pool_id].append(descriptor)
+        return descriptor
+
+    # gateway
+
+    def trigger_gateway_job(self, service_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        service = self._get_service(service_id)
+        if service["definition"]["lifecycle"] == "CREATED":
+            raise PlatformError(403, "Service not published.")
+        job = self._new_job(service["definition"]["id"], body.get("data"), body.get("params"))
+        self.gateway_jobs[job["id"]] = job
+        self.pending_jobs[job["id"]] = job
+        return self._gateway_job_dto(job)
+
+    def _gateway_job_dto(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        self._update_job(job)
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "createdAt": _timestamp(job["created"]),
+            "startedAt": _timestamp(job["started"]),
+            "endedAt": _timestamp(job["ended"]),
+        }
+
+    def _get_gateway_job(self, job_id: str) -> Dict[str, Any]:
+        job = self.gateway_jobs.get(job_id)
+        if job is None:
+            raise PlatformError(404, "Job not found.")
+        self._update_job(job)
+        return job
+
+    # routing
+
+    def handle(  # pylint: disable=too-many-return-statements,too-many-branches,too-many-statements
+        self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str], body: bytes
+    ) -> Tuple[str, int, Any]:
+        """
+        The handle function answers a request.
+
+        Args:
+            method: str: Http method
+            path: str: Path of the url
+            query: Dict[str, str]: Query parameters
+            headers: Dict[str, str]: Request headers with lower case names
+            body: bytes: Request body
+
+        Returns:
+            The route name, the status code and the JSON serializable response body
+        """
+        segments = [segment for segment in path.split("/") if segment != ""]
+        if segments[:2] == ["local", "request-counts"]:
+            if method == "DELETE":
+                self.reset_counts()
+                return "local_request_counts", 204, None
+            with self.lock:
+                return "local_request_counts", 200, dict(self.request_counts)
+
+        route = _route_name(method, segments)
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self._check_failures(route)
+
+        # decode the request bodies before locking, so large payloads do not block other requests
+        payload: Any = None
+        if route in ["create_managed_service", "update_source_code", "update_api_definition"]:
+            payload = _parse_form(headers, body)
+        elif route == "add_data_source_descriptor":
+            payload = _parse_form(headers, body, files_only=True)
+        elif len(body) > 0:
+            payload = json.loads(body)
+        if route == "create_job":
+            data, params = self.decode_job_input(payload)
+        if self.pending_jobs:
+            self._run_handlers()
+
+        with self.lock:
+            if route == "get_access_token":
+                return route, 200, {"access_token": uuid.uuid4().hex, "token_type": "Bearer", "expires_in": 3600}
+            if route == "get_services":
+                return route, 200, self.get_services(query)
+            if route == "create_managed_service":
+                return route, 201, self.create_managed_service(payload)
+            if route == "get_service":
+                return route, 200, self._service_dto(self._get_service(segments[1]))
+            if route == "delete_service":
+                self._get_service(segments[1])
+                del self.services[segments[1]]
+                return route, 204, None
+            if route == "update_version":
+                service = self._get_service(segments[1], segments[3])
+                service["description"] = payload.get("description", service["description"])
+                return route, 200, self._definition_dto(service)
+            if route == "update_source_code":
+                return route, 200, self.update_source_code(segments[1], segments[3], payload)
+            if route == "update_api_definition":
+                service = self._get_service(segments[1], segments[3])
+                service["api_definition"] = payload.get("apiDefinition", b"")
+                return route, 200, self._definition_dto(service)
+            if route == "get_build_status":
+                return route, 200, {"status": self._build_status(self._get_service(segments[1], segments[3]))}
+            if route == "publish_service_internal":
+                return route, 200, self.set_lifecycle(segments[1], segments[3], "ACCESSIBLE")
+            if route == "unpublish_service":
+                return route, 200, self.set_lifecycle(segments[1], segments[3], "CREATED")
+            if route == "get_managed_service_executions":
+                version_id = self._get_service(segments[1], segments[3])["definition"]["id"]
+                jobs = [job for job in self.jobs.values() if job["definition_id"] == version_id]
+                return route, 200, [self._job_dto(job) for job in jobs]
+
+            if route == "get_jobs":
+                return route, 200, [self._job_dto(job) for job in self.jobs.values()]
+            if route == "create_job":
+                return route, 201, self.create_job(payload, data, params)
+            if route == "get_job":
+                return route, 200, self._job_dto(self._get_job(segments[1]))
+            if route == "delete_job":
+                self._get_job(segments[1])
+                del self.jobs[segments[1]]
+                self.pending_jobs.pop(segments[1], None)
+                return route, 204, None
+            if route == "cancel_job":
+                return route, 200, self.cancel_job(segments[1])
+
+            if route == "get_applications":
+                return route, 200, list(self.applications.values())
+            if route == "create_application":
+                return route, 201, self.create_application(payload)
+            if route == "get_application":
+                return route, 200, self._get_application(segments[1])
+            if route == "delete_application":
+                self._get_application(segments[1])
+                del self.applications[segments[1]]
+                del self.subscriptions[segments[1]]
+                return route, 204, None
+            if route == "get_application_subscriptions":
+                self._get_application(segments[1])
+                return route, 200, self.subscriptions[segments[1]]
+            if route == "create_subscription":
+                return route, 201, self.create_subscription(segments[1], payload)
+            if route == "delete_application_subscription":
+                self._get_application(segments[1])
+                subscriptions = self.subscriptions[segments[1]]
+                self.subscriptions[segments[1]] = [s for s in subscriptions if s["id"] != segments[3]]
+                return route, 204, None
+
+            if route == "get_data_pools":
+                return route, 200, {"content": list(self.data_pools.values())}
+            if route == "create_data_pool":
+                return route, 201, self.create_data_pool(payload)
+            if route == "delete_data_pool":
+                self._get_data_pool(segments[1])
+                del self.data_pools[segments[1]]
+                del self.data_source_descriptors[segments[1]]
+                return route, 204, None
+            if route == "get_data_source_descriptors":
+                self._get_data_pool(segments[1])
+                return route, 200, self.data_source_descriptors[segments[1]]
+            if route == "add_data_source_descriptor":
+                return route, 201, self.add_data_source_descriptor(segments[1], payload)
+
+            if route.startswith("gateway_") and not headers.get("authorization", "").startswith("Bearer "):
+                raise PlatformError(401, "Access token is missing.")
+            if route == "gateway_trigger_job":
+                return route, 201, self.trigger_gateway_job(segments[1], payload)
+            if route == "gateway_get_job":
+                return route, 200, self._gateway_job_dto(self._get_gateway_job(segments[2]))
+            if route == "gateway_get_job_result":
+                job = self._get_gateway_job(segments[2])
+                if job["status"] not in FINAL_JOB_STATUSES:
+                    raise PlatformError(404, "Result not available.")
+                return route, 200, job["result"]
+
+        raise PlatformError(404, f"No route for: {method} {path}.")
+
+
+def _route_name(method: str, segments: List[str]) -> str:  # pylint: disable=too-many-return-statements
+    resource = segments[0] if len(segments) > 0 else ""
+    count = len(segments)
+
+    if resource == "token" and method == "POST":
+        return "get_access_token"
+    if resource == "services":
+        if count == 1:
+            return {"GET": "get_services", "POST": "create_managed_service"}.get(method, "unknown")
+        if count == 2:
+            return {"GET": "get_service", "DELETE": "delete_service"}.get(method, "unknown")
+        if count == 4 and segments[2] == "versions" and method == "PUT":
+            return "update_version"
+        if count == 5 and segments[2] == "versions":
+            action = segments[4]
+            if action == "source-code" and method == "PUT":
+                return "update_source_code"
+            if action == "api-spec" and method == "PUT":
+                return "update_api_definition"
+            if action == "status":
+                return "get_build_status"
+            if action.startswith("unpublish"):
+                return "unpublish_service"
+            if action.startswith("publish"):
+                return "publish_service_internal"
+            if action in ["executions", "jobs"]:
+                return "get_managed_service_executions"
+    if resource == "jobs":
+        if count == 1:
+            return {"GET": "get_jobs", "POST": "create_job"}.get(method, "unknown")
+        if count == 2:
+            return {"GET": "get_job", "DELETE": "delete_job"}.get(method, "unknown")
+        if count == 3 and segments[2] == "cancel":
+            return "cancel_job"
+    if resource in ["apps", "applications"]:
+        if count == 1:
+            return {"GET": "get_applications", "POST": "create_application"}.get(method, "unknown")
+        if count == 2:
+            return {"GET": "get_application", "DELETE": "delete_application"}.get(method, "unknown")
+        if count >= 3 and segments[2] == "subscriptions":
+            if method == "GET" and count == 3:
+                return "get_application_subscriptions"
+            if method == "POST":
+                return "create_subscription"
+            if method == "DELETE" and count == 4:
+                return "delete_application_subscription"
+    if resource == "data-pools":
+        if count == 1:
+            return {"GET": "get_data_pools", "POST": "create_data_pool"}.get(method, "unknown")
+        if count == 2 and method == "DELETE":
+            return "delete_data_pool"
+        if count == 3 and segments[2] == "data-source-descriptors":
+            return {"GET": "get_data_source_descriptors", "POST": "add_data_source_descriptor"}.get(method, "unknown")
+    if resource == "gateway":
+        if count == 2 and method == "POST":
+            return "gateway_trigger_job"
+        if count == 3 and method == "GET":
+            return "gateway_get_job"
+        if count == 4 and segments[3] == "result":
+            return "gateway_get_job_result"
+    return "unknown"
+
+
+def _parse_form(headers: Dict[str, str], body: bytes, files_only: bool = False) -> Dict[str, Any]:
+    content_type = headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        if files_only:
+            raise PlatformError(400, "Multipart form expected.")
+        return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body)
+    fields: Dict[str, Any] = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        content = part.get_payload(decode=True)
+        file_name = part.get_filename()
+        if files_only:
+            fields[name] = (file_name, content)
+        elif file_name is not None:
+            fields[name] = content
+        else:
+            fields[name] = content.decode("utf-8")
+    return fields
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    local_platform: LocalPlatform
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length > 0 else b""
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        headers = {key.lower(): value for key, value in self.headers.items()}
+
+        extra_headers = {}
+        try:
+            _, status, response = self.local_platform.handle(self.command, url.path, query, headers, body)
+        except PlatformError as e:
+            status = e.status
+            response = {"status": e.status, "error": e.detail}
+            if e.retry_after is not None:
+                extra_headers["Retry-After"] = str(e.retry_after)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.exception(e)
+            status = 500
+            response = {"status": 500, "error": f"{type(e).__name__}: {e}"}
+
+        content = b"" if response is None else json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in extra_headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+    do_PATCH = _handle
+    do_DELETE = _handle
+
+
+def main():
+    """
+    The main function runs the local platform until it is interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Local stand-in for the PlanQK platform.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--build-duration", type=float, default=0.0)
+    parser.add_argument("--queue-duration", type=float, default=0.0)
+    parser.add_argument("--job-duration", type=float, default=0.0)
+    parser.add_argument("--build-failure-rate", type=float, default=0.0)
+    parser.add_argument("--job-failure-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--echo-data", action="store_true", help="return the job data as result")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    platform = LocalPlatform(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        build_duration=args.build_duration,
+        queue_duration=args.queue_duration,
+        job_duration=args.job_duration,
+        build_failure_rate=args.build_failure_rate,
+        job_failure_rate=args.job_failure_rate,
+        error_rate=args.error_rate,
+        handler=_echo_data if args.echo_data else _echo_params,
+        seed=args.seed,
+    ).start()
+    print(f"PLANQK_PLATFORM_URL={platform.url}", flush=True)
+    print(f"PLANKQ_TOKEN_URL={platform.token_url}", flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        platform.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import importlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Union
+
+from pyplanqk.tracing import span
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT = "src.program"
+
+_program: Any = None
+
+
+def _init_worker(root: str):
+    global _program  # pylint: disable=global-statement
+
+    # the template reads relative paths like ./input/data.json and imports src as package
+    os.chdir(root)
+    sys.path.insert(0, root)
+    _program = importlib.import_module(ENTRY_POINT)
+
+
+def _run_program(data: str, params: str) -> str:
+    response = _program.run(json.loads(data), json.loads(params))
+    if hasattr(response, "to_json"):
+        return response.to_json()
+    return json.dumps(response, default=lambda o: getattr(o, "__dict__", str(o)))
+
+
+class LocalRuntime:
+    """
+    Runs the user code of a PYTHON_TEMPLATE service in local processes instead of on the platform.
+
+    The archive is unpacked once and src.program.run(data, params) is called in a pool of worker processes, with the
+    data and parameters passed as JSON like on the platform. Every worker imports the user code once, so a change of
+    the code needs a new runtime. A job which times out is stopped by terminating the worker processes, the jobs
+    running next to it are run again in a new pool.
+
+    Args:
+        user_code (str, bytes or file): zip archive of the user code as path, bytes or file, or a source directory
+        max_workers (int): number of worker processes, the number of cpus if not given
+    """
+
+    def __init__(self, user_code: Union[str, bytes, Any], max_workers: Optional[int] = None):
+        self.temporary_dir: Optional[str] = None
+        if isinstance(user_code, (str, os.PathLike)) and os.path.isdir(user_code):
+            self.root = os.path.abspath(user_code)
+        else:
+            self.temporary_dir = tempfile.mkdtemp(prefix="pyplanqk-runtime-")
+            self.root = self.temporary_dir
+            _unpack(user_code, self.root)
+        if not os.path.isfile(os.path.join(self.root, *ENTRY_POINT.split(".")) + ".py"):
+            self.close()
+            raise Exception(f"User code has no entry point {ENTRY_POINT}.run, expected a PYTHON_TEMPLATE layout.")
+
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawned workers start from a clean interpreter, like the container of the service
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.root,),
+        )
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        # a running job cannot be cancelled, so its worker processes are terminated and the pool is replaced
+        with self.lock:
+            if executor is not self.executor:
+                return
+            self.executor = self._create_executor()
+        _terminate(executor)
+
+    def run(self, data: Optional[Dict[str, Any]], params: Optional[Dict[str, Any]], timeout: Optional[float] = None):
+        """
+        The run function executes the user code with the data and parameters.
+
+        Args:
+            data: Optional[Dict[str, Any]]: Input data of the job
+            params: Optional[Dict[str, Any]]: Parameters of the job
+            timeout: Optional[float]: Maximum time to wait for the result in seconds
+
+        Returns:
+            The result of the job, as returned by get_service_job_result
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with span("local_run") as local_run:
+            while True:
+                with self.lock:
+                    executor = self.executor
+                    future = executor.submit(_run_program, json.dumps(data), json.dumps(params))
+                try:
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    response = json.loads(future.result(timeout=remaining))
+                    break
+                except FutureTimeoutError as e:
+                    self._restart(executor)
+                    raise TimeoutError(f"Local job not finished after {timeout} s.") from e
+                except BrokenProcessPool:
+                    with self.lock:
+                        restarted = executor is not self.executor
+                    if not restarted:
+                        # a worker died with the user code, e.g. by exit or a crash
+                        self._restart(executor)
+                        raise
+                    # the pool was replaced because of the timeout of another job
+            local_run.set_attribute("status", "SUCCEEDED" if "result" in response else "FAILED")
+
+        if "result" not in response:
+            raise Exception(f"Local job failed: {response.get('code')} {response.get('detail')}")
+        return response["result"]
+
+    def close(self):
+        """
+        The close function stops the worker processes and removes the unpacked user code.
+        Jobs which are still running are terminated.
+        """
+        if hasattr(self, "executor"):
+            _terminate(self.executor)
+        if self.temporary_dir is not None:
+            shutil.rmtree(self.temporary_dir, ignore_errors=True)
+            self.temporary_dir = None
+
+    def __enter__(self) -> "LocalRuntime":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _terminate(executor: ProcessPoolExecutor):
+    # the executor has no public way to stop running workers before python 3.14
+    processes = list((executor._processes or {}).values())  # pylint: disable=protected-access
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def _unpack(user_code: Union[str, bytes, Any], target: str):
+    if isinstance(user_code, (bytes, bytearray)):
+        user_code = io.BytesIO(user_code)
+    elif hasattr(user_code, "read"):
+        position = user_code.tell()
+        content = user_code.read()
+        user_code.seek(position)
+        user_code = io.BytesIO(content)
+    # extractall drops absolute paths and .. from the member names
+    with zipfile.ZipFile(user_code) as archive:
+        archive.extractall(target)
@@ -2,22 +2,46 @@ import json
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-import requests
-
-from openapi_client import ApiClient, Configuration
-from openapi_client.api.service_platform___jobs_api import ServicePlatformJobsApi
-from openapi_client.api.service_platform___services_api import ServicePlatformServicesApi
-from openapi_client.apis import ServicePlatformApplicationsApi
-from openapi_client.model.create_application_request import CreateApplicationRequest
-from openapi_client.model.create_job_request import CreateJobRequest
-from openapi_client.model.data_pool_ref import DataPoolRef
+from pyplanqk.analytics import get_job_timing, summarize_job_timings
+from pyplanqk.cancellation import JobTracker
+from pyplanqk.clients import get_applications_api, get_jobs_api, get_services_api
 from pyplanqk.helpers import wait_for_service_job_to_be_finished
+from pyplanqk.idempotency import find_submitted_job, get_ledger, is_ambiguous, new_idempotency_key
+from pyplanqk.metrics import increment
+from pyplanqk.polling import PollScheduler
+from pyplanqk.settings import get_data_pools_url, get_platform_url
+from pyplanqk.tracing import inject_trace_headers, span, traced
+from pyplanqk.transport import send
 
 logger = logging.getLogger(__name__)
 
+SUBMIT_ATTEMPTS = 3
+
+# The models of the generated openapi client are imported on first use to keep the import of pyplanqk fast.
+# pylint: disable=import-outside-toplevel
+
+
+class ServiceUpdateNotSupportedError(Exception):
+    """
+    Raised when the platform has no route for the in-place update of a service, it answered 404 or 405.
+
+    Args:
+        service_id (str): id of the service
+        status_code (int): status code of the update request
+    """
+
+    def __init__(self, service_id: str, status_code: int):
+        super().__init__(f"Update of service: {service_id} is not supported, status: {status_code}.")
+        self.service_id = service_id
+        self.status_code = status_code
 
+
+@traced("create_managed_service")
 def create_managed_service(config: Dict[str, Any], api_key: Dict[str, str]) -> Dict[str, Any]:
     """
     The create_managed_service function creates a managed service in the Service Platform.
@@ -36,9 +60,7 @@ def create_managed_service(config: Dict[str, Any], api_key: Dict[str, str]) -> D
     """
     logger.debug("Create managed service.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
+    services_api = get_services_api(api_key)
 
     try:
         service = services_api.create_managed_service(**config)
@@ -51,6 +73,152 @@ def create_managed_service(config: Dict[str, Any], api_key: Dict[str, str]) -> D
         raise e
 
 
+@traced("update_managed_service")
+def update_managed_service(
+    service_id: str, version_id: str, config: Dict[str, Any], api_key: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    The update_managed_service function replaces the api definition, user code and description of a service in place.
+    The platform builds the service again after the user code is replaced.
+
+    The openapi client has no operations for these updates, so the endpoints of the platform are called directly:
+    PUT /services/{service_id}/versions/{version_id}/api-spec with the multipart field apiDefinition,
+    PUT /services/{service_id}/versions/{version_id}/source-code with the multipart field sourceCode and
+    PUT /services/{service_id}/versions/{version_id} with the JSON field description.
+    The description is written last, after the user code was accepted, because it carries the content hash of the
+    deployed code. If an upload fails, the old hash stays and the next deployment uploads the code again.
+    Platforms without these routes answer the first request with 404 or 405 and ServiceUpdateNotSupportedError is
+    raised before anything changed, see recreate_managed_service for the fallback.
+
+    Args:
+        service_id: str: Identify the service
+        version_id: str: Identify the version of the service
+        config: Dict[str, Any]: Configuration of the service with user_code, api_definition and description
+        api_key: Dict[str, str]: Pass in the api key to the function
+
+    Returns:
+        The updated version of the service
+    """
+    logger.debug("Update managed service.")
+
+    url = f"{get_platform_url()}/services/{service_id}/versions/{version_id}"
+    headers = {"X-Auth-Token": api_key["apiKey"]}
+
+    def update(path: str, **kwargs) -> Dict[str, Any]:
+        response = send("PUT", f"{url}{path}", headers=headers, timeout=30, **kwargs)
+        if response.status_code in [404, 405]:
+            raise ServiceUpdateNotSupportedError(service_id, response.status_code)
+        if response.status_code not in [200, 201, 204]:
+            raise Exception(f"Update of service: {service_id} failed with: {response.status_code} {response.text}")
+        return response.json() if len(response.content) > 0 else {}
+
+    try:
+        if config.get("api_definition") is not None:
+            update("/api-spec", files={"apiDefinition": config["api_definition"]})
+        version = update("/source-code", files={"sourceCode": config["user_code"]})
+        if config.get("description") is not None:
+            version = update("", json={"description": config["description"]})
+        logger.debug("Service update triggered.")
+        return version
+    except Exception as e:
+        logger.error("Service update failed.")
+        logger.error(e)
+        raise e
+
+
+@traced("recreate_managed_service")
+def recreate_managed_service(service_id: str, config: Dict[str, Any], api_key: Dict[str, str]) -> Dict[str, Any]:
+    """
+    The recreate_managed_service function replaces a service by a new one with the configuration.
+    It is the fallback of update_managed_service on platforms without the update routes: the version is unpublished
+    if needed, the service is deleted and created again. The new service has a new id, is not published and the
+    subscriptions of the old service are removed.
+
+    Args:
+        service_id: str: Identify the service
+        config: Dict[str, Any]: Configuration of the service, as for create_managed_service
+        api_key: Dict[str, str]: Pass in the api key to the function
+
+    Returns:
+        The created service
+    """
+    logger.debug("Recreate managed service.")
+
+    services_api = get_services_api(api_key)
+
+    try:
+        version = services_api.get_service(service_id).to_dict()["service_definitions"][0]
+        if version["lifecycle"] != "CREATED":
+            services_api.unpublish_service(service_id, version["id"])
+        services_api.delete_service(service_id)
+        service = services_api.create_managed_service(**config)
+        service = service.to_dict()
+        logger.debug("Service recreation triggered.")
+        return service
+    except Exception as e:
+        logger.error("Service recreation failed.")
+        logger.error(e)
+        raise e
+
+
+@traced("get_service_version")
+def get_service_version(service_id: str, version_id: str, api_key: Dict[str, str]) -> Dict[str, Any]:
+    """
+    The get_service_version function reads a version of a service with its description.
+    The listing of the services is not guaranteed to carry the description of the versions, so the service is read
+    by id.
+
+    Args:
+        service_id: str: Identify the service
+        version_id: str: Identify the version of the service
+        api_key: Dict[str, str]: Pass in the api key to the function
+
+    Returns:
+        The version of the service
+    """
+    logger.debug("Get service version.")
+
+    services_api = get_services_api(api_key)
+
+    try:
+        service = services_api.get_service(service_id).to_dict()
+        for version in service["service_definitions"]:
+            if version["id"] == version_id:
+                return version
+        raise Exception(f"Version: {version_id} of service: {service_id} not found.")
+    except Exception as e:
+        logger.error("Service version retrieval failed.")
+        logger.error(e)
+        raise e
+
+
+@traced("get_build_status")
+def get_build_status(service_id: str, version_id: str, api_key: Dict[str, str]) -> str:
+    """
+    The get_build_status function returns the build status of a service version.
+
+    Args:
+        service_id: str: Identify the service
+        version_id: str: Identify the version of the service
+        api_key: Dict[str, str]: Pass in the api key to the function
+
+    Returns:
+        The build status, e.g. WORKING, SUCCESS or FAILED
+    """
+    logger.debug("Get build status.")
+
+    services_api = get_services_api(api_key)
+
+    try:
+        build_status = services_api.get_build_status(service_id=service_id, version_id=version_id)
+        return build_status["status"]
+    except Exception as e:
+        logger.error("Build status retrieval failed.")
+        logger.error(e)
+        raise e
+
+
+@traced("create_application")
 def create_application(application_name: str, api_key: Dict[str, str]) -> Dict[str, Any]:
     """
     The create_application function creates a new application in the Service Platform.
@@ -68,11 +236,11 @@ def create_application(application_name: str, api_key: Dict[str, str]) -> Dict[s
     """
     logger.debug("Create application.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    applications_api = ServicePlatformApplicationsApi(api_client=api_client)
+    applications_api = get_applications_api(api_key)
 
     try:
+        from openapi_client.model.create_application_request import CreateApplicationRequest
+
         create_app_request = CreateApplicationRequest(name=application_name)
         application = applications_api.create_application(create_application_request=create_app_request)
         logger.debug("Application created.")
@@ -83,6 +251,7 @@ def create_application(application_name: str, api_key: Dict[str, str]) -> Dict[s
         raise e
 
 
+@traced("publish_service_internally")
 def publish_service_internally(service_name: str, api_key: Dict[str, str]) -> Dict[str, Any]:
     """
     The publish_service_internally function publishes a service internally.
@@ -100,9 +269,7 @@ def publish_service_internally(service_name: str, api_key: Dict[str, str]) -> Di
     """
     logger.debug("Publish service internally.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
+    services_api = get_services_api(api_key)
 
     try:
         service = get_service(service_name, api_key)
@@ -120,6 +287,7 @@ def publish_service_internally(service_name: str, api_key: Dict[str, str]) -> Di
         raise e
 
 
+@traced("unpublish_service")
 def unpublish_service(service_name: str, api_key: Dict[str, str]) -> Dict[str, Any]:
     """
     The unpublish_service function unpublishes a service.
@@ -137,9 +305,7 @@ def unpublish_service(service_name: str, api_key: Dict[str, str]) -> Dict[str, A
     """
     logger.debug("Unpublish service.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
+    services_api = get_services_api(api_key)
 
     try:
         service = get_service(service_name, api_key)
@@ -157,6 +323,7 @@ def unpublish_service(service_name: str, api_key: Dict[str, str]) -> Dict[str, A
         raise e
 
 
+@traced("remove_service")
 def remove_service(service_name: str, api_key: Dict[str, str]) -> bool:
     """
     The remove_service function removes a service from the Service Platform.
@@ -174,9 +341,7 @@ def remove_service(service_name: str, api_key: Dict[str, str]) -> bool:
     """
     logger.debug("Remove service.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
+    services_api = get_services_api(api_key)
 
     try:
         service = get_service(service_name, api_key)
@@ -192,6 +357,7 @@ def remove_service(service_name: str, api_key: Dict[str, str]) -> bool:
         raise e
 
 
+@traced("remove_application")
 def remove_application(application_name: str, api_key: Dict[str, str]) -> bool:
     """
     The remove_application function removes an application from the Service Platform.
@@ -209,9 +375,7 @@ def remove_application(application_name: str, api_key: Dict[str, str]) -> bool:
     """
     logger.debug("Remove application.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    applications_api = ServicePlatformApplicationsApi(api_client=api_client)
+    applications_api = get_applications_api(api_key)
 
     try:
         application = get_application(application_name, api_key)
@@ -226,6 +390,7 @@ def remove_application(application_name: str, api_key: Dict[str, str]) -> bool:
         raise e
 
 
+@traced("remove_subscription")
 def remove_subscription(application_name: str, api_key: Dict[str, str]) -> bool:
     """
     The remove_subscription function removes a subscription for an application.
@@ -243,9 +408,7 @@ def remove_subscription(application_name: str, api_key: Dict[str, str]) -> bool:
     """
     logger.debug("Remove subscription.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    applications_api = ServicePlatformApplicationsApi(api_client=api_client)
+    applications_api = get_applications_api(api_key)
 
     try:
         application = get_application(application_name, api_key)
@@ -262,6 +425,7 @@ def remove_subscription(application_name: str, api_key: Dict[str, str]) -> bool:
         raise e
 
 
+@traced("subscribe_application_to_service")
 def subscribe_application_to_service(
     application_name: str, service_name: str, api_key: Dict[str, str]
 ) -> Dict[str, Any]:
@@ -282,9 +446,7 @@ def subscribe_application_to_service(
     """
     logger.debug("Subscribe application to service.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    applications_api = ServicePlatformApplicationsApi(api_client=api_client)
+    applications_api = get_applications_api(api_key)
 
     try:
         service = get_service(service_name, api_key)
@@ -293,6 +455,8 @@ def subscribe_application_to_service(
         assert application is not None
         service_id = service["id"]
         application_id = application["id"]
+        from openapi_client.model.create_internal_subscription_request import CreateInternalSubscriptionRequest
+
         subscription_request = CreateInternalSubscriptionRequest(application_id=application_id, service_id=service_id)
         subscription = applications_api.create_internal_subscription(
             id=application_id, create_internal_subscription_request=subscription_request
@@ -305,6 +469,7 @@ def subscribe_application_to_service(
         raise e
 
 
+@traced("get_application")
 def get_application(application_name: str, api_key: Dict[str, str]) -> Optional[Dict[str, Any]]:
     """
     The get_application function retrieves the application with the given name from the Service Platform.
@@ -322,9 +487,7 @@ def get_application(application_name: str, api_key: Dict[str, str]) -> Optional[
     """
     logger.debug("Get application.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    applications_api = ServicePlatformApplicationsApi(api_client=api_client)
+    applications_api = get_applications_api(api_key)
 
     try:
         applications = applications_api.get_applications()
@@ -340,6 +503,7 @@ def get_application(application_name: str, api_key: Dict[str, str]) -> Optional[
         raise e
 
 
+@traced("get_services")
 def get_services(api_key: Dict[str, str], lifecycle: str = None) -> List[Dict[str, Any]]:
     """
     The get_services function retrieves all services from the Service Platform.
@@ -357,9 +521,7 @@ def get_services(api_key: Dict[str, str], lifecycle: str = None) -> List[Dict[st
     """
     logger.debug("Get services.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
+    services_api = get_services_api(api_key)
 
     try:
         if lifecycle is None:
@@ -382,6 +544,7 @@ def get_services(api_key: Dict[str, str], lifecycle: str = None) -> List[Dict[st
         raise e
 
 
+@traced("get_service")
 def get_service(service_name: str, api_key: Dict[str, str]) -> Optional[Dict[str, Any]]:
     """
     The get_service function retrieves a service from the Service Platform.
@@ -399,23 +562,22 @@ def get_service(service_name: str, api_key: Dict[str, str]) -> Optional[Dict[str
     """
     logger.debug("Get service.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
+    services_api = get_services_api(api_key)
 
     try:
-        services = get_services(api_key)
-        assert services is not None
+        with span("resolve_service", service_name=service_name):
+            services = get_services(api_key)
+            assert services is not None
 
-        found_service = None
-        for service in services:
-            if service_name == service["name"]:
-                found_service = service
+            found_service = None
+            for service in services:
+                if service_name == service["name"]:
+                    found_service = service
 
-        if found_service is not None:
-            service_id = found_service["id"]
-            found_service = services_api.get_service(service_id)
-            found_service = found_service.to_dict()
+            if found_service is not None:
+                service_id = found_service["id"]
+                found_service = services_api.get_service(service_id)
+                found_service = found_service.to_dict()
 
         return found_service
     except Exception as e:
@@ -424,6 +586,7 @@ def get_service(service_name: str, api_key: Dict[str, str]) -> Optional[Dict[str
         raise e
 
 
+@traced("get_version")
 def get_version(service_name: str, api_key: Dict[str, str]) -> Dict[str, Any]:
     """
     The get_version function returns the version of a service.
@@ -451,6 +614,7 @@ def get_version(service_name: str, api_key: Dict[str, str]) -> Dict[str, Any]:
         raise e
 
 
+@traced("get_all_subscriptions")
 def get_all_subscriptions(application_name: str, api_key: Dict[str, str]) -> List[Dict[str, Any]]:
     """
     The get_all_subscriptions function retrieves all subscriptions for a given application.
@@ -468,9 +632,7 @@ def get_all_subscriptions(application_name: str, api_key: Dict[str, str]) -> Lis
     """
     logger.debug("Get subscriptions.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    applications_api = ServicePlatformApplicationsApi(api_client=api_client)
+    applications_api = get_applications_api(api_key)
 
     try:
         application = get_application(application_name, api_key)
@@ -484,6 +646,7 @@ def get_all_subscriptions(application_name: str, api_key: Dict[str, str]) -> Lis
         raise e
 
 
+@traced("get_subscription")
 def get_subscription(application_name: str, api_key: Dict[str, str]) -> Optional[Dict[str, Any]]:
     """
     The get_subscription function retrieves the subscription for a given application.
@@ -501,9 +664,7 @@ def get_subscription(application_name: str, api_key: Dict[str, str]) -> Optional
     """
     logger.debug("Get subscriptions.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    applications_api = ServicePlatformApplicationsApi(api_client=api_client)
+    applications_api = get_applications_api(api_key)
 
     try:
         application = get_application(application_name, api_key)
@@ -518,6 +679,7 @@ def get_subscription(application_name: str, api_key: Dict[str, str]) -> Optional
         raise e
 
 
+@traced("get_access_token")
 def get_access_token(consumer_key: str, consumer_secret: str, token_url: str) -> str:
     """
     The get_access_token function is used to get an access token from the OAuth2 server.
@@ -538,8 +700,14 @@ def get_access_token(consumer_key: str, consumer_secret: str, token_url: str) ->
     try:
         data = {"grant_type": "client_credentials"}
 
-        response = requests.post(
-            token_url, data=data, verify=False, allow_redirects=False, auth=(consumer_key, consumer_secret), timeout=30
+        response = send(
+            "POST",
+            token_url,
+            data=data,
+            verify=False,
+            allow_redirects=False,
+            auth=(consumer_key, consumer_secret),
+            timeout=30,
         )
         assert response.status_code in [200, 201, 204]
         json_response = response.json()
@@ -550,6 +718,7 @@ def get_access_token(consumer_key: str, consumer_secret: str, token_url: str) ->
         raise e
 
 
+@traced("get_all_jobs_for_managed_service")
 def get_all_jobs_for_managed_service(service_name: str, api_key: Dict[str, str]) -> List[Dict[str, Any]]:
     """
     The get_all_jobs_for_managed_service function returns a list of all jobs for the specified service.
@@ -567,9 +736,7 @@ def get_all_jobs_for_managed_service(service_name: str, api_key: Dict[str, str])
     """
     logger.debug("Get all service jobs for managed service.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    services_api = ServicePlatformServicesApi(api_client=api_client)
+    services_api = get_services_api(api_key)
 
     try:
         service = get_service(service_name, api_key)
@@ -586,6 +753,7 @@ def get_all_jobs_for_managed_service(service_name: str, api_key: Dict[str, str])
         raise e
 
 
+@traced("get_all_service_jobs")
 def get_all_service_jobs(api_key: Dict[str, str]) -> List[Dict[str, Any]]:
     """
     The get_all_service_jobs function returns a list of all service jobs.
@@ -602,9 +770,7 @@ def get_all_service_jobs(api_key: Dict[str, str]) -> List[Dict[str, Any]]:
     """
     logger.debug("Get all service jobs.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
     try:
         jobs = service_jobs_api.get_jobs()
@@ -616,6 +782,7 @@ def get_all_service_jobs(api_key: Dict[str, str]) -> List[Dict[str, Any]]:
         raise e
 
 
+@traced("get_service_jobs")
 def get_service_jobs(service_name: str, api_key: Dict[str, str]) -> List[Dict[str, Any]]:
     """
     The get_service_jobs function returns a list of all jobs for the service.
@@ -633,9 +800,7 @@ def get_service_jobs(service_name: str, api_key: Dict[str, str]) -> List[Dict[st
     """
     logger.debug("Get service jobs for service.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
     try:
         service = get_service(service_name, api_key)
@@ -655,6 +820,34 @@ def get_service_jobs(service_name: str, api_key: Dict[str, str]) -> List[Dict[st
         raise e
 
 
+@traced("get_service_job_timings")
+def get_service_job_timings(service_name: str, api_key: Dict[str, str]) -> Dict[str, Any]:
+    """
+    The get_service_job_timings function computes queue wait, run time and polling overhead of all jobs of a service.
+
+    Args:
+        service_name: str: Specify the name of the service to get the job timings for
+        api_key: Dict[str, str]: Pass in the api key to authenticate with the platform
+
+    Returns:
+        A dictionary with the service name, the timing of every job and the summaries of the durations
+    """
+    logger.debug("Get service job timings.")
+
+    try:
+        jobs = get_service_jobs(service_name, api_key)
+        timings = [get_job_timing(job) for job in jobs]
+        result = summarize_job_timings(timings)
+        result["service_name"] = service_name
+        result["jobs"] = timings
+        return result
+    except Exception as e:
+        logger.error("Get service job timings failed.")
+        logger.error(e)
+        raise e
+
+
+@traced("get_managed_service_job")
 def get_managed_service_job(service_name: str, job_id: str, api_key: Dict[str, str]) -> Optional[Dict[str, Any]]:
     """
     The get_managed_service_job function returns a job for the specified service.
@@ -687,6 +880,7 @@ def get_managed_service_job(service_name: str, job_id: str, api_key: Dict[str, s
         raise e
 
 
+@traced("get_service_job")
 def get_service_job(job_id: str, api_key: Dict[str, str]) -> Optional[Dict[str, Any]]:
     """
     The get_service_job function retrieves a service job from the Service Platform.
@@ -704,9 +898,7 @@ def get_service_job(job_id: str, api_key: Dict[str, str]) -> Optional[Dict[str,
     """
     logger.debug("Get managed service job.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
     try:
         job = service_jobs_api.get_job(job_id)
@@ -718,6 +910,7 @@ def get_service_job(job_id: str, api_key: Dict[str, str]) -> Optional[Dict[str,
         raise e
 
 
+@traced("trigger_application_job")
 def trigger_application_job(
     service_name: str,
     data: Dict[str, list],
@@ -759,8 +952,9 @@ def trigger_application_job(
         }
 
         payload = {"data": data, "params": params}
+        inject_trace_headers(headers)
 
-        response = requests.post(service_endpoint, json=payload, headers=headers, timeout=30)
+        response = send("POST", service_endpoint, json=payload, headers=headers, timeout=30)
         assert response.status_code in [200, 201, 204]
         json_response = response.json()
         return json_response
@@ -770,6 +964,7 @@ def trigger_application_job(
         raise e
 
 
+@traced("trigger_service_job")
 def trigger_service_job(
     service_name: str,
     api_key: Dict[str, str],
@@ -779,6 +974,10 @@ def trigger_service_job(
     data_ref: Dict[str, Any] = None,
     timeout=500,
     step=1,
+    scheduler: Optional[PollScheduler] = None,
+    tracker: Optional[JobTracker] = None,
+    cancel_on_abort: bool = False,
+    idempotency_key: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     The trigger_service_job function triggers a service job on the platform.
@@ -796,6 +995,10 @@ def trigger_service_job(
         Any]: Specify that the function can return any type of data
         timeout: Set the maximum time to wait for a job to finish
         step: Control the polling interval
+        scheduler: Optional[PollScheduler]: Adapt the polling interval to the durations of earlier jobs of the service
+        tracker: Optional[JobTracker]: Register the job as outstanding until it is finished
+        cancel_on_abort: bool: Remove the job from the platform if the wait times out or is interrupted
+        idempotency_key: Optional[str]: Key which identifies the job, a job is submitted only once per key
         : Specify the service name
 
     Returns:
@@ -804,9 +1007,7 @@ def trigger_service_job(
     Doc Author:
         Trelent
     """
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
     try:
         service = get_service(service_name, api_key)
@@ -814,30 +1015,77 @@ def trigger_service_job(
 
         service_definition_id = service["service_definitions"][0]["id"]
 
-        if mode == "DATA_UPLOAD":
-            create_job_request = CreateJobRequest(
-                service_definition_id=service_definition_id,
-                input_data=json.dumps(data),
-                parameters=json.dumps(params),
-                persist_result=True,
-            )
-        elif mode == "DATA_POOL":
-            data_ref = DataPoolRef(**data_ref)
-
-            create_job_request = CreateJobRequest(
-                service_definition_id=service_definition_id,
-                input_data_ref=data_ref,
-                parameters=json.dumps(params),
-                persist_result=True,
+        from openapi_client.model.create_job_request import CreateJobRequest
+        from openapi_client.model.data_pool_ref import DataPoolRef
+
+        input_data = None
+        input_data_ref = data_ref
+        with span("serialize", mode=mode) as serialize:
+            if mode == "DATA_UPLOAD":
+                input_data = json.dumps(data)
+                parameters = json.dumps(params)
+                serialize.set_attribute("payload_size", len(input_data) + len(parameters))
+                create_job_request = CreateJobRequest(
+                    service_definition_id=service_definition_id,
+                    input_data=input_data,
+                    parameters=parameters,
+                    persist_result=True,
+                )
+            elif mode == "DATA_POOL":
+                data_ref = DataPoolRef(**data_ref)
+                parameters = json.dumps(params)
+                serialize.set_attribute("payload_size", len(parameters))
+
+                create_job_request = CreateJobRequest(
+                    service_definition_id=service_definition_id,
+                    input_data_ref=data_ref,
+                    parameters=parameters,
+                    persist_result=True,
+                )
+            else:
+                raise Exception("Invalid mode, allowed modes are: [DATA_UPLOAD, DATA_POOL].")
+
+        if idempotency_key is None:
+            idempotency_key = new_idempotency_key()
+        with span("submit", service_name=service_name) as submit:
+            job_id, submitted = get_ledger().submit(
+                idempotency_key,
+                lambda: _submit_job(
+                    service_jobs_api, create_job_request, service_name, api_key, parameters, input_data, input_data_ref
+                ),
             )
+            submit.set_attribute("job_id", job_id)
+        if submitted:
+            logger.info("Started service job: %s.", job_id)
         else:
-            raise Exception("Invalid mode, allowed modes are: [DATA_UPLOAD, DATA_POOL].")
+            logger.info("Service job: %s already submitted with key: %s.", job_id, idempotency_key)
+        if tracker is not None:
+            tracker.add(job_id)
 
-        job = service_jobs_api.create_job(create_job_request=create_job_request)
-        job_id = job["id"]
-        logger.info("Started service job: %s.", job_id)
-        wait_for_service_job_to_be_finished(job_id, api_key, timeout=timeout, step=step)
-        job = service_jobs_api.get_job(job_id)
+        try:
+            wait_for_service_job_to_be_finished(
+                job_id, api_key, timeout=timeout, step=step, scheduler=scheduler, service_name=service_name
+            )
+        except KeyboardInterrupt:
+            if cancel_on_abort:
+                logger.info("Interrupted, cancel service job: %s.", job_id)
+                remove_service_job(job_id, api_key)
+                if tracker is not None:
+                    tracker.discard(job_id)
+            raise
+
+        with span("fetch_job", job_id=job_id):
+            job = service_jobs_api.get_job(job_id)
+
+        if job["status"] in ["SUCCEEDED", "FAILED", "CANCELLED"]:
+            if tracker is not None:
+                tracker.discard(job_id)
+        elif cancel_on_abort:
+            logger.info("Timeout, cancel service job: %s.", job_id)
+            remove_service_job(job_id, api_key)
+            if tracker is not None:
+                tracker.discard(job_id)
+            raise TimeoutError(f"Service job: {job_id} not finished after {timeout} s, job cancelled.")
         return job
     except Exception as e:
         logger.error("Trigger service job failed.")
@@ -845,6 +1093,41 @@ def trigger_service_job(
         raise e
 
 
+def _submit_job(
+    service_jobs_api: Any,
+    create_job_request: Any,
+    service_name: str,
+    api_key: Dict[str, str],
+    parameters: str,
+    input_data: Optional[str],
+    input_data_ref: Optional[Dict[str, Any]],
+) -> str:
+    # a submission whose response got lost may have created the job, so look for it before submitting again
+    submitted_after = datetime.now(timezone.utc)
+    for attempt in range(1, SUBMIT_ATTEMPTS + 1):
+        try:
+            job = service_jobs_api.create_job(create_job_request=create_job_request)
+            return job["id"]
+        except Exception as e:
+            if attempt == SUBMIT_ATTEMPTS or not is_ambiguous(e):
+                raise e
+            logger.warning("Submission of service job failed: %s, look for the job before submitting again.", e)
+            job = find_submitted_job(
+                get_service_jobs(service_name, api_key),
+                parameters,
+                submitted_after,
+                input_data=input_data,
+                input_data_ref=input_data_ref,
+            )
+            if job is not None:
+                logger.info("Found submitted service job: %s.", job["id"])
+                increment("duplicate_jobs_prevented")
+                return job["id"]
+            increment("job_resubmissions")
+    raise Exception("Submission of service job failed.")
+
+
+@traced("remove_service_job")
 def remove_service_job(job_id: str, api_key: Dict[str, str]) -> bool:
     """
     The remove_service_job function removes a service job from the platform.
@@ -862,9 +1145,7 @@ def remove_service_job(job_id: str, api_key: Dict[str, str]) -> bool:
     """
     logger.debug("Remove service job.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
     try:
         service_jobs_api.delete_job(job_id)
@@ -875,6 +1156,48 @@ def remove_service_job(job_id: str, api_key: Dict[str, str]) -> bool:
         raise e
 
 
+@traced("remove_service_jobs")
+def remove_service_jobs(job_ids: List[str], api_key: Dict[str, str], max_workers: int = 8) -> Dict[str, bool]:
+    """
+    The remove_service_jobs function removes several service jobs concurrently.
+    Running jobs are stopped by removing them, so this is used to cancel abandoned jobs.
+
+    Args:
+        job_ids: List[str]: Identify the jobs to be removed
+        api_key: Dict[str, str]: Pass the api key to the function
+        max_workers: int: Number of jobs removed at the same time, 1 removes them one by one without threads, e.g.
+            in an exit hook
+
+    Returns:
+        A dictionary with True for every removed job id and False for every job which could not be removed
+    """
+    logger.debug("Remove service jobs.")
+
+    def remove(job_id: str) -> bool:
+        try:
+            return remove_service_job(job_id, api_key)
+        except Exception:  # pylint: disable=broad-exception-caught
+            return False
+
+    if len(job_ids) == 0:
+        return {}
+
+    if max_workers <= 1:
+        removed = {job_id: remove(job_id) for job_id in job_ids}
+    else:
+        # the workers use the retry policy of the caller
+        context = copy_context()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(job_ids))) as executor:
+            results = executor.map(lambda job_id: context.copy().run(remove, job_id), job_ids)
+            removed = dict(zip(job_ids, results))
+
+    failed = [job_id for job_id, result in removed.items() if not result]
+    if len(failed) > 0:
+        logger.error("Removing service jobs: %s failed.", failed)
+    return removed
+
+
+@traced("get_service_job_status")
 def get_service_job_status(job_id: str, api_key: Dict[str, str]) -> str:
     """
     The get_service_job_status function returns the status of a service job.
@@ -892,9 +1215,7 @@ def get_service_job_status(job_id: str, api_key: Dict[str, str]) -> str:
     """
     logger.debug("Get service job status.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
     try:
         job = service_jobs_api.get_job(job_id)
@@ -906,6 +1227,7 @@ def get_service_job_status(job_id: str, api_key: Dict[str, str]) -> str:
         raise e
 
 
+@traced("get_service_job_result")
 def get_service_job_result(job_id: str, api_key: Dict[str, str]) -> Dict[str, Any]:
     """
     The get_service_job_result function is used to retrieve the result of a service job.
@@ -923,15 +1245,17 @@ def get_service_job_result(job_id: str, api_key: Dict[str, str]) -> Dict[str, An
     """
     logger.debug("Get service job result.")
 
-    configuration = Configuration(api_key=api_key)
-    api_client = ApiClient(configuration=configuration)
-    service_jobs_api = ServicePlatformJobsApi(api_client=api_client)
+    service_jobs_api = get_jobs_api(api_key)
 
     try:
-        job = service_jobs_api.get_job(job_id)
-        result_string = job["result"]
-        result = json.loads(result_string)
-        result = result["result"]
+        with span("fetch_result", job_id=job_id):
+            job = service_jobs_api.get_job(job_id)
+            result_string = job["result"]
+        if result_string is None:
+            raise Exception(f"Service job: {job_id} has no result, status: {job['status']}.")
+        with span("decode_result", size=len(result_string)):
+            result = json.loads(result_string)
+            result = result["result"]
         logger.debug("Service job result returned.")
         return result
     except Exception as e:
@@ -940,6 +1264,7 @@ def get_service_job_result(job_id: str, api_key: Dict[str, str]) -> Dict[str, An
         raise e
 
 
+@traced("get_application_job_info")
 def get_application_job_info(
     service_name: str, job_id: str, access_token: str, api_key: Dict[str, str]
 ) -> Dict[str, Any]:
@@ -970,8 +1295,9 @@ def get_application_job_info(
             "accept": "application/json",
             "Authorization": f"Bearer {access_token}",
         }
+        inject_trace_headers(headers)
 
-        response = requests.get(service_endpoint, headers=headers, timeout=30)
+        response = send("GET", service_endpoint, headers=headers, timeout=30)
         json_response = response.json()
         return json_response
     except Exception as e:
@@ -980,6 +1306,7 @@ def get_application_job_info(
         raise e
 
 
+@traced("get_application_job_status")
 def get_application_job_status(service_name: str, job_id: str, access_token: str, api_key: Dict[str, str]) -> str:
     """
     The get_application_job_status function is used to get the status of a job.
@@ -1008,8 +1335,9 @@ def get_application_job_status(service_name: str, job_id: str, access_token: str
             "accept": "application/json",
             "Authorization": f"Bearer {access_token}",
         }
+        inject_trace_headers(headers)
 
-        response = requests.get(service_endpoint, headers=headers, timeout=30)
+        response = send("GET", service_endpoint, headers=headers, timeout=30)
         json_response = response.json()
         status = json_response["status"]
         return status
@@ -1019,6 +1347,7 @@ def get_application_job_status(service_name: str, job_id: str, access_token: str
         raise e
 
 
+@traced("get_application_job_result")
 def get_application_job_result(
     service_name: str, job_id: str, access_token: str, api_key: Dict[str, str]
 ) -> Dict[str, Any]:
@@ -1049,8 +1378,9 @@ def get_application_job_result(
             "accept": "application/json",
             "Authorization": f"Bearer {access_token}",
         }
+        inject_trace_headers(headers)
 
-        response = requests.get(service_endpoint, headers=headers, timeout=30)
+        response = send("GET", service_endpoint, headers=headers, timeout=30)
         assert response.status_code in [200, 201, 204]
         json_response = response.json()
         result = json_response["result"]
@@ -1061,6 +1391,7 @@ def get_application_job_result(
         raise e
 
 
+@traced("get_data_pools")
 def get_data_pools(api_key: str) -> List[Dict[str, Any]]:
     """
     The get_data_pools function returns a list of dictionaries containing the data pools.
@@ -1077,11 +1408,11 @@ def get_data_pools(api_key: str) -> List[Dict[str, Any]]:
     logger.debug("Get data pools.")
 
     try:
-        url = "https://platform.planqk.de/qc-catalog/data-pools"
+        url = get_data_pools_url()
 
         headers = {"Content-Type": "application/json", "X-Auth-Token": api_key}
 
-        response = requests.get(url, headers=headers, timeout=30)
+        response = send("GET", url, headers=headers, timeout=30)
         assert response.status_code in [200, 201, 204]
         data_pools = response.json()["content"]
         return data_pools
@@ -1091,6 +1422,7 @@ def get_data_pools(api_key: str) -> List[Dict[str, Any]]:
         raise e
 
 
+@traced("create_data_pool")
 def create_data_pool(data_pool_name: str, api_key: str) -> Dict[str, Any]:
     """
     The create_data_pool function creates a data pool on the PlanQK platform.
@@ -1108,13 +1440,13 @@ def create_data_pool(data_pool_name: str, api_key: str) -> Dict[str, Any]:
     logger.debug("Create data pool.")
 
     try:
-        url = "https://platform.planqk.de/qc-catalog/data-pools"
+        url = get_data_pools_url()
 
         headers = {"Content-Type": "application/json", "X-Auth-Token": api_key}
 
         data = {"name": data_pool_name}
 
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = send("POST", url, headers=headers, json=data, timeout=30)
         assert response.status_code in [200, 201, 204]
         data_pool = response.json()
         return data_pool
@@ -1124,6 +1456,7 @@ def create_data_pool(data_pool_name: str, api_key: str) -> Dict[str, Any]:
         raise e
 
 
+@traced("get_data_pool")
 def get_data_pool(data_pool_name: str, api_key: str) -> Optional[Dict[str, str]]:
     """
     The get_data_pool function takes a data pool name and an API key as input.
@@ -1162,6 +1495,7 @@ def get_data_pool(data_pool_name: str, api_key: str) -> Optional[Dict[str, str]]
         raise e
 
 
+@traced("remove_data_pool")
 def remove_data_pool(data_pool_name: str, api_key: str) -> bool:
     """
     The remove_data_pool function removes a data pool from the PlanQK platform.
@@ -1185,9 +1519,9 @@ def remove_data_pool(data_pool_name: str, api_key: str) -> bool:
         assert data_pool is not None
 
         data_pool_id = data_pool["id"]
-        url = f"https://platform.planqk.de/qc-catalog/data-pools/{data_pool_id}"
+        url = f"{get_data_pools_url()}/{data_pool_id}"
 
-        response = requests.delete(url, headers=headers, timeout=30)
+        response = send("DELETE", url, headers=headers, timeout=30)
         result = response.status_code in [200, 201, 204]
         return result
     except Exception as e:
@@ -1196,6 +1530,7 @@ def remove_data_pool(data_pool_name: str, api_key: str) -> bool:
         raise e
 
 
+@traced("get_data_pool_file_information")
 def get_data_pool_file_information(data_pool_name: str, api_key: str) -> Dict[str, Any]:
     """
     The get_data_pool_file_information function returns a dictionary of dictionaries containing information about the files in a data pool.
@@ -1219,11 +1554,11 @@ def get_data_pool_file_information(data_pool_name: str, api_key: str) -> Dict[st
         assert data_pool is not None
         data_pool_id = data_pool["id"]
 
-        url = f"https://platform.planqk.de/qc-catalog/data-pools/{data_pool_id}/data-source-descriptors"
+        url = f"{get_data_pools_url()}/{data_pool_id}/data-source-descriptors"
 
         headers = {"Content-Type": "application/json", "X-Auth-Token": api_key}
 
-        response = requests.get(url, headers=headers, timeout=30)
+        response = send("GET", url, headers=headers, timeout=30)
         assert response.status_code in [200, 201, 204]
         response_json = response.json()
 
@@ -1242,6 +1577,7 @@ def get_data_pool_file_information(data_pool_name: str, api_key: str) -> Dict[st
         raise e
 
 
+@traced("add_data_to_data_pool")
 def add_data_to_data_pool(data_pool_name: str, file, api_key: str) -> bool:
     """
     The add_data_to_data_pool function adds a data source to the specified data pool.
@@ -1269,13 +1605,13 @@ def add_data_to_data_pool(data_pool_name: str, file, api_key: str) -> bool:
         assert data_pool is not None
         data_pool_id = data_pool["id"]
 
-        url = f"https://platform.planqk.de/qc-catalog/data-pools/{data_pool_id}/data-source-descriptors"
+        url = f"{get_data_pools_url()}/{data_pool_id}/data-source-descriptors"
 
         headers = {"X-Auth-Token": api_key}
 
         files = {"file": file}
 
-        response = requests.post(url, headers=headers, files=files, timeout=30)
+        response = send("POST", url, headers=headers, files=files, timeout=30)
         result = response.status_code in [200, 201, 204]
         return result
     except Exception as e:
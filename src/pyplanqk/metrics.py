@@ -0,0 +1,86 @@
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+_LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_counters: "Counter[_LabelKey]" = Counter()
+_gauges: Dict[_LabelKey, float] = {}
+_lock = threading.Lock()
+
+
+def _key(name: str, labels: Dict[str, str]) -> _LabelKey:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels: str):
+    """
+    The increment function adds a value to a counter of pyplanqk.
+
+    Args:
+        name: str: Name of the counter, e.g. "retries"
+        value: float: Value to add
+        **labels: str: Labels of the counter, e.g. method="GET"
+    """
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def get_counter(name: str, **labels: str) -> float:
+    """
+    The get_counter function returns the value of a counter.
+
+    Without labels the values of all label combinations of the counter are added up.
+
+    Args:
+        name: str: Name of the counter
+        **labels: str: Labels of the counter
+
+    Returns:
+        The value of the counter
+    """
+    with _lock:
+        if len(labels) == 0:
+            return sum(value for (counter_name, _), value in _counters.items() if counter_name == name)
+        return _counters.get(_key(name, labels), 0)
+
+
+def set_gauge(name: str, value: float, **labels: str):
+    """
+    The set_gauge function sets a gauge of pyplanqk to the current value, e.g. the state of a circuit breaker.
+
+    Args:
+        name: str: Name of the gauge
+        value: float: Current value
+        **labels: str: Labels of the gauge
+    """
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def get_gauge(name: str, **labels: str) -> Optional[float]:
+    with _lock:
+        return _gauges.get(_key(name, labels))
+
+
+def get_metrics() -> Dict[str, float]:
+    """
+    The get_metrics function returns all counters and gauges in the form name{label="value"}.
+
+    Returns:
+        A dictionary with the values of the counters and gauges
+    """
+    with _lock:
+        items = sorted(list(_counters.items()) + list(_gauges.items()))
+    metrics = {}
+    for (name, labels), value in items:
+        if len(labels) > 0:
+            name = name + "{" + ",".join(f'{key}="{label}"' for key, label in labels) + "}"
+        metrics[name] = value
+    return metrics
+
+
+def reset_metrics():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
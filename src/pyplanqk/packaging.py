@@ -0,0 +1,296 @@
+import fnmatch
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_FORMAT = "1"
+IGNORE_FILE = ".planqkignore"
+DEFAULT_IGNORE = [
+    "__pycache__/",
+    "*.pyc",
+    ".ipynb_checkpoints/",
+    ".git/",
+    ".venv/",
+    ".idea/",
+    ".pytest_cache/",
+    "*.egg-info/",
+    ".DS_Store",
+    IGNORE_FILE,
+]
+CHUNK_SIZE = 1024 * 1024
+# every entry gets the earliest timestamp a zip file can hold, 1980-01-01 00:00:00
+ZIP_TIME = 0
+ZIP_DATE = (1 << 5) | 1
+ZIP_VERSION = 20
+UTF8_FLAG = 0x800
+MAX_ZIP_SIZE = 0xFFFFFFFF
+
+
+def get_cache_dir() -> str:
+    """
+    The get_cache_dir function returns the directory of the packaged user code.
+
+    The environment variable PYPLANQK_CACHE_DIR is used first, then ~/.cache/pyplanqk.
+
+    Returns:
+        The directory of the cached packages
+    """
+    cache_dir = os.getenv("PYPLANQK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pyplanqk"))
+    return os.path.join(cache_dir, "packages")
+
+
+def read_ignore_patterns(source_dir: str) -> List[str]:
+    """
+    The read_ignore_patterns function returns the default ignore patterns and the patterns of the .planqkignore file.
+
+    Args:
+        source_dir: str: Directory of the user code
+
+    Returns:
+        A list of glob patterns, patterns ending with / match directories
+    """
+    patterns = list(DEFAULT_IGNORE)
+    path = os.path.join(source_dir, IGNORE_FILE)
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line != "" and not line.startswith("#"):
+                    patterns.append(line)
+    return patterns
+
+
+def _is_ignored(relative_path: str, is_dir: bool, patterns: List[str]) -> bool:
+    name = relative_path.rsplit("/", 1)[-1]
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            if not is_dir:
+                continue
+            pattern = pattern[:-1]
+        target = relative_path if "/" in pattern else name
+        if fnmatch.fnmatchcase(target, pattern.lstrip("/")):
+            return True
+    return False
+
+
+def list_files(source_dir: str, ignore: Optional[List[str]] = None) -> List[str]:
+    """
+    The list_files function returns the files of the user code which are packaged, in a stable order.
+
+    Args:
+        source_dir: str: Directory of the user code
+        ignore: Optional[List[str]]: Ignore patterns, the defaults and the .planqkignore file if not given
+
+    Returns:
+        A sorted list of paths relative to the source directory with / as separator
+    """
+    if ignore is None:
+        ignore = read_ignore_patterns(source_dir)
+
+    files = []
+    for root, dirs, names in os.walk(source_dir):
+        relative_root = os.path.relpath(root, source_dir).replace(os.sep, "/")
+        relative_root = "" if relative_root == "." else relative_root + "/"
+        dirs[:] = [name for name in dirs if not _is_ignored(relative_root + name, True, ignore)]
+        for name in names:
+            if not _is_ignored(relative_root + name, False, ignore):
+                files.append(relative_root + name)
+    return sorted(files)
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _file_mode(path: str) -> int:
+    # only the executable bit is kept, so the archive does not depend on the umask of the machine
+    if os.stat(path).st_mode & 0o100:
+        return 0o100755
+    return 0o100644
+
+
+def get_source_hash(source_dir: str, files: List[str], compresslevel: int, max_workers: int) -> str:
+    """
+    The get_source_hash function computes the hash of the packaged files, their modes and the compression level.
+
+    Args:
+        source_dir: str: Directory of the user code
+        files: List[str]: Files as returned by list_files
+        compresslevel: int: Compression level of the archive
+        max_workers: int: Number of files hashed at the same time
+
+    Returns:
+        The sha256 hash as hex string
+    """
+    paths = [os.path.join(source_dir, *name.split("/")) for name in files]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        hashes = list(executor.map(_hash_file, paths))
+
+    hasher = hashlib.sha256(f"format={PACKAGE_FORMAT};level={compresslevel};".encode("utf-8"))
+    for name, path, file_hash in zip(files, paths, hashes):
+        hasher.update(f"{name}\0{_file_mode(path):o}\0{file_hash}\n".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _compress_file(path: str, compresslevel: int) -> Tuple[int, int, int, bytes]:
+    with open(path, "rb") as f:
+        content = f.read()
+    crc = zlib.crc32(content)
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    compressed = compressor.compress(content) + compressor.flush()
+    # content which does not get smaller, e.g. images or archives, is stored as it is
+    if len(compressed) >= len(content):
+        return 0, crc, len(content), content
+    return 8, crc, len(content), compressed
+
+
+def _write_archive(source_dir: str, files: List[str], target: str, compresslevel: int, max_workers: int) -> None:
+    entries = []
+    offset = 0
+    with open(target, "wb") as out, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Deque[Tuple[str, str, Future]] = deque()
+        names = iter(files)
+
+        def submit_next():
+            name = next(names, None)
+            if name is not None:
+                path = os.path.join(source_dir, *name.split("/"))
+                pending.append((name, path, executor.submit(_compress_file, path, compresslevel)))
+
+        # files are compressed in parallel but written in order, at most 2 * max_workers are kept in memory
+        for _ in range(2 * max_workers):
+            submit_next()
+        while len(pending) > 0:
+            name, path, future = pending.popleft()
+            method, crc, size, content = future.result()
+            submit_next()
+
+            encoded_name = name.encode("utf-8")
+            if offset + len(content) > MAX_ZIP_SIZE or size > MAX_ZIP_SIZE:
+                raise Exception("User code exceeds 4 GB, which is not supported.")
+            header = struct.pack(
+                "<IHHHHHIIIHH",
+                0x04034B50,
+                ZIP_VERSION,
+                UTF8_FLAG,
+                method,
+                ZIP_TIME,
+                ZIP_DATE,
+                crc,
+                len(content),
+                size,
+                len(encoded_name),
+                0,
+            )
+            out.write(header)
+            out.write(encoded_name)
+            out.write(content)
+            entries.append((encoded_name, method, crc, len(content), size, _file_mode(path), offset))
+            offset += len(header) + len(encoded_name) + len(content)
+
+        directory_offset = offset
+        for encoded_name, method, crc, compressed_size, size, mode, header_offset in entries:
+            header = struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50,
+                (3 << 8) | ZIP_VERSION,
+                ZIP_VERSION,
+                UTF8_FLAG,
+                method,
+                ZIP_TIME,
+                ZIP_DATE,
+                crc,
+                compressed_size,
+                size,
+                len(encoded_name),
+                0,
+                0,
+                0,
+                0,
+                mode << 16,
+                header_offset,
+            )
+            out.write(header)
+            out.write(encoded_name)
+            offset += len(header) + len(encoded_name)
+        out.write(
+            struct.pack(
+                "<IHHHHIIH", 0x06054B50, 0, 0, len(entries), len(entries), offset - directory_offset, directory_offset, 0
+            )
+        )
+
+
+def package_user_code(
+    source_dir: str,
+    output: Optional[str] = None,
+    ignore: Optional[List[str]] = None,
+    cache_dir: Optional[str] = None,
+    compresslevel: int = 6,
+    max_workers: Optional[int] = None,
+) -> str:
+    """
+    The package_user_code function builds the user_code archive of a service from a source directory.
+    The archive is deterministic: the files are sorted, all timestamps are the same and only the executable bit of the
+    file modes is kept, so the same source always gives a byte identical archive. Archives are cached by the hash of
+    their content, packaging unchanged source again only hashes the files.
+
+    Args:
+        source_dir: str: Directory of the user code, e.g. with src/program.py for the PYTHON_TEMPLATE runtime
+        output: Optional[str]: Path the archive is copied to, the path in the cache is returned if not given
+        ignore: Optional[List[str]]: Ignore patterns, the defaults and the .planqkignore file if not given
+        cache_dir: Optional[str]: Directory of the cached archives, see get_cache_dir
+        compresslevel: int: Compression level of the files from 0 to 9
+        max_workers: int: Number of files compressed at the same time, the number of cpus if not given
+
+    Returns:
+        The path of the archive
+    """
+    logger.debug("Package user code: %s.", source_dir)
+
+    try:
+        if not os.path.isdir(source_dir):
+            raise Exception(f"Source directory: {source_dir} not found.")
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+
+        files = list_files(source_dir, ignore)
+        source_hash = get_source_hash(source_dir, files, compresslevel, max_workers)
+        path = os.path.join(cache_dir, f"{source_hash}.zip")
+        if os.path.isfile(path):
+            logger.debug("User code: %s unchanged, use cached archive.", source_dir)
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            # write to a temporary file first, so concurrent packagers never see a partial archive
+            descriptor, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            os.close(descriptor)
+            try:
+                _write_archive(source_dir, files, temporary, compresslevel, max_workers)
+                os.replace(temporary, path)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+            logger.debug("Packaged %d files of user code: %s.", len(files), source_dir)
+
+        if output is not None:
+            shutil.copyfile(path, output)
+            return output
+        return path
+    except Exception as e:
+        logger.error("Packaging of user code: %s failed.", source_dir)
+        logger.error(e)
+        raise e
@@ -0,0 +1,108 @@
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pyplanqk.analytics import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """
+    Chooses the time between two status polls from the durations of earlier jobs and builds.
+
+    Without history the given default step is used. With history the scheduler sleeps until the shortest usual
+    duration, polls every min_step until the longest usual duration and backs off afterwards.
+    Durations are kept per kind (job or build) and name (service name), a name without history falls back to the
+    durations of all names of the kind.
+
+    Args:
+        min_step (float): shortest time between two polls in seconds
+        max_step (float): longest time between two polls in seconds
+        history (int): number of durations kept per name
+        early_percentile (float): percentile of the durations where the fast polling starts
+        late_percentile (float): percentile of the durations where the fast polling ends
+    """
+
+    def __init__(
+        self,
+        min_step: float = 0.25,
+        max_step: float = 30.0,
+        history: int = 50,
+        early_percentile: float = 10,
+        late_percentile: float = 90,
+    ):
+        self.min_step = min_step
+        self.max_step = max_step
+        self.history = history
+        self.early_percentile = early_percentile
+        self.late_percentile = late_percentile
+        self.durations: Dict[Tuple[str, Optional[str]], Deque[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, kind: str, name: str, duration: float):
+        """
+        The observe function adds the duration of a finished job or build to the history.
+
+        Args:
+            kind: str: Kind of the awaited operation, job or build
+            name: str: Name of the service
+            duration: float: Seconds from the start of the wait until the final status was seen
+        """
+        with self.lock:
+            keys = [((kind, name), self.history)]
+            if name is not None:
+                # the durations of all services, used for services without history
+                keys.append(((kind, None), self.history * 4))
+            for key, size in keys:
+                if key not in self.durations:
+                    self.durations[key] = deque(maxlen=size)
+                self.durations[key].append(duration)
+
+    def seed(self, kind: str, name: str, timings: List[Dict[str, Any]]):
+        """
+        The seed function fills the history from job timings reported by the platform.
+
+        Args:
+            kind: str: Kind of the awaited operation, job or build
+            name: str: Name of the service
+            timings: List[Dict[str, Any]]: Job timings as returned by get_service_job_timings
+        """
+        for timing in timings:
+            if timing.get("status") == "SUCCEEDED" and timing.get("total_time") is not None:
+                self.observe(kind, name, timing["total_time"])
+
+    def get_durations(self, kind: str, name: Optional[str]) -> List[float]:
+        with self.lock:
+            durations = self.durations.get((kind, name))
+            if durations is None or len(durations) == 0:
+                durations = self.durations.get((kind, None), [])
+            return list(durations)
+
+    def next_step(self, kind: str, name: str, elapsed: float, default_step: float) -> float:
+        """
+        The next_step function returns the time to sleep before the next poll.
+
+        Args:
+            kind: str: Kind of the awaited operation, job or build
+            name: str: Name of the service
+            elapsed: float: Seconds since the wait started
+            default_step: float: Step used as long as there is no history
+
+        Returns:
+            The time to sleep in seconds
+        """
+        durations = self.get_durations(kind, name)
+        if len(durations) == 0:
+            return default_step
+
+        early = percentile(durations, self.early_percentile)
+        late = percentile(durations, self.late_percentile)
+        if elapsed < early:
+            step = early - elapsed
+        elif elapsed <= late:
+            step = self.min_step
+        else:
+            step = (elapsed - late) / 2
+        return min(max(step, self.min_step), self.max_step)
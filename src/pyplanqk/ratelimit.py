@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from pyplanqk.circuit import get_family
+from pyplanqk.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+RATE_CLASSES = ["job_creation", "status_reads", "listings", "uploads", "other"]
+
+LISTING_SEGMENTS = ("services", "jobs", "executions", "apps", "applications", "subscriptions", "data-pools")
+
+
+def get_rate_class(method: str, url: str) -> str:
+    """
+    The get_rate_class function returns the rate limit class of a platform request.
+
+    Args:
+        method: str: Http method
+        url: str: Url of the request
+
+    Returns:
+        One of job_creation, status_reads, listings, uploads or other
+    """
+    method = method.upper()
+    family = get_family(url)
+    segments = [segment for segment in urlsplit(url).path.split("/") if segment != ""]
+    last = segments[-1] if len(segments) > 0 else ""
+    if method == "POST" and family in ["jobs", "gateway"] and last != "cancel":
+        return "job_creation"
+    if (method == "POST" and family == "services" and last == "services") or method == "PUT":
+        return "uploads"
+    if method == "POST" and last == "data-source-descriptors":
+        return "uploads"
+    if method == "GET" and family != "token":
+        if last in LISTING_SEGMENTS or last == "data-source-descriptors":
+            return "listings"
+        return "status_reads"
+    return "other"
+
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average and bursts of up to capacity requests.
+
+    Callers which exceed the rate borrow tokens and wait until their token has been refilled, so waiting callers are
+    served in the order they arrived.
+
+    Args:
+        rate (float): tokens added per second
+        capacity (float): maximum number of tokens
+        clock (callable): monotonic clock, replaceable in tests
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        The reserve function takes a token and returns the time to wait until it may be used.
+
+        Returns:
+            The wait time in seconds
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state is kept in a file, so all processes using the same file share the rate.
+
+    The file is locked with fcntl, so it is only available on POSIX systems.
+
+    Args:
+        path (str): file with the state of the bucket, created if it does not exist
+        rate (float): tokens added per second
+        capacity (float): maximum number of tokens
+    """
+
+    def __init__(self, path: str, rate: float, capacity: float):
+        super().__init__(rate, capacity, clock=time.time)
+        self.path = path
+
+    def reserve(self) -> float:
+        import fcntl  # pylint: disable=import-outside-toplevel
+
+        with self.lock, open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                state = json.loads(content) if content != "" else {"tokens": self.capacity, "updated": self.clock()}
+                now = self.clock()
+                tokens = min(self.capacity, state["tokens"] + (now - state["updated"]) * self.rate) - 1
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"tokens": tokens, "updated": now}))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        if tokens >= 0:
+            return 0.0
+        return -tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Limits the requests of a client per rate limit class with a token bucket per class.
+
+    The classes are job_creation, status_reads, listings, uploads and other. Classes without a limit are not limited.
+    With shared_directory the buckets are kept in files of the directory and shared by all processes using it.
+
+    Args:
+        limits (dict): requests per second and burst size per class, e.g. {"job_creation": (5, 10)}
+        shared_directory (str): directory for the bucket files shared by processes, None to share between threads only
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], shared_directory: Optional[str] = None):
+        unknown = set(limits) - set(RATE_CLASSES)
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown rate limit classes: {sorted(unknown)}, allowed are: {RATE_CLASSES}.")
+        self.buckets: Dict[str, TokenBucket] = {}
+        for rate_class, (rate, capacity) in limits.items():
+            if shared_directory is None:
+                self.buckets[rate_class] = TokenBucket(rate, capacity)
+            else:
+                os.makedirs(shared_directory, exist_ok=True)
+                path = os.path.join(shared_directory, f"{rate_class}.json")
+                self.buckets[rate_class] = FileTokenBucket(path, rate, capacity)
+
+    def acquire(self, method: str, url: str) -> float:
+        """
+        The acquire function waits until the request may be sent.
+
+        Args:
+            method: str: Http method
+            url: str: Url of the request
+
+        Returns:
+            The time waited in seconds
+        """
+        rate_class = get_rate_class(method, url)
+        bucket = self.buckets.get(rate_class)
+        if bucket is None:
+            return 0.0
+        wait = bucket.reserve()
+        if wait > 0:
+            increment("rate_limited_requests", rate_class=rate_class)
+            increment("rate_limit_wait_seconds", wait, rate_class=rate_class)
+            time.sleep(wait)
+        return wait
+
+
+_current_limiter: ContextVar[Optional[RateLimiter]] = ContextVar("pyplanqk_rate_limiter", default=None)
+
+
+@contextmanager
+def use_rate_limiter(limiter: Optional[RateLimiter]) -> Iterator[Optional[RateLimiter]]:
+    """
+    The use_rate_limiter function limits the requests of the calls inside the with block.
+
+    Args:
+        limiter: Optional[RateLimiter]: Rate limiter, None to keep the current one
+
+    Returns:
+        The rate limiter used in the with block
+    """
+    if limiter is None:
+        yield _current_limiter.get()
+        return
+    token = _current_limiter.set(limiter)
+    try:
+        yield limiter
+    finally:
+        _current_limiter.reset(token)
+
+
+def send_with_rate_limit(send: Callable, method: str, url: str, **kwargs) -> Any:
+    """
+    The send_with_rate_limit function waits for the rate limiter of the current client and sends the request.
+
+    Args:
+        send: Callable: Function which sends the request
+        method: str: Http method
+        url: str: Url of the request
+        **kwargs: Arguments of requests.request
+
+    Returns:
+        The response
+    """
+    limiter = _current_limiter.get()
+    if limiter is not None:
+        limiter.acquire(method, url)
+    return send(method, url, **kwargs)
@@ -0,0 +1,462 @@
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pyplanqk.clients import get_applications_api, get_services_api
+from pyplanqk.concurrency import run_graph
+from pyplanqk.deployment import add_content_hash, get_content_hash, read_content_hash
+from pyplanqk.helpers import FINAL_BUILD_STATUSES, wait_for_service_to_be_created
+from pyplanqk.low_level_actions import (
+    ServiceUpdateNotSupportedError,
+    create_application,
+    create_data_pool,
+    create_managed_service,
+    get_build_status,
+    get_data_pools,
+    get_service_version,
+    get_services,
+    recreate_managed_service,
+    update_managed_service,
+)
+from pyplanqk.packaging import package_user_code
+from pyplanqk.polling import PollScheduler
+from pyplanqk.settings import get_data_pools_url
+from pyplanqk.teardown import get_field
+from pyplanqk.tracing import current_span, traced
+from pyplanqk.transport import send
+
+logger = logging.getLogger(__name__)
+
+# keys of a service in the spec which are not part of the configuration of the service
+SERVICE_OPTIONS = ["published"]
+
+
+def _change(action: str, name: str, depends_on: Optional[List[str]] = None, **args) -> Dict[str, Any]:
+    return {"key": f"{action}:{name}", "action": action, "name": name, "depends_on": depends_on or [], "args": args}
+
+
+def _get_file_name(file: Any) -> str:
+    name = file if isinstance(file, (str, os.PathLike)) else file.name
+    return os.path.basename(os.fspath(name))
+
+
+@contextmanager
+def _open_user_code(config: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # user code given as path is uploaded from the file, opened files are rewound so the spec can be planned again
+    positions = {key: config[key].tell() for key in ["user_code", "api_definition"] if hasattr(config.get(key), "seek")}
+    try:
+        if isinstance(config.get("user_code"), (str, os.PathLike)):
+            with open(config["user_code"], "rb") as user_code:
+                yield dict(config, user_code=user_code)
+        else:
+            yield config
+    finally:
+        for key, position in positions.items():
+            config[key].seek(position)
+
+
+def _run_all(tasks: Dict[str, Callable[[], Any]], max_workers: int) -> Dict[str, Any]:
+    outcomes = run_graph(tasks, {}, max_workers=max_workers) if len(tasks) > 0 else {}
+    for outcome in outcomes.values():
+        if outcome["error"] is not None:
+            raise outcome["error"]
+    return {key: outcome["result"] for key, outcome in outcomes.items()}
+
+
+def _get_data_pool_file_names(data_pool_id: str, api_key: Dict[str, str]) -> List[str]:
+    headers = {"Content-Type": "application/json", "X-Auth-Token": api_key["apiKey"]}
+    url = f"{get_data_pools_url()}/{data_pool_id}/data-source-descriptors"
+    response = send("GET", url, headers=headers, timeout=30)
+    assert response.status_code in [200, 201, 204]
+    return [entry["files"][0]["name"] for entry in response.json()]
+
+
+def _read_build_status(service: Dict[str, Any], content_hash: str, api_key: Dict[str, str]) -> Optional[str]:
+    # the description is read by id, None if the code changed
+    version = get_service_version(service["id"], service["service_definitions"][0]["id"], api_key)
+    if read_content_hash(version.get("description")) != content_hash:
+        return None
+    # the code is unchanged, but the last build may have failed
+    return get_build_status(service["id"], version["id"], api_key)
+
+
+def _read_state(spec: Dict[str, Any], api_key: Dict[str, str], max_workers: int) -> Dict[str, Any]:
+    # the listings are read at once, then the details of the resources in the spec
+    services_api = get_services_api(api_key)
+    applications_api = get_applications_api(api_key)
+
+    listings: Dict[str, Callable[[], Any]] = {}
+    if len(spec.get("services", [])) > 0 or len(spec.get("applications", [])) > 0:
+        listings["services"] = lambda: get_services(api_key)
+    if len(spec.get("applications", [])) > 0:
+        listings["applications"] = applications_api.get_applications
+    if len(spec.get("data_pools", [])) > 0:
+        listings["data_pools"] = lambda: get_data_pools(api_key["apiKey"])
+    listed = _run_all(listings, max_workers)
+
+    state: Dict[str, Any] = {
+        "services": {service["name"]: service for service in listed.get("services", [])},
+        "applications": {application["name"]: application for application in listed.get("applications", [])},
+        "data_pools": {data_pool["name"]: data_pool for data_pool in listed.get("data_pools", [])},
+        "configs": {},
+        "content_hashes": {},
+        "build_statuses": {},
+        "subscriptions": {},
+        "files": {},
+    }
+
+    details: Dict[str, Callable[[], Any]] = {}
+    for spec_config in spec.get("services", []):
+        config = {key: value for key, value in spec_config.items() if key not in SERVICE_OPTIONS}
+        if isinstance(config.get("user_code"), (str, os.PathLike)):
+            config["user_code"] = package_user_code(os.fspath(config["user_code"]))
+        state["configs"][config["name"]] = config
+        service = state["services"].get(config["name"])
+        with _open_user_code(config) as opened:
+            state["content_hashes"][config["name"]] = get_content_hash(opened)
+        if service is not None:
+            content_hash = state["content_hashes"][config["name"]]
+            details[f"build_status:{config['name']}"] = lambda service=service, content_hash=content_hash: (
+                _read_build_status(service, content_hash, api_key)
+            )
+    for application_spec in spec.get("applications", []):
+        application = state["applications"].get(application_spec["name"])
+        if application is not None:
+            details[f"subscriptions:{application_spec['name']}"] = lambda application=application: (
+                applications_api.get_application_subscriptions(application["id"])
+            )
+    for data_pool_spec in spec.get("data_pools", []):
+        data_pool = state["data_pools"].get(data_pool_spec["name"])
+        if data_pool is not None:
+            details[f"files:{data_pool_spec['name']}"] = lambda data_pool=data_pool: _get_data_pool_file_names(
+                data_pool["id"], api_key
+            )
+
+    for key, result in _run_all(details, max_workers).items():
+        kind, name = key.split(":", 1)
+        state[{"build_status": "build_statuses"}.get(kind, kind)][name] = result
+    return state
+
+
+def _plan_applications(spec: Dict[str, Any], state: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+    # returns the changes and the keys of the removed subscriptions of every service
+    changes: List[Dict[str, Any]] = []
+    service_names = {service["id"]: name for name, service in state["services"].items()}
+    unsubscribed: Dict[str, List[str]] = {}
+
+    for application_spec in spec.get("applications", []):
+        application_name = application_spec["name"]
+        application = state["applications"].get(application_name)
+        application_id = None if application is None else application["id"]
+        if application is None:
+            changes.append(_change("create_application", application_name))
+
+        subscribed = set()
+        for subscription in state["subscriptions"].get(application_name, []):
+            service_name = service_names.get(get_field(subscription, "service_id", "serviceId"))
+            subscribed.add(service_name)
+            if service_name is not None and service_name not in application_spec.get("subscriptions", []):
+                name = f"{application_name}/{service_name}"
+                changes.append(
+                    _change("unsubscribe", name, application_id=application_id, subscription_id=subscription["id"])
+                )
+                unsubscribed.setdefault(service_name, []).append(f"unsubscribe:{name}")
+
+        for service_name in application_spec.get("subscriptions", []):
+            if service_name in subscribed:
+                continue
+            service = state["services"].get(service_name)
+            if service is None and service_name not in state["configs"]:
+                raise Exception(f"Service: {service_name} of application: {application_name} does not exist.")
+            depends_on = [
+                f"create_application:{application_name}",
+                f"create_service:{service_name}",
+                f"publish_service:{service_name}",
+            ]
+            changes.append(
+                _change(
+                    "subscribe",
+                    f"{application_name}/{service_name}",
+                    depends_on,
+                    application_name=application_name,
+                    service_name=service_name,
+                    application_id=application_id,
+                    service_id=None if service is None else service["id"],
+                )
+            )
+    return changes, unsubscribed
+
+
+def _plan_services(
+    spec: Dict[str, Any], state: Dict[str, Any], unsubscribed: Dict[str, List[str]]
+) -> List[Dict[str, Any]]:
+    changes: List[Dict[str, Any]] = []
+    for spec_config in spec.get("services", []):
+        service_name = spec_config["name"]
+        config = state["configs"][service_name]
+        content_hash = state["content_hashes"][service_name]
+        service = state["services"].get(service_name)
+        lifecycle = None
+        ids: Dict[str, Any] = {}
+        if service is None:
+            changes.append(_change("create_service", service_name, config=config, content_hash=content_hash))
+        else:
+            version = service["service_definitions"][0]
+            lifecycle = version["lifecycle"]
+            ids = {"service_id": service["id"], "version_id": version["id"]}
+            build_status = state["build_statuses"].get(service_name)
+            if build_status is None or build_status in ["FAILED", "CANCELLED"]:
+                changes.append(
+                    _change(
+                        "update_service",
+                        service_name,
+                        config=config,
+                        content_hash=content_hash,
+                        republish=lifecycle != "CREATED" and spec_config.get("published") is not False,
+                        **ids,
+                    )
+                )
+            elif build_status not in FINAL_BUILD_STATUSES:
+                changes.append(_change("wait_for_build", service_name, **ids))
+
+        published = spec_config.get("published")
+        if published and lifecycle in [None, "CREATED"]:
+            depends_on = [
+                f"create_service:{service_name}",
+                f"update_service:{service_name}",
+                f"wait_for_build:{service_name}",
+            ]
+            changes.append(_change("publish_service", service_name, depends_on, **ids))
+        elif published is False and lifecycle not in [None, "CREATED"]:
+            depends_on = unsubscribed.get(service_name, []) + [f"update_service:{service_name}"]
+            changes.append(_change("unpublish_service", service_name, depends_on, **ids))
+    return changes
+
+
+def _plan_data_pools(spec: Dict[str, Any], state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    changes: List[Dict[str, Any]] = []
+    for data_pool_spec in spec.get("data_pools", []):
+        data_pool_name = data_pool_spec["name"]
+        data_pool = state["data_pools"].get(data_pool_name)
+        if data_pool is None:
+            changes.append(_change("create_data_pool", data_pool_name))
+        existing_files = state["files"].get(data_pool_name, [])
+        for file in data_pool_spec.get("files", []):
+            if _get_file_name(file) in existing_files:
+                continue
+            changes.append(
+                _change(
+                    "add_data",
+                    f"{data_pool_name}/{_get_file_name(file)}",
+                    [f"create_data_pool:{data_pool_name}"],
+                    data_pool_name=data_pool_name,
+                    data_pool_id=None if data_pool is None else data_pool["id"],
+                    file=file,
+                )
+            )
+    return changes
+
+
+@traced("plan")
+def plan(spec: Dict[str, Any], api_key: Dict[str, str], max_workers: int = 8) -> List[Dict[str, Any]]:
+    """
+    The plan function compares a declarative spec with the platform and returns the changes which make them match.
+    The platform is read in one pass: the listings of the services, applications and data pools, then the versions,
+    build status, subscriptions and files of the resources in the spec concurrently. Resources which are not in the
+    spec are left as they are, see teardown to remove them.
+
+    The spec is a dictionary with the optional keys:
+        services: configurations as for create_service, with the optional key published (True or False)
+        applications: dictionaries with a name and the names of the services it subscribes to in subscriptions
+        data_pools: dictionaries with a name and files, opened files or paths
+
+    A service is updated when the hash of its user code and api definition changed or its last build failed. The hash
+    is read from the version of the service by id. On platforms without in-place updates apply creates the service
+    again with a new id and publishes it if it was published, the next plan subscribes the applications again.
+    Subscriptions of the applications to services which are not in their subscriptions are removed.
+
+    Args:
+        spec: Dict[str, Any]: Desired state of the resources
+        api_key: Dict[str, str]: Pass the api key to the function
+        max_workers: int: Number of requests sent at the same time
+
+    Returns:
+        A list of changes, dictionaries with the keys key, action, name, depends_on and args, passed to apply.
+        The args hold the ids of the existing resources, so apply does not look them up again
+    """
+    logger.debug("Plan.")
+
+    try:
+        state = _read_state(spec, api_key, max_workers)
+    except Exception as e:
+        logger.error("Plan failed.")
+        logger.error(e)
+        raise e
+
+    application_changes, unsubscribed = _plan_applications(spec, state)
+    changes = _plan_services(spec, state, unsubscribed) + application_changes + _plan_data_pools(spec, state)
+
+    for change in changes:
+        logger.info("Planned change: %s.", change["key"])
+    current_span().set_attribute("changes", len(changes))
+    return changes
+
+
+class _Applier:
+    # runs the actions of the changes, the ids of created resources are passed on to the dependent changes
+
+    def __init__(self, api_key: Dict[str, str], timeout: int, scheduler: Optional[PollScheduler]):
+        self.api_key = api_key
+        self.ids: Dict[str, Any] = {}
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.services_api = get_services_api(api_key)
+        self.applications_api = get_applications_api(api_key)
+
+    def _get_id(self, args: Dict[str, Any], key: str, created: str) -> Any:
+        if args.get(key) is not None:
+            return args[key]
+        return self.ids[created]
+
+    def _get_service_ids(self, change: Dict[str, Any]) -> Tuple[str, str]:
+        # the ids of created services take precedence, a service may be created again by update_service
+        args = change["args"]
+        if args.get("service_id") is not None and f"service:{change['name']}" not in self.ids:
+            return args["service_id"], args["version_id"]
+        return self.ids[f"service:{change['name']}"]
+
+    def _wait_for_build(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        service_id, version_id = self._get_service_ids(change)
+        service_name = change["name"]
+        return wait_for_service_to_be_created(
+            service_id,
+            version_id,
+            self.api_key,
+            timeout=self.timeout,
+            step=5,
+            scheduler=self.scheduler,
+            service_name=service_name,
+        )
+
+    def create_service(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        args = change["args"]
+        with _open_user_code(args["config"]) as config:
+            description = add_content_hash(config.get("description"), args["content_hash"])
+            service = create_managed_service(dict(config, description=description), self.api_key)
+        self.ids[f"service:{change['name']}"] = (service["id"], service["service_definitions"][0]["id"])
+        return self._wait_for_build(change)
+
+    def update_service(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        args = change["args"]
+        with _open_user_code(args["config"]) as config:
+            description = add_content_hash(config.get("description"), args["content_hash"])
+            config = dict(config, description=description)
+            try:
+                update_managed_service(args["service_id"], args["version_id"], config, self.api_key)
+            except ServiceUpdateNotSupportedError:
+                logger.info("Service: %s can not be updated in place, create it again.", change["name"])
+                service = recreate_managed_service(args["service_id"], config, self.api_key)
+                self.ids[f"service:{change['name']}"] = (service["id"], service["service_definitions"][0]["id"])
+        build = self._wait_for_build(change)
+        if f"service:{change['name']}" in self.ids and args["republish"]:
+            # the created service is published again, the next plan subscribes the applications again
+            self.publish_service(change)
+        return build
+
+    def wait_for_build(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        return self._wait_for_build(change)
+
+    def publish_service(self, change: Dict[str, Any]) -> Any:
+        service_id, version_id = self._get_service_ids(change)
+        return self.services_api.publish_service_internal(service_id, version_id)
+
+    def unpublish_service(self, change: Dict[str, Any]) -> Any:
+        if f"service:{change['name']}" in self.ids:
+            # the service was created again by update_service and is not published
+            return None
+        service_id, version_id = self._get_service_ids(change)
+        return self.services_api.unpublish_service(service_id, version_id)
+
+    def create_application(self, change: Dict[str, Any]) -> Any:
+        application = create_application(change["name"], self.api_key)
+        self.ids[f"application:{change['name']}"] = application["id"]
+        return application
+
+    def subscribe(self, change: Dict[str, Any]) -> Any:
+        from openapi_client.model.create_internal_subscription_request import (  # pylint: disable=import-outside-toplevel
+            CreateInternalSubscriptionRequest,
+        )
+
+        args = change["args"]
+        application_id = self._get_id(args, "application_id", f"application:{args['application_name']}")
+        service_id = args["service_id"]
+        if service_id is None or f"service:{args['service_name']}" in self.ids:
+            service_id, _ = self.ids[f"service:{args['service_name']}"]
+        subscription_request = CreateInternalSubscriptionRequest(application_id=application_id, service_id=service_id)
+        return self.applications_api.create_internal_subscription(
+            id=application_id, create_internal_subscription_request=subscription_request
+        )
+
+    def unsubscribe(self, change: Dict[str, Any]) -> Any:
+        args = change["args"]
+        return self.applications_api.delete_application_subscription(args["application_id"], args["subscription_id"])
+
+    def create_data_pool(self, change: Dict[str, Any]) -> Any:
+        data_pool = create_data_pool(change["name"], self.api_key["apiKey"])
+        self.ids[f"data_pool:{change['name']}"] = data_pool["id"]
+        return data_pool
+
+    def add_data(self, change: Dict[str, Any]) -> bool:
+        args = change["args"]
+        data_pool_id = self._get_id(args, "data_pool_id", f"data_pool:{args['data_pool_name']}")
+        url = f"{get_data_pools_url()}/{data_pool_id}/data-source-descriptors"
+        headers = {"X-Auth-Token": self.api_key["apiKey"]}
+        file = args["file"]
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "rb") as opened:
+                response = send("POST", url, headers=headers, files={"file": opened}, timeout=30)
+        else:
+            response = send("POST", url, headers=headers, files={"file": file}, timeout=30)
+        if response.status_code not in [200, 201, 204]:
+            raise Exception(f"Adding file: {_get_file_name(file)} failed with status: {response.status_code}.")
+        return True
+
+
+@traced("apply")
+def apply(
+    changes: List[Dict[str, Any]],
+    api_key: Dict[str, str],
+    timeout: int = 500,
+    scheduler: Optional[PollScheduler] = None,
+    max_workers: int = 8,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    The apply function makes the changes returned by plan.
+    Changes run concurrently as soon as the changes they depend on succeeded, e.g. services are built in parallel and
+    an application subscribes to a service once both exist. Changes whose dependency failed are not made.
+
+    Args:
+        changes: List[Dict[str, Any]]: Changes returned by plan
+        api_key: Dict[str, str]: Pass the api key to the function
+        timeout: int: Set the maximum time to wait for each build
+        scheduler: Optional[PollScheduler]: Scheduler of the build status polls
+        max_workers: int: Number of changes made at the same time, builds wait in a worker
+
+    Returns:
+        A dictionary with a dictionary with the keys result and error for the key of every change
+    """
+    logger.debug("Apply.")
+
+    applier = _Applier(api_key, timeout, scheduler)
+
+    tasks = {change["key"]: (lambda change=change: getattr(applier, change["action"])(change)) for change in changes}
+    dependencies = {change["key"]: change["depends_on"] for change in changes}
+    outcomes = run_graph(tasks, dependencies, max_workers=max_workers) if len(tasks) > 0 else {}
+
+    failed = {key: outcome["error"] for key, outcome in outcomes.items() if outcome["error"] is not None}
+    for key, error in failed.items():
+        logger.error("Change: %s failed: %s", key, error)
+    current_span().set_attribute("applied", len(outcomes) - len(failed))
+    current_span().set_attribute("failed", len(failed))
+    return outcomes
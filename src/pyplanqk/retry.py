@@ -0,0 +1,213 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pyplanqk.metrics import increment
+from pyplanqk.tracing import current_span, span
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# the platform rejected the request before processing it, so it is safe to send a POST again
+NOT_PROCESSED_STATUSES = (429, 503)
+
+
+class RetryPolicy:
+    """
+    Retries platform requests which failed with a transient error, with exponential backoff and jitter.
+
+    Requests with a safe method are retried on connection errors, timeouts and all retry statuses. A POST creates
+    something on the platform, e.g. a job, a service or a data pool, so it is only retried if the platform did not
+    process it: the connection could not be established or the platform answered 429 or 503.
+
+    Args:
+        max_attempts (int): attempts of a request including the first one, 1 disables retries
+        backoff (float): delay before the first retry in seconds, doubled for every further retry
+        max_backoff (float): upper bound of the delay between two attempts in seconds, also caps Retry-After
+        retry_statuses (tuple): http status codes which are retried
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        retry_statuses: Tuple[int, ...] = RETRY_STATUSES,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.random = random.Random()
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        The get_delay function returns the time to wait before the next attempt.
+
+        Args:
+            attempt: int: Number of the failed attempt, starting with 1
+            retry_after: Optional[float]: Seconds the platform asked to wait with the Retry-After header
+
+        Returns:
+            The delay in seconds, at most max_backoff also if the platform asked for longer
+        """
+        if retry_after is not None:
+            return min(self.max_backoff, retry_after)
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        # jitter spreads the retries of concurrent clients
+        return self.random.uniform(delay / 2, delay)
+
+    def is_retryable_status(self, method: str, status: int) -> bool:
+        if status not in self.retry_statuses:
+            return False
+        return method in SAFE_METHODS or status in NOT_PROCESSED_STATUSES
+
+    def is_retryable_error(self, method: str, error: Exception) -> bool:
+        import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        if not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return False
+        return method in SAFE_METHODS or was_not_sent(error)
+
+    def send(self, send: Callable[..., "requests.Response"], method: str, url: str, **kwargs) -> "requests.Response":
+        """
+        The send function sends a request and retries it while it fails with a transient error.
+
+        Args:
+            send: Callable: Function which sends the request, e.g. Transport.send
+            method: str: Http method
+            url: str: Url of the request
+            **kwargs: Arguments of requests.request
+
+        Returns:
+            The response of the last attempt
+        """
+        method = method.upper()
+        positions = _file_positions(kwargs)
+        attempt = 1
+        while True:
+            try:
+                response = send(method, url, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable_error(method, e):
+                    if attempt > 1:
+                        increment("retry_giveups", method=method)
+                    raise e
+                reason = type(e).__name__
+                delay = self.get_delay(attempt)
+            else:
+                if attempt >= self.max_attempts or not self.is_retryable_status(method, response.status_code):
+                    if attempt > 1 and response.status_code in self.retry_statuses:
+                        increment("retry_giveups", method=method)
+                    return response
+                reason = str(response.status_code)
+                delay = self.get_delay(attempt, _parse_retry_after(response.headers.get("Retry-After")))
+
+            logger.info("%s %s failed with %s, retry in %.2f s.", method, url, reason, delay)
+            increment("retries", method=method, reason=reason)
+            current_span().set_attribute("retries", attempt)
+            with span("retry_sleep", reason=reason):
+                time.sleep(delay)
+            _rewind(positions)
+            attempt += 1
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+_default_policy = RetryPolicy()
+_current_policy: ContextVar[Optional[RetryPolicy]] = ContextVar("pyplanqk_retry_policy", default=None)
+
+
+def get_retry_policy() -> RetryPolicy:
+    policy = _current_policy.get()
+    if policy is None:
+        return _default_policy
+    return policy
+
+
+def set_default_retry_policy(policy: RetryPolicy):
+    """
+    The set_default_retry_policy function changes the retry policy of all calls which do not set their own.
+
+    Args:
+        policy: RetryPolicy: Retry policy, NO_RETRY to disable retries
+    """
+    global _default_policy  # pylint: disable=global-statement
+
+    _default_policy = policy
+
+
+@contextmanager
+def use_retry_policy(policy: Optional[RetryPolicy]) -> Iterator[RetryPolicy]:
+    """
+    The use_retry_policy function changes the retry policy of the calls inside the with block.
+
+    Args:
+        policy: Optional[RetryPolicy]: Retry policy, None to keep the current one
+
+    Returns:
+        The retry policy used in the with block
+    """
+    if policy is None:
+        yield get_retry_policy()
+        return
+    token = _current_policy.set(policy)
+    try:
+        yield policy
+    finally:
+        _current_policy.reset(token)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def was_not_sent(error: Exception) -> bool:
+    import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    from urllib3.exceptions import NewConnectionError  # pylint: disable=import-outside-toplevel
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and len(error.args) > 0:
+        reason = getattr(error.args[0], "reason", None)
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def _file_positions(kwargs: Dict[str, Any]) -> List[Tuple[Any, int]]:
+    files = kwargs.get("files")
+    if not files:
+        return []
+    values = files.values() if isinstance(files, dict) else [value for _, value in files]
+    positions = []
+    for value in values:
+        file = value[1] if isinstance(value, tuple) else value
+        if hasattr(file, "seek") and hasattr(file, "tell"):
+            positions.append((file, file.tell()))
+    return positions
+
+
+def _rewind(positions: List[Tuple[Any, int]]):
+    for file, position in positions:
+        file.seek(position)
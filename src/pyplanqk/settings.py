@@ -0,0 +1,81 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+PLANQK_PLATFORM_URL = "https://platform.planqk.de/qc-catalog"
+
+_platform_url: Optional[str] = None
+
+
+def get_platform_url() -> str:
+    """
+    The get_platform_url function returns the base url of the PlanQK platform api.
+
+    The url set with set_platform_url is used first, then the environment variable PLANQK_PLATFORM_URL and
+    https://platform.planqk.de/qc-catalog as default.
+
+    Returns:
+        The base url without trailing slash
+    """
+    url = _platform_url
+    if url is None:
+        url = os.getenv("PLANQK_PLATFORM_URL", PLANQK_PLATFORM_URL)
+    return url.rstrip("/")
+
+
+def set_platform_url(url: Optional[str]):
+    """
+    The set_platform_url function changes the base url of the PlanQK platform api for all calls.
+
+    Args:
+        url: Optional[str]: Base url of the platform api, None to use the default again
+    """
+    global _platform_url  # pylint: disable=global-statement
+
+    _platform_url = url
+
+
+@contextmanager
+def use_platform_url(url: Optional[str]) -> Iterator[str]:
+    """
+    The use_platform_url function changes the base url of the PlanQK platform api inside the with block.
+
+    Args:
+        url: Optional[str]: Base url of the platform api
+
+    Returns:
+        The base url
+    """
+    previous = _platform_url
+    set_platform_url(url)
+    try:
+        yield get_platform_url()
+    finally:
+        set_platform_url(previous)
+
+
+def get_data_pools_url() -> str:
+    """
+    The get_data_pools_url function returns the url of the data pool api.
+
+    Returns:
+        The url of the data pool collection
+    """
+    return f"{get_platform_url()}/data-pools"
+
+
+def load_env(path: str = ".env") -> bool:
+    """
+    The load_env function loads the environment variables of a .env file, e.g. PLANQK_PLATFORM_URL.
+
+    pyplanqk does not read .env files on import, call load_env before creating the client to use one.
+
+    Args:
+        path: str: Path of the .env file
+
+    Returns:
+        True if at least one environment variable was set
+    """
+    from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+
+    return load_dotenv(path)
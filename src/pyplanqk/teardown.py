@@ -0,0 +1,186 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from pyplanqk.clients import get_applications_api, get_services_api
+from pyplanqk.concurrency import run_graph
+from pyplanqk.low_level_actions import get_data_pools, get_services
+from pyplanqk.settings import get_data_pools_url
+from pyplanqk.tracing import current_span, traced
+from pyplanqk.transport import send
+
+logger = logging.getLogger(__name__)
+
+Resource = Union[str, Dict[str, Any]]
+
+
+def get_field(resource: Any, *names: str) -> Any:
+    """
+    The get_field function reads the first of several field names from a dictionary or a model of the openapi client.
+
+    Args:
+        resource: Any: Dictionary or model
+        *names: str: Field names, e.g. the snake case and camel case spelling
+
+    Returns:
+        The value of the first field which is set, None if no field is set
+    """
+    for name in names:
+        try:
+            value = resource[name]
+        except (KeyError, TypeError, AttributeError):
+            continue
+        if value is not None:
+            return value
+    return None
+
+
+def _get_name(resource: Resource) -> str:
+    return resource if isinstance(resource, str) else resource["name"]
+
+
+def _remove_data_pool(data_pool_id: str, api_key: Dict[str, str]) -> bool:
+    headers = {"Content-Type": "application/json", "X-Auth-Token": api_key["apiKey"]}
+    response = send("DELETE", f"{get_data_pools_url()}/{data_pool_id}", headers=headers, timeout=30)
+    if response.status_code not in [200, 201, 204, 404]:
+        raise Exception(f"Remove data pool: {data_pool_id} failed with status: {response.status_code}.")
+    return True
+
+
+@traced("teardown")
+def teardown(
+    api_key: Dict[str, str],
+    services: Optional[List[Resource]] = None,
+    applications: Optional[List[Resource]] = None,
+    data_pools: Optional[List[Resource]] = None,
+    max_workers: int = 16,
+) -> Dict[str, Dict[str, bool]]:
+    """
+    The teardown function removes services, applications with their subscriptions and data pools at once.
+    The platform is read once: one listing of the services, applications and data pools and the subscriptions of
+    the applications. The removals then run concurrently with the ids in the order of their dependencies:
+    subscriptions before their application and service, unpublishing before removing a service.
+    Resources which do not exist are reported as removed, so a teardown can be repeated.
+
+    Args:
+        api_key: Dict[str, str]: Pass the api key to the function
+        services: Optional[List[Resource]]: Names of the services, or dictionaries with a name
+        applications: Optional[List[Resource]]: Names of the applications, or dictionaries with a name
+        data_pools: Optional[List[Resource]]: Names of the data pools, or dictionaries with a name
+        max_workers: int: Number of requests sent at the same time
+
+    Returns:
+        A dictionary with the keys services, applications, subscriptions and data_pools, each with True for every
+        removed resource and False for every resource which could not be removed
+    """
+    logger.debug("Teardown.")
+
+    service_names = {_get_name(service) for service in services or []}
+    application_names = {_get_name(application) for application in applications or []}
+    data_pool_names = {_get_name(data_pool) for data_pool in data_pools or []}
+    services_api = get_services_api(api_key)
+    applications_api = get_applications_api(api_key)
+
+    try:
+        found_services = []
+        if len(service_names) > 0:
+            found_services = [service for service in get_services(api_key) if service["name"] in service_names]
+        found_applications = []
+        if len(application_names) > 0:
+            found_applications = [
+                application
+                for application in applications_api.get_applications()
+                if application["name"] in application_names
+            ]
+        found_data_pools = []
+        if len(data_pool_names) > 0:
+            found_data_pools = [
+                data_pool for data_pool in get_data_pools(api_key["apiKey"]) if data_pool["name"] in data_pool_names
+            ]
+
+        subscriptions: Dict[str, List[Any]] = {}
+        if len(found_applications) > 0:
+            application_ids = [application["id"] for application in found_applications]
+            context = copy_context()
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(application_ids))) as executor:
+                results = executor.map(
+                    lambda application_id: context.copy().run(
+                        applications_api.get_application_subscriptions, application_id
+                    ),
+                    application_ids,
+                )
+                subscriptions = dict(zip(application_ids, results))
+    except Exception as e:
+        logger.error("Teardown failed.")
+        logger.error(e)
+        raise e
+
+    tasks: Dict[str, Callable[[], Any]] = {}
+    dependencies: Dict[str, List[str]] = {}
+    # subscriptions of unknown services block all services
+    service_subscriptions: Dict[Optional[str], List[str]] = {}
+
+    for application in found_applications:
+        application_id = application["id"]
+        application_key = f"application:{application_id}"
+        tasks[application_key] = lambda application_id=application_id: applications_api.delete_application(
+            application_id
+        )
+        dependencies[application_key] = []
+        for subscription in subscriptions[application_id]:
+            subscription_id = subscription["id"]
+            subscription_key = f"subscription:{subscription_id}"
+            tasks[subscription_key] = lambda application_id=application_id, subscription_id=subscription_id: (
+                applications_api.delete_application_subscription(application_id, subscription_id)
+            )
+            dependencies[application_key].append(subscription_key)
+            service_id = get_field(subscription, "service_id", "serviceId")
+            service_subscriptions.setdefault(service_id, []).append(subscription_key)
+
+    for service in found_services:
+        service_id = service["id"]
+        service_key = f"service:{service_id}"
+        blocking = service_subscriptions.get(service_id, []) + service_subscriptions.get(None, [])
+        tasks[service_key] = lambda service_id=service_id: services_api.delete_service(service_id)
+        dependencies[service_key] = list(blocking)
+        for version in service["service_definitions"]:
+            if version["lifecycle"] == "CREATED":
+                continue
+            version_key = f"unpublish:{version['id']}"
+            tasks[version_key] = lambda service_id=service_id, version_id=version["id"]: (
+                services_api.unpublish_service(service_id, version_id)
+            )
+            dependencies[version_key] = list(blocking)
+            dependencies[service_key].append(version_key)
+
+    for data_pool in found_data_pools:
+        data_pool_id = data_pool["id"]
+        tasks[f"data_pool:{data_pool_id}"] = lambda data_pool_id=data_pool_id: _remove_data_pool(data_pool_id, api_key)
+
+    outcomes = run_graph(tasks, dependencies, max_workers=max_workers) if len(tasks) > 0 else {}
+
+    def removed(key: str) -> bool:
+        return outcomes[key]["error"] is None
+
+    result: Dict[str, Dict[str, bool]] = {
+        "services": {name: True for name in service_names},
+        "applications": {name: True for name in application_names},
+        "subscriptions": {},
+        "data_pools": {name: True for name in data_pool_names},
+    }
+    for service in found_services:
+        result["services"][service["name"]] &= removed(f"service:{service['id']}")
+    for application in found_applications:
+        result["applications"][application["name"]] &= removed(f"application:{application['id']}")
+        for subscription in subscriptions[application["id"]]:
+            result["subscriptions"][subscription["id"]] = removed(f"subscription:{subscription['id']}")
+    for data_pool in found_data_pools:
+        result["data_pools"][data_pool["name"]] &= removed(f"data_pool:{data_pool['id']}")
+
+    failed = {key: outcome["error"] for key, outcome in outcomes.items() if outcome["error"] is not None}
+    for key, error in failed.items():
+        logger.error("Teardown of %s failed: %s", key, error)
+    current_span().set_attribute("removed", len(outcomes) - len(failed))
+    current_span().set_attribute("failed", len(failed))
+    return result
@@ -0,0 +1,260 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_recorder: Optional["TraceRecorder"] = None
+
+_UNSET = object()
+_otel_tracer: Any = _UNSET
+_otel_enabled = True
+
+_TRACED_ARGUMENTS = ("service_name", "job_id", "application_name", "data_pool_name")
+
+
+class Span:
+    """
+    A single timed section of a pyplanqk call.
+
+    Args:
+        name (str): name of the span as shown in the timeline
+        attributes (dict): key/value pairs attached to the span
+    """
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.otel_span = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self.otel_span is not None and value is not None:
+            self.otel_span.set_attribute(f"planqk.{key}", _to_trace_value(value))
+
+
+class _NoopSpan(Span):
+    def __init__(self):
+        super().__init__("noop", {})
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: ContextVar[Span] = ContextVar("pyplanqk_current_span", default=_NOOP_SPAN)
+
+
+class TraceRecorder:
+    """
+    Collects finished spans as Chrome trace events.
+
+    The written file can be opened in chrome://tracing or https://ui.perfetto.dev.
+    Spans of the same thread are nested by their start and end times.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+        self.thread_names: Dict[int, str] = {}
+
+    def record(self, span: Span, start: int, end: int):
+        thread = threading.current_thread()
+        event = {
+            "name": span.name,
+            "cat": "pyplanqk",
+            "ph": "X",
+            "ts": (start - self.origin) / 1000,
+            "dur": (end - start) / 1000,
+            "pid": self.pid,
+            "tid": thread.ident,
+            "args": {key: _to_trace_value(value) for key, value in span.attributes.items()},
+        }
+        with self.lock:
+            self.events.append(event)
+            self.thread_names.setdefault(thread.ident, thread.name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            events = list(self.events)
+            thread_names = dict(self.thread_names)
+
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        logger.info("Trace written to: %s.", path)
+
+
+def _to_trace_value(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _get_otel_tracer() -> Any:
+    global _otel_tracer  # pylint: disable=global-statement
+
+    if not _otel_enabled:
+        return None
+    if _otel_tracer is _UNSET:
+        try:
+            from opentelemetry import trace  # pylint: disable=import-outside-toplevel
+
+            _otel_tracer = trace.get_tracer("pyplanqk")
+        except ImportError:
+            _otel_tracer = None
+    return _otel_tracer
+
+
+def enable_opentelemetry(enabled: bool = True, tracer_provider: Any = None):
+    """
+    The enable_opentelemetry function switches the OpenTelemetry spans on or off.
+
+    The spans are emitted by default if the opentelemetry-api package is installed.
+
+    Args:
+        enabled: bool: Emit OpenTelemetry spans
+        tracer_provider: Any: Tracer provider the spans are emitted to, None for the global tracer provider
+    """
+    global _otel_enabled, _otel_tracer  # pylint: disable=global-statement
+
+    _otel_enabled = enabled
+    _otel_tracer = _UNSET if tracer_provider is None else tracer_provider.get_tracer("pyplanqk")
+
+
+def inject_trace_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    The inject_trace_headers function adds the trace context of the current span to the request headers.
+
+    Args:
+        headers: Dict[str, str]: Headers of the outgoing request, updated in place
+
+    Returns:
+        The headers
+    """
+    if _get_otel_tracer() is not None:
+        from opentelemetry.propagate import inject  # pylint: disable=import-outside-toplevel
+
+        inject(headers)
+    return headers
+
+
+def current_span() -> Span:
+    """
+    The current_span function returns the innermost active span.
+
+    Returns:
+        The active span or a span which ignores all attributes if nothing is traced
+    """
+    return _current_span.get()
+
+
+@contextmanager
+def profile(path: Optional[str] = None) -> Iterator[TraceRecorder]:
+    """
+    The profile function records a timeline of all pyplanqk calls executed inside the with block.
+
+    Args:
+        path: Optional[str]: File the Chrome trace JSON is written to when the block exits
+
+    Returns:
+        The recorder holding the collected events
+    """
+    global _recorder  # pylint: disable=global-statement
+
+    previous = _recorder
+    recorder = TraceRecorder()
+    _recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _recorder = previous
+        if path is not None:
+            recorder.write(path)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    The span function times the enclosed block if a profile is active or OpenTelemetry is installed.
+
+    Args:
+        name: str: Name of the span
+        **attributes: Attributes attached to the span
+
+    Returns:
+        The span, attributes can be added while the block runs
+    """
+    recorder = _recorder
+    tracer = _get_otel_tracer()
+    if recorder is None and tracer is None:
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, attributes)
+    token = _current_span.set(current)
+    start = time.perf_counter_ns()
+    try:
+        if tracer is None:
+            yield current
+        else:
+            otel_attributes = {
+                f"planqk.{key}": _to_trace_value(value) for key, value in attributes.items() if value is not None
+            }
+            with tracer.start_as_current_span(f"pyplanqk.{name}", attributes=otel_attributes) as otel_span:
+                current.otel_span = otel_span
+                yield current
+    finally:
+        _current_span.reset(token)
+        if recorder is not None:
+            recorder.record(current, start, time.perf_counter_ns())
+
+
+def traced(name: str) -> Callable:
+    """
+    The traced function wraps a function into a span of the given name.
+    Service names, job ids, application names and data pool names passed to the function are added as attributes.
+
+    Args:
+        name: str: Name of the span
+
+    Returns:
+        The decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        code = func.__code__
+        parameters = code.co_varnames[: code.co_argcount + code.co_kwonlyargcount]
+        captured = [(index, parameter) for index, parameter in enumerate(parameters) if parameter in _TRACED_ARGUMENTS]
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None and _get_otel_tracer() is None:
+                return func(*args, **kwargs)
+
+            attributes = {}
+            for index, parameter in captured:
+                if parameter in kwargs:
+                    attributes[parameter] = kwargs[parameter]
+                elif index < len(args):
+                    attributes[parameter] = args[index]
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
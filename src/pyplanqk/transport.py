@@ -0,0 +1,493 @@
+import base64
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import partial
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from pyplanqk.circuit import send_with_circuit_breaker
+from pyplanqk.coalescing import coalesce
+from pyplanqk.concurrency import send_with_concurrency_limit
+from pyplanqk.hedging import send_with_hedging
+from pyplanqk.ratelimit import send_with_rate_limit
+from pyplanqk.retry import get_retry_policy
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = 32
+CASSETTE_VERSION = 1
+REDACTED = "REDACTED"
+# credentials which are not written to a cassette
+SECRET_HEADERS = ["authorization", "proxy-authorization", "x-auth-token", "set-cookie", "cookie"]
+SECRET_FIELDS = ["access_token", "refresh_token", "id_token", "apiKey", "api_key"]
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+_transport: Optional["Transport"] = None
+
+
+def get_session() -> "requests.Session":
+    """
+    The get_session function returns the requests session shared by all pyplanqk calls.
+
+    The session keeps the connections to the platform open, so consecutive calls do not pay for new TCP and TLS
+    handshakes.
+
+    Returns:
+        The shared session
+    """
+    global _session  # pylint: disable=global-statement
+
+    if _session is None:
+        # requests is imported on the first request to keep the import of pyplanqk fast
+        import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+        from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+class Transport:
+    """
+    Sends the http requests of pyplanqk over the shared session.
+
+    Subclasses change how requests are sent, e.g. to record or replay the exchanges with the platform.
+    """
+
+    def send(self, method: str, url: str, **kwargs) -> "requests.Response":
+        return get_session().request(method, url, **kwargs)
+
+
+_default_transport = Transport()
+
+
+def get_transport() -> Transport:
+    if _transport is None:
+        return _default_transport
+    return _transport
+
+
+def set_transport(transport: Optional[Transport]):
+    """
+    The set_transport function changes the transport used by all pyplanqk calls.
+
+    Args:
+        transport: Optional[Transport]: Transport to use, None to send the requests over the shared session again
+    """
+    global _transport  # pylint: disable=global-statement
+
+    _transport = transport
+
+
+@contextmanager
+def use_transport(transport: Transport) -> Iterator[Transport]:
+    """
+    The use_transport function changes the transport used by all pyplanqk calls inside the with block.
+
+    Args:
+        transport: Transport: Transport to use
+
+    Returns:
+        The transport
+    """
+    previous = _transport
+    set_transport(transport)
+    try:
+        yield transport
+    finally:
+        set_transport(previous)
+
+
+def send(method: str, url: str, **kwargs) -> "requests.Response":
+    """
+    The send function sends a http request with the current transport and retries it on transient errors.
+    Every attempt passes the circuit breaker of the endpoint family, so requests fail fast while it is open.
+    Concurrent identical GET requests share one request to the platform, slow GET requests are hedged if a
+    hedging policy is set and every attempt waits for the rate limiter and the concurrency controller of the client.
+
+    Args:
+        method: str: Http method
+        url: str: Url of the request
+        **kwargs: Arguments of requests.request, e.g. headers, json, files or timeout
+
+    Returns:
+        The response
+    """
+    return coalesce(_send_with_retry, method, url, **kwargs)
+
+
+def _send_with_transport(method: str, url: str, **kwargs) -> "requests.Response":
+    # the transport is looked up on every attempt, so use_transport also applies to the layers built below
+    return get_transport().send(method, url, **kwargs)
+
+
+# the layers of an attempt are composed once, from the inside out
+_send_once = partial(send_with_circuit_breaker, _send_with_transport)
+_send_once = partial(send_with_concurrency_limit, _send_once)
+_send_once = partial(send_with_rate_limit, _send_once)
+_send_once = partial(send_with_hedging, _send_once)
+
+
+def _send_with_retry(method: str, url: str, **kwargs) -> "requests.Response":
+    return get_retry_policy().send(_send_once, method, url, **kwargs)
+
+
+def _request_key(method: str, url: str, params: Any = None) -> str:
+    parts = urlsplit(url)
+    key = f"{method.upper()} {parts.path}"
+    query = parts.query
+    if params:
+        query = "&".join(part for part in [query, urlencode(params)] if part != "")
+    if query != "":
+        key = f"{key}?{query}"
+    return key
+
+
+def _encode_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(content).decode("ascii"), "encoding": "base64"}
+
+
+def _redact_body(content: bytes) -> bytes:
+    try:
+        body = json.loads(content)
+    except ValueError:
+        return content
+    if not isinstance(body, dict) or not any(field in body for field in SECRET_FIELDS):
+        return content
+    return json.dumps({key: REDACTED if key in SECRET_FIELDS else value for key, value in body.items()}).encode("utf-8")
+
+
+def _decode_body(exchange: Dict[str, Any]) -> bytes:
+    if exchange.get("encoding") == "base64":
+        return base64.b64decode(exchange["body"])
+    return exchange["body"].encode("utf-8")
+
+
+class RecordingTransport(Transport):
+    """
+    Sends the requests over the shared session and records every exchange for a cassette.
+    Access tokens in the response bodies and credentials in the response headers are redacted before they are
+    recorded.
+
+    Args:
+        path (str): file the cassette is written to by save
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.exchanges: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    def send(self, method: str, url: str, **kwargs) -> "requests.Response":
+        started = time.perf_counter()
+        response = super().send(method, url, **kwargs)
+        duration = time.perf_counter() - started
+
+        exchange = {
+            "request": _request_key(method, url, kwargs.get("params")),
+            "started": started - self.origin,
+            "duration": duration,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                key: REDACTED if key.lower() in SECRET_HEADERS else value
+                for key, value in response.headers.items()
+                if key.lower() != "content-encoding"
+            },
+        }
+        exchange.update(_encode_body(_redact_body(response.content)))
+        with self.lock:
+            self.exchanges.append(exchange)
+        return response
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        with self.lock:
+            content = {"version": CASSETTE_VERSION, "exchanges": sorted(self.exchanges, key=lambda e: e["started"])}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+        logger.info("Recorded %s exchanges to: %s.", len(content["exchanges"]), path)
+
+
+class ReplayTransport(Transport):
+    """
+    Answers the requests with the responses of a cassette without touching the platform.
+
+    Requests are matched by method, path and query in the recorded order. If a request was sent more often than
+    recorded, e.g. a status poll, the last recorded response is repeated.
+
+    Args:
+        path (str): cassette written by RecordingTransport
+        speed (float): factor the recorded durations are divided by, None to answer immediately
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0):
+        with open(path, encoding="utf-8") as f:
+            content = json.load(f)
+        if content.get("version") != CASSETTE_VERSION:
+            raise Exception(f"Unsupported cassette version: {content.get('version')}.")
+
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.last: Dict[str, Dict[str, Any]] = {}
+        for exchange in content["exchanges"]:
+            self.queues[exchange["request"]].append(exchange)
+        self.unmatched: List[str] = []
+
+    def next_exchange(self, key: str) -> Dict[str, Any]:
+        with self.lock:
+            queue = self.queues.get(key)
+            if queue:
+                exchange = queue.popleft()
+                self.last[key] = exchange
+                return exchange
+            if key in self.last:
+                return self.last[key]
+            self.unmatched.append(key)
+        raise Exception(f"No recorded response for: {key}.")
+
+    def remaining(self) -> int:
+        """
+        The remaining function returns the number of recorded exchanges which were not replayed yet.
+
+        Returns:
+            The number of exchanges
+        """
+        with self.lock:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def send(self, method: str, url: str, **kwargs) -> "requests.Response":
+        import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+        from requests.structures import CaseInsensitiveDict  # pylint: disable=import-outside-toplevel
+
+        exchange = self.next_exchange(_request_key(method, url, kwargs.get("params")))
+        if self.speed is not None and self.speed > 0:
+            time.sleep(exchange["duration"] / self.speed)
+
+        response = requests.Response()
+        response.status_code = exchange["status"]
+        response.reason = exchange["reason"]
+        response.headers = CaseInsensitiveDict(exchange["headers"])
+        response._content = _decode_body(exchange)  # pylint: disable=protected-access
+        response.url = url
+        return response
+
+
+@contextmanager
+def record(path: str) -> Iterator[RecordingTransport]:
+    """
+    The record function records all exchanges with the platform inside the with block to a cassette file.
+
+    Args:
+        path: str: File the cassette is written to
+
+    Returns:
+        The recording transport
+    """
+    transport = RecordingTransport(path)
+    try:
+        with use_transport(transport):
+            yield transport
+    finally:
+        transport.save()
+
+
+@contextmanager
+def replay(path: str, speed: Optional[float] = 1.0) -> Iterator[ReplayTransport]:
+    """
+    The replay function answers all requests inside the with block with the responses of a cassette file.
+
+    Args:
+        path: str: Cassette written by record
+        speed: Optional[float]: Replay the recorded durations this many times faster, None to answer immediately
+
+    Returns:
+        The replay transport
+    """
+    transport = ReplayTransport(path, speed=speed)
+    with use_transport(transport):
+        yield transport
+
+
+class RestResponse:
+    """
+    Response of RestClient in the form the generated openapi client expects.
+
+    Args:
+        response (requests.Response): response of the transport
+    """
+
+    def __init__(self, response: "requests.Response"):
+        self.response = response
+        self.status = response.status_code
+        self.reason = response.reason
+        self.data = response.content
+
+    def getheaders(self) -> Any:
+        return self.response.headers
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.response.headers.get(name, default)
+
+
+def _split_post_params(post_params: List[Tuple[str, Any]]) -> Tuple[List[Tuple[str, Any]], List[Tuple[str, Any]]]:
+    data = []
+    files = []
+    for name, value in post_params:
+        if isinstance(value, tuple):
+            files.append((name, value))
+        elif hasattr(value, "render_headers"):
+            # urllib3 RequestField
+            content_type = value.headers.get("Content-Type")
+            files.append((name, (value._filename, value.data, content_type)))  # pylint: disable=protected-access
+        else:
+            data.append((name, value))
+    return data, files
+
+
+class RestClient:
+    """
+    Replaces the urllib3 client of the generated openapi client, so its calls go through the pyplanqk transport.
+    The tls and proxy settings of the configuration are passed on to every request.
+
+    Args:
+        configuration (Configuration): configuration of the openapi client, None for the defaults of requests
+    """
+
+    def __init__(self, configuration: Any = None):
+        self.options: Dict[str, Any] = {}
+        if configuration is None:
+            return
+        if not getattr(configuration, "verify_ssl", True):
+            self.options["verify"] = False
+        elif getattr(configuration, "ssl_ca_cert", None):
+            self.options["verify"] = configuration.ssl_ca_cert
+        cert_file = getattr(configuration, "cert_file", None)
+        if cert_file:
+            key_file = getattr(configuration, "key_file", None)
+            self.options["cert"] = (cert_file, key_file) if key_file else cert_file
+        proxy = getattr(configuration, "proxy", None)
+        if proxy:
+            self.options["proxies"] = {"http": proxy, "https": proxy}
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        query_params: Optional[List[Tuple[str, Any]]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        post_params: Optional[List[Tuple[str, Any]]] = None,
+        _preload_content: bool = True,
+        _request_timeout: Any = None,
+    ) -> RestResponse:
+        method = method.upper()
+        headers = dict(headers or {})
+        if query_params:
+            url = f"{url}?{urlencode(query_params)}"
+
+        kwargs: Dict[str, Any] = {"headers": headers, "timeout": _request_timeout, **self.options}
+        if method in ["POST", "PUT", "PATCH", "OPTIONS", "DELETE"]:
+            if method != "DELETE" and "Content-Type" not in headers:
+                headers["Content-Type"] = "application/json"
+            content_type = headers.get("Content-Type", "")
+            if "json" in content_type.lower():
+                if body is not None:
+                    kwargs["data"] = json.dumps(body)
+            elif content_type == "application/x-www-form-urlencoded":
+                kwargs["data"] = post_params or []
+            elif content_type == "multipart/form-data":
+                # the boundary is added by requests
+                del headers["Content-Type"]
+                kwargs["data"], kwargs["files"] = _split_post_params(post_params or [])
+            elif isinstance(body, (str, bytes)):
+                kwargs["data"] = body
+            elif body is not None:
+                raise ValueError("Cannot prepare a request message for provided arguments.")
+
+        response = RestResponse(send(method, url, **kwargs))
+        if not 200 <= response.status <= 299:
+            # pylint: disable=import-outside-toplevel
+            from openapi_client.exceptions import (
+                ApiException,
+                ForbiddenException,
+                NotFoundException,
+                ServiceException,
+                UnauthorizedException,
+            )
+
+            if response.status == 401:
+                raise UnauthorizedException(http_resp=response)
+            if response.status == 403:
+                raise ForbiddenException(http_resp=response)
+            if response.status == 404:
+                raise NotFoundException(http_resp=response)
+            if 500 <= response.status <= 599:
+                raise ServiceException(http_resp=response)
+            raise ApiException(http_resp=response)
+        return response
+
+    def GET(self, url, headers=None, query_params=None, _preload_content=True, _request_timeout=None):
+        return self.request("GET", url, query_params=query_params, headers=headers, _request_timeout=_request_timeout)
+
+    def HEAD(self, url, headers=None, query_params=None, _preload_content=True, _request_timeout=None):
+        return self.request("HEAD", url, query_params=query_params, headers=headers, _request_timeout=_request_timeout)
+
+    def OPTIONS(self, url, headers=None, query_params=None, post_params=None, body=None, **kwargs):
+        return self.request(
+            "OPTIONS", url, query_params=query_params, headers=headers, post_params=post_params, body=body, **kwargs
+        )
+
+    def DELETE(self, url, headers=None, query_params=None, body=None, **kwargs):
+        return self.request("DELETE", url, query_params=query_params, headers=headers, body=body, **kwargs)
+
+    def POST(self, url, headers=None, query_params=None, post_params=None, body=None, **kwargs):
+        return self.request(
+            "POST", url, query_params=query_params, headers=headers, post_params=post_params, body=body, **kwargs
+        )
+
+    def PUT(self, url, headers=None, query_params=None, post_params=None, body=None, **kwargs):
+        return self.request(
+            "PUT", url, query_params=query_params, headers=headers, post_params=post_params, body=body, **kwargs
+        )
+
+    def PATCH(self, url, headers=None, query_params=None, post_params=None, body=None, **kwargs):
+        return self.request(
+            "PATCH", url, query_params=query_params, headers=headers, post_params=post_params, body=body, **kwargs
+        )
+
+
+def create_api_client(configuration: Any) -> Any:
+    """
+    The create_api_client function creates a client of the generated openapi client which sends its requests
+    through the pyplanqk transport.
+
+    Args:
+        configuration: Configuration: Host and api key of the platform
+
+    Returns:
+        The api client
+    """
+    from openapi_client import ApiClient  # pylint: disable=import-outside-toplevel
+
+    api_client = ApiClient(configuration=configuration)
+    api_client.rest_client = RestClient(configuration)
+    return api_client
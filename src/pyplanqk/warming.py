@@ -0,0 +1,327 @@
+import logging
+import threading
+import time
+from contextvars import copy_context
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pyplanqk.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+# a ping is a lightweight job of the service, it returns the timing of the job as computed by get_job_timing
+PingFunction = Callable[[str, Optional[Dict[str, Any]], Dict[str, Any]], Dict[str, Any]]
+TimingsFunction = Callable[[str], List[Dict[str, Any]]]
+
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    return value.timestamp()
+
+
+def get_idle_delays(timings: List[Dict[str, Any]]) -> List[Tuple[float, float]]:
+    """
+    The get_idle_delays function pairs the idle time of a service before each job with the queue wait of the job.
+
+    Args:
+        timings: List[Dict[str, Any]]: Job timings as returned by get_job_timing
+
+    Returns:
+        A list of idle seconds and queue wait seconds, one per job which had a job before it
+    """
+    jobs = [timing for timing in timings if timing["created_at"] is not None and timing["queue_wait"] is not None]
+    jobs.sort(key=lambda timing: timing["created_at"])
+
+    samples = []
+    busy_until: Optional[datetime] = None
+    for timing in jobs:
+        if busy_until is not None:
+            idle = max(0.0, (timing["created_at"] - busy_until).total_seconds())
+            samples.append((idle, timing["queue_wait"]))
+        end = timing["ended_at"] or timing["started_at"] or timing["created_at"]
+        busy_until = end if busy_until is None else max(busy_until, end)
+    return samples
+
+
+def learn_cold_start_threshold(
+    timings: List[Dict[str, Any]], factor: float = 2.0, min_samples: int = 6
+) -> Optional[float]:
+    """
+    The learn_cold_start_threshold function finds the idle time after which jobs of a service start cold.
+
+    The jobs are split at every idle time into warm jobs after shorter and cold jobs after longer idle times. The
+    threshold is the split where the mean queue wait of the cold jobs is the largest multiple of the mean queue wait of
+    the warm jobs, if that multiple exceeds factor.
+
+    Args:
+        timings: List[Dict[str, Any]]: Job timings as returned by get_job_timing
+        factor: float: Minimum ratio of the queue waits of cold and warm jobs
+        min_samples: int: Minimum number of jobs with a job before them
+
+    Returns:
+        The threshold in seconds or None if there are too few jobs or no cold starts
+    """
+    samples = sorted(get_idle_delays(timings))
+    if len(samples) < min_samples:
+        return None
+
+    threshold = None
+    best_ratio = factor
+    for split in range(2, len(samples) - 1):
+        if samples[split][0] == samples[split - 1][0]:
+            continue
+        warm = [delay for _, delay in samples[:split]]
+        cold = [delay for _, delay in samples[split:]]
+        ratio = (sum(cold) / len(cold)) / max(sum(warm) / len(warm), 0.001)
+        if ratio > best_ratio:
+            threshold = samples[split][0]
+            best_ratio = ratio
+    return threshold
+
+
+class WarmKeeper:
+    """
+    Keeps services warm by sending them a lightweight job whenever they were idle for longer than their interval.
+
+    The interval of a service is learned from the timings of its jobs: the idle time after which the queue wait jumps
+    is the cold start threshold, pings are sent after safety times this threshold. Until enough jobs are known the
+    default interval is used. The pings and their run time are counted per service, see report.
+
+    Args:
+        ping (callable): function which sends a ping job to a service and returns its timing
+        timings (callable): function which returns the job timings of a service
+        default_interval (float): seconds between pings while no cold start threshold is known
+        min_interval (float): shortest time between two pings of a service in seconds
+        safety (float): pings are sent after this fraction of the cold start threshold
+        learn_interval (float): seconds between two updates of the cold start threshold of a service
+        clock (callable): wall clock in seconds, replaceable in tests
+    """
+
+    def __init__(
+        self,
+        ping: PingFunction,
+        timings: TimingsFunction,
+        default_interval: float = 300,
+        min_interval: float = 30,
+        safety: float = 0.8,
+        learn_interval: float = 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ping = ping
+        self.timings = timings
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.safety = safety
+        self.learn_interval = learn_interval
+        self.clock = clock
+        self.targets: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def add(
+        self,
+        service_name: str,
+        params: Dict[str, Any],
+        data: Optional[Dict[str, Any]] = None,
+        interval: Optional[float] = None,
+    ):
+        """
+        The add function keeps a service warm.
+
+        Args:
+            service_name: str: Name of the service
+            params: Dict[str, Any]: Parameters of the ping jobs
+            data: Optional[Dict[str, Any]]: Input data of the ping jobs
+            interval: Optional[float]: Fixed seconds between pings, learned from the job timings if not given
+        """
+        with self.lock:
+            self.targets[service_name] = {
+                "params": params,
+                "data": data,
+                "fixed_interval": interval,
+                "threshold": None,
+                "learned_at": None,
+                "added_at": self.clock(),
+                "last_activity": None,
+                "pings": 0,
+                "failed_pings": 0,
+                "ping_run_time": 0.0,
+                "ping_queue_wait": 0.0,
+                "last_ping": None,
+            }
+
+    def remove(self, service_name: str):
+        with self.lock:
+            self.targets.pop(service_name, None)
+
+    def get_interval(self, service_name: str) -> float:
+        """
+        The get_interval function returns the idle seconds after which a service is pinged.
+
+        Args:
+            service_name: str: Name of the service
+
+        Returns:
+            The fixed interval, the learned one or the default interval
+        """
+        with self.lock:
+            target = self.targets[service_name]
+            if target["fixed_interval"] is not None:
+                return target["fixed_interval"]
+            if target["threshold"] is None:
+                return self.default_interval
+            return max(self.min_interval, target["threshold"] * self.safety)
+
+    def learn(self, service_name: str):
+        """
+        The learn function updates the cold start threshold and the last activity of a service from its job timings.
+
+        Args:
+            service_name: str: Name of the service
+        """
+        timings = self.timings(service_name)
+        threshold = learn_cold_start_threshold(timings)
+        ends = [_epoch(timing["ended_at"] or timing["created_at"]) for timing in timings]
+        ends = [end for end in ends if end is not None]
+        with self.lock:
+            target = self.targets.get(service_name)
+            if target is None:
+                return
+            target["learned_at"] = self.clock()
+            if threshold is not None:
+                target["threshold"] = threshold
+            if len(ends) > 0:
+                target["last_activity"] = max(target["last_activity"] or 0.0, max(ends))
+        logger.debug("Cold start threshold of service: %s is %s s.", service_name, threshold)
+
+    def run_pending(self) -> List[str]:
+        """
+        The run_pending function pings every service which was idle for longer than its interval.
+
+        Returns:
+            The names of the pinged services
+        """
+        with self.lock:
+            names = list(self.targets)
+        stopped = self.stopped
+        pinged = []
+        for service_name in names:
+            if stopped.is_set():
+                break
+            try:
+                target = self.targets[service_name]
+                if target["learned_at"] is None or self.clock() - target["learned_at"] >= self.learn_interval:
+                    self.learn(service_name)
+                # without known jobs the service counts as used when it was added
+                last_activity = target["last_activity"] or target["added_at"]
+                if self.clock() - last_activity < self.get_interval(service_name):
+                    continue
+                self._ping(service_name, target)
+                pinged.append(service_name)
+            except KeyError:
+                # the service was removed meanwhile
+                continue
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error("Keeping service: %s warm failed.", service_name)
+                logger.error(e)
+        return pinged
+
+    def _ping(self, service_name: str, target: Dict[str, Any]):
+        logger.info("Ping service: %s to keep it warm.", service_name)
+        try:
+            timing = self.ping(service_name, target["data"], target["params"])
+        except Exception as e:
+            with self.lock:
+                target["failed_pings"] += 1
+                target["last_activity"] = self.clock()
+            increment("warm_ping_failures", service_name=service_name)
+            raise e
+        with self.lock:
+            target["pings"] += 1
+            target["last_ping"] = self.clock()
+            target["last_activity"] = self.clock()
+            target["ping_run_time"] += timing.get("run_time") or 0.0
+            target["ping_queue_wait"] += timing.get("queue_wait") or 0.0
+        increment("warm_pings", service_name=service_name)
+        increment("warm_ping_seconds", timing.get("run_time") or 0.0, service_name=service_name)
+
+    def record_activity(self, service_name: str):
+        """
+        The record_activity function notes a job of the service, so it is not pinged while it is in use.
+
+        Args:
+            service_name: str: Name of the service
+        """
+        with self.lock:
+            target = self.targets.get(service_name)
+            if target is not None:
+                target["last_activity"] = self.clock()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The report function returns what keeping the services warm costs.
+
+        Returns:
+            A dictionary per service with the number of pings and failed pings, their total run time and queue wait in
+            seconds, the cold start threshold and the current interval
+        """
+        with self.lock:
+            names = list(self.targets)
+        report = {}
+        for service_name in names:
+            interval = self.get_interval(service_name)
+            with self.lock:
+                target = self.targets.get(service_name)
+                if target is None:
+                    continue
+                report[service_name] = {
+                    "pings": target["pings"],
+                    "failed_pings": target["failed_pings"],
+                    "ping_run_time": target["ping_run_time"],
+                    "ping_queue_wait": target["ping_queue_wait"],
+                    "cold_start_threshold": target["threshold"],
+                    "interval": interval,
+                    "last_ping": target["last_ping"],
+                }
+        return report
+
+    def start(self, check_interval: float = 10):
+        """
+        The start function runs run_pending in a background thread every check_interval seconds.
+
+        Args:
+            check_interval: float: Seconds between two checks of the services
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        # a thread which is still finishing a ping after stop keeps its own stop event
+        stopped = self.stopped = threading.Event()
+
+        def loop():
+            while not stopped.is_set():
+                self.run_pending()
+                stopped.wait(check_interval)
+
+        # the pings use the options of the caller, e.g. its retry policy
+        context = copy_context()
+        self.thread = threading.Thread(target=context.run, args=(loop,), name="pyplanqk-warm-keeper", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: Optional[float] = 5):
+        """
+        The stop function stops the background thread.
+
+        A ping which is running is not interrupted, the thread ends after it without sending further pings. The
+        thread is a daemon thread, so it does not keep the process alive.
+
+        Args:
+            timeout: Optional[float]: Seconds to wait for the thread to end, None to wait until it ended
+        """
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                logger.warning("Warm keeper still finishes a ping after %s s.", timeout)
+        self.thread = None
@@ -13,6 +13,7 @@ from openapi_client.api.service_platform___jobs_api import ServicePlatformJobsAp
 from openapi_client.model.create_job_request import CreateJobRequest
 from openapi_client.model.job_dto import JobDto
 from pyplanqk.helpers import wait_for_service_to_be_created
+from pyplanqk.local_platform import LocalPlatform
 from pyplanqk.low_level_actions import (
     add_data_to_data_pool,
     create_application,
@@ -35,6 +36,12 @@ def api_key() -> Dict[str, str]:
     return api_key
 
 
+@pytest.fixture(scope="function")
+def local_platform() -> LocalPlatform:
+    with LocalPlatform(build_duration=0.2, job_duration=0.2) as platform:
+        yield platform
+
+
 @pytest.fixture(scope="function")
 def timeout() -> int:
     return 500
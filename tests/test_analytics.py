@@ -0,0 +1,65 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pyplanqk.analytics import get_job_timing, percentile, record_job_completion, summarize_job_timings
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.auto
+def test_get_job_timing():
+    print()
+    logger.debug("test_get_job_timing")
+
+    created_at = datetime(2024, 2, 1, 12, 0, 0, tzinfo=timezone.utc)
+    job = {
+        "id": "job_with_timing",
+        "status": "SUCCEEDED",
+        "created_at": created_at,
+        "started_at": "2024-02-01T12:00:04Z",
+        "ended_at": "2024-02-01T12:00:10",
+    }
+    record_job_completion(job["id"], created_at + timedelta(seconds=11.5))
+
+    timing = get_job_timing(job)
+    assert timing["queue_wait"] == 4
+    assert timing["run_time"] == 6
+    assert timing["total_time"] == 10
+    assert timing["polling_overhead"] == 1.5
+
+
+@pytest.mark.auto
+def test_get_job_timing_of_pending_job():
+    print()
+    logger.debug("test_get_job_timing_of_pending_job")
+
+    job = {"id": "pending_job", "status": "PENDING", "created_at": "2024-02-01T12:00:00Z"}
+
+    timing = get_job_timing(job)
+    assert timing["queue_wait"] is None
+    assert timing["run_time"] is None
+    assert timing["polling_overhead"] is None
+
+
+@pytest.mark.auto
+def test_summarize_job_timings():
+    print()
+    logger.debug("test_summarize_job_timings")
+
+    timings = []
+    for i in range(1, 5):
+        timing = {"status": "SUCCEEDED", "queue_wait": i, "run_time": 10 * i, "total_time": 11 * i}
+        timing["polling_overhead"] = None
+        timings.append(timing)
+    timings[-1]["status"] = "FAILED"
+
+    summary = summarize_job_timings(timings)
+    assert summary["job_count"] == 4
+    assert summary["statuses"] == {"SUCCEEDED": 3, "FAILED": 1}
+    assert summary["queue_wait"]["mean"] == 2.5
+    assert summary["run_time"]["p50"] == 25
+    assert summary["run_time"]["max"] == 40
+    assert summary["polling_overhead"]["count"] == 0
+    assert percentile([1, 2, 3, 4, 5], 95) == pytest.approx(4.8)
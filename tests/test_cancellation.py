@@ -0,0 +1,61 @@
+import logging
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyplanqk.cancellation import JobTracker
+from pyplanqk.local_platform import LocalPlatform
+
+logger = logging.getLogger(__name__)
+
+EXIT_SCRIPT = """
+import sys
+
+from pyplanqk.high_level_actions import PyPlanQK
+
+plnqk = PyPlanQK("api_key", cancel_on_exit=True)
+for job_id in sys.argv[1:]:
+    plnqk.job_tracker.add(job_id)
+"""
+
+
+@pytest.mark.auto
+def test_job_tracker():
+    print()
+    logger.debug("test_job_tracker")
+
+    tracker = JobTracker()
+    job_ids = [f"job_{i}" for i in range(100)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(tracker.add, job_ids))
+    assert len(tracker) == 100
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(tracker.discard, job_ids[:90]))
+    tracker.discard("unknown_job")
+    assert tracker.outstanding() == sorted(job_ids[90:])
+
+
+@pytest.mark.auto
+def test_cancel_on_exit():
+    print()
+    logger.debug("test_cancel_on_exit")
+
+    pytest.importorskip("openapi_client")
+
+    with LocalPlatform(job_duration=60) as platform:
+        service = platform.create_managed_service({"name": "service"})
+        definition_id = service["serviceDefinitions"][0]["id"]
+        job_ids = [platform.create_job({"serviceDefinitionId": definition_id}, None, None)["id"] for _ in range(2)]
+
+        # the jobs of the client are cancelled when the interpreter exits
+        env = dict(os.environ, PLANQK_PLATFORM_URL=platform.url)
+        command = [sys.executable, "-c", EXIT_SCRIPT, *job_ids]
+        result = subprocess.run(command, env=env, capture_output=True, text=True, timeout=60, check=False)
+        assert result.returncode == 0, result.stderr
+        assert "Traceback" not in result.stderr, result.stderr
+        assert platform.request_counts["delete_job"] == 2
+        assert all(job_id not in platform.jobs for job_id in job_ids)
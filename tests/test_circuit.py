@@ -0,0 +1,92 @@
+import logging
+
+import pytest
+import requests
+
+from pyplanqk.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_family
+from pyplanqk.metrics import get_gauge
+
+logger = logging.getLogger(__name__)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def respond(status: int):
+    def send(method: str, url: str, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        return response
+
+    return send
+
+
+def fail(method: str, url: str, **kwargs):
+    raise requests.ConnectionError("Connection refused.")
+
+
+@pytest.mark.auto
+def test_circuit_opens_and_recovers():
+    print()
+    logger.debug("test_circuit_opens_and_recovers")
+
+    clock = Clock()
+    breaker = CircuitBreaker("jobs", failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(2):
+        assert breaker.call(respond(503), "GET", "url").status_code == 503
+    with pytest.raises(requests.ConnectionError):
+        breaker.call(fail, "GET", "url")
+    assert breaker.state == OPEN
+    assert get_gauge("circuit_state", family="jobs") == 2
+
+    # fail fast while open
+    with pytest.raises(CircuitOpenError):
+        breaker.call(respond(200), "GET", "url")
+
+    # a failed probe opens the circuit again
+    clock.now = 10
+    assert breaker.call(respond(502), "GET", "url").status_code == 502
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(respond(200), "GET", "url")
+
+    # a successful probe closes the circuit
+    clock.now = 20
+    assert breaker.call(respond(200), "GET", "url").status_code == 200
+    assert breaker.state == CLOSED
+    assert get_gauge("circuit_state", family="jobs") == 0
+
+
+@pytest.mark.auto
+def test_half_open_limits_probes():
+    print()
+    logger.debug("test_half_open_limits_probes")
+
+    clock = Clock()
+    breaker = CircuitBreaker("services", failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.call(respond(500), "GET", "url")
+    clock.now = 5
+    breaker.before_request()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+@pytest.mark.auto
+def test_get_family():
+    print()
+    logger.debug("test_get_family")
+
+    base = "https://platform.planqk.de/qc-catalog"
+    assert get_family(f"{base}/services/id/versions/v/status") == "services"
+    assert get_family(f"{base}/services/id/versions/v/jobs") == "jobs"
+    assert get_family(f"{base}/jobs/id") == "jobs"
+    assert get_family(f"{base}/apps/id/subscriptions") == "applications"
+    assert get_family(f"{base}/data-pools/id/data-source-descriptors") == "data_pools"
+    assert get_family("https://gateway.platform.planqk.de/token") == "token"
+    assert get_family("https://gateway.platform.planqk.de/context/service/1.0.0/id/result") == "gateway"
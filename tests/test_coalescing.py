@@ -0,0 +1,59 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyplanqk.coalescing import SingleFlight
+from pyplanqk.local_platform import LocalPlatform
+from pyplanqk.transport import send
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.auto
+def test_single_flight_shares_result():
+    print()
+    logger.debug("test_single_flight_shares_result")
+
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        leader = executor.submit(single_flight.do, "key", call)
+        started.wait()
+        followers = [executor.submit(single_flight.do, "key", call) for _ in range(7)]
+        release.set()
+        results = [leader.result()] + [follower.result() for follower in followers]
+
+    assert results == ["result"] * 8
+    assert len(calls) == 1
+    # finished calls are not cached
+    assert single_flight.do("key", lambda: "next") == "next"
+
+
+@pytest.mark.auto
+def test_concurrent_identical_requests_are_coalesced():
+    print()
+    logger.debug("test_concurrent_identical_requests_are_coalesced")
+
+    with LocalPlatform(latency=0.3) as platform:
+        barrier = threading.Barrier(16)
+
+        def get_services():
+            barrier.wait()
+            return send("GET", f"{platform.url}/services", headers={"X-Auth-Token": "api_key"}, timeout=30)
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            responses = list(executor.map(lambda _: get_services(), range(16)))
+
+        assert all(response.status_code == 200 for response in responses)
+        assert platform.request_counts["get_services"] < 4
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+
+import pytest
+import requests
+
+from pyplanqk.circuit import reset_circuit_breakers
+from pyplanqk.concurrency import AIMDController, is_overload, run_adaptive, run_graph, use_concurrency_controller
+from pyplanqk.local_platform import LocalPlatform
+from pyplanqk.metrics import get_counter, get_gauge, reset_metrics
+from pyplanqk.retry import NO_RETRY, use_retry_policy
+from pyplanqk.transport import send
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {"X-Auth-Token": "api_key"}
+
+
+class Overloaded(Exception):
+    status = 429
+
+
+@pytest.mark.auto
+def test_aimd_controller():
+    print()
+    logger.debug("test_aimd_controller")
+
+    reset_metrics()
+    now = [0.0]
+    controller = AIMDController(name="test", initial_limit=4, max_limit=8, clock=lambda: now[0])
+
+    # additive increase by about one per round of calls
+    for _ in range(4):
+        controller.release(controller.acquire())
+    assert controller.get_limit() == 4
+    assert controller.limit > 4.9
+
+    # the calls of one round cut the limit only once
+    started = [controller.acquire() for _ in range(4)]
+    now[0] += 1
+    for start in started:
+        controller.release(start, overloaded=True)
+    assert controller.get_limit() == 2
+    assert get_counter("concurrency_decreases", controller="test", reason="overload") == 1
+    assert get_gauge("concurrency_limit", controller="test") == controller.limit
+
+    # several calls in a row much slower than usual cut the limit as well, a single one does not
+    for calls in range(3):
+        now[0] += 1
+        start = controller.acquire()
+        now[0] += 10
+        controller.release(start)
+        assert controller.get_limit() == (2 if calls < 2 else 1)
+    assert get_counter("concurrency_decreases", controller="test", reason="latency") == 1
+
+
+@pytest.mark.auto
+def test_is_overload():
+    print()
+    logger.debug("test_is_overload")
+
+    assert is_overload(Overloaded())
+    assert is_overload(TimeoutError())
+    assert not is_overload(ValueError())
+
+
+@pytest.mark.auto
+def test_run_adaptive():
+    print()
+    logger.debug("test_run_adaptive")
+
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def work(item: int) -> int:
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        if item == 3:
+            raise Overloaded()
+        return item * 2
+
+    controller = AIMDController(name="jobs", initial_limit=2, max_limit=4)
+    outcomes = run_adaptive(work, list(range(20)), controller)
+    assert [outcome["result"] for outcome in outcomes if outcome["error"] is None] == [
+        item * 2 for item in range(20) if item != 3
+    ]
+    assert isinstance(outcomes[3]["error"], Overloaded)
+    assert in_flight[1] <= 4
+
+
+@pytest.mark.auto
+def test_concurrency_limit_of_requests():
+    print()
+    logger.debug("test_concurrency_limit_of_requests")
+
+    controller = AIMDController(initial_limit=8)
+    with LocalPlatform() as platform, use_concurrency_controller(controller), use_retry_policy(NO_RETRY):
+        platform.fail_next("get_services", status=503)
+        response = send("GET", f"{platform.url}/services", headers=HEADERS)
+        assert response.status_code == 503
+        assert controller.get_limit() == 4
+
+        response = send("GET", f"{platform.url}/services", headers=HEADERS)
+        assert response.status_code == 200
+        assert controller.in_flight == 0
+
+        # other server errors and failures of the request itself do not cut the limit
+        limit = controller.get_limit()
+        platform.fail_next("get_services", status=500)
+        assert send("GET", f"{platform.url}/services", headers=HEADERS).status_code == 500
+        with pytest.raises(Exception):
+            send("GET", f"{platform.url}/services", headers=HEADERS, files={"file": object()})
+        assert controller.get_limit() == limit
+        assert controller.in_flight == 0
+
+        with pytest.raises(requests.ConnectionError):
+            send("GET", "http://127.0.0.1:1/services", headers=HEADERS, timeout=1)
+        assert controller.get_limit() == limit // 2
+        assert controller.in_flight == 0
+    reset_circuit_breakers()
+
+
+@pytest.mark.auto
+def test_run_graph():
+    print()
+    logger.debug("test_run_graph")
+
+    order = []
+    lock = threading.Lock()
+
+    def task(key: str):
+        def run():
+            time.sleep(0.05)
+            with lock:
+                order.append(key)
+            if key == "b":
+                raise Exception("b failed")
+            return key
+
+        return run
+
+    tasks = {key: task(key) for key in ["a1", "a2", "a3", "b", "c", "d"]}
+    dependencies = {"c": ["a1", "a2", "a3", "unknown"], "d": ["b"]}
+    start = time.monotonic()
+    outcomes = run_graph(tasks, dependencies, max_workers=8)
+    # independent tasks run together
+    assert time.monotonic() - start < 0.2
+    assert order.index("c") > max(order.index("a1"), order.index("a2"), order.index("a3"))
+    assert outcomes["c"] == {"result": "c", "error": None}
+    # a task with a failed dependency is not run
+    assert "d" not in order
+    assert "b" in str(outcomes["d"]["error"])
+
+    with pytest.raises(Exception, match="Cyclic"):
+        run_graph({"a": lambda: 1, "b": lambda: 2}, {"a": ["b"], "b": ["a"]})
@@ -0,0 +1,84 @@
+import io
+import logging
+
+import pytest
+
+from pyplanqk.deployment import add_content_hash, get_content_hash, read_content_hash
+from pyplanqk.local_platform import LocalPlatform
+from pyplanqk.low_level_actions import ServiceUpdateNotSupportedError, update_managed_service
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.auto
+def test_content_hash():
+    print()
+    logger.debug("test_content_hash")
+
+    user_code = io.BytesIO(b"user code")
+    user_code.read(4)
+    config = {"name": "service", "user_code": user_code, "api_definition": b"openapi: 3.0.0"}
+    content_hash = get_content_hash(config)
+    # the files are rewound to where they were, so they can still be uploaded
+    assert user_code.tell() == 4
+    assert get_content_hash(config) == content_hash
+
+    # the hash covers the content from the current position on, like the upload
+    assert get_content_hash(dict(config, user_code=io.BytesIO(b" code"))) == content_hash
+    assert get_content_hash(dict(config, api_definition=b"openapi: 3.1.0")) != content_hash
+    assert get_content_hash(dict(config, description="other")) == content_hash
+
+
+@pytest.mark.auto
+def test_content_hash_in_description():
+    print()
+    logger.debug("test_content_hash_in_description")
+
+    first = "a" * 64
+    second = "b" * 64
+    assert read_content_hash(None) is None
+    assert read_content_hash("Service for unit testing.") is None
+
+    description = add_content_hash("Service for unit testing.", first)
+    assert description.startswith("Service for unit testing.\n\n")
+    assert read_content_hash(description) == first
+
+    description = add_content_hash(description, second)
+    assert read_content_hash(description) == second
+    assert description.count("content-hash") == 1
+    assert add_content_hash(None, first) == f"[pyplanqk:content-hash={first}]"
+
+
+@pytest.mark.auto
+def test_update_managed_service():
+    print()
+    logger.debug("test_update_managed_service")
+
+    content_hash = get_content_hash({"user_code": b"new user code"})
+    config = {"user_code": b"new user code", "description": add_content_hash("service", content_hash)}
+    with LocalPlatform() as platform:
+        service = platform.create_managed_service({"name": "service", "description": "service"})
+        service_id = service["id"]
+        version_id = service["serviceDefinitions"][0]["id"]
+
+        # the content hash is not written if the user code was not accepted
+        platform.fail_next("update_source_code", status=400)
+        with pytest.raises(Exception):
+            update_managed_service(service_id, version_id, config, {"apiKey": "api_key"})
+        assert read_content_hash(platform.services[service_id]["description"]) is None
+        assert platform.request_counts["update_version"] == 0
+
+        version = update_managed_service(service_id, version_id, config, {"apiKey": "api_key"})
+        assert read_content_hash(version["description"]) == content_hash
+        assert platform.services[service_id]["user_code"] == b"new user code"
+        assert platform.request_counts["update_source_code"] == 2
+        assert platform.request_counts["update_version"] == 1
+
+        # platforms without the update routes fail before anything changed
+        platform.fail_next("update_api_definition", status=405)
+        with pytest.raises(ServiceUpdateNotSupportedError):
+            update_managed_service(
+                service_id, version_id, dict(config, api_definition=b"openapi: 3.0.0"), {"apiKey": "api_key"}
+            )
+        assert platform.request_counts["update_source_code"] == 2
+        assert platform.request_counts["update_version"] == 1
@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from pyplanqk import hedging
+from pyplanqk.hedging import HedgingPolicy, get_latency_key
+from pyplanqk.metrics import get_counter, reset_metrics
+
+logger = logging.getLogger(__name__)
+
+URL = "https://platform.planqk.de/qc-catalog/jobs/id"
+KEY = "jobs:status_reads"
+
+
+class SlowFirstCall:
+    def __init__(self, slow: float):
+        self.slow = slow
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, method: str, url: str, **kwargs) -> str:
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            time.sleep(self.slow)
+            return "slow"
+        return "fast"
+
+
+def warm_up(policy: HedgingPolicy):
+    for _ in range(policy.min_samples):
+        policy.observe(KEY, 0.01)
+    policy.requests = 100
+
+
+@pytest.mark.auto
+def test_slow_request_is_hedged():
+    print()
+    logger.debug("test_slow_request_is_hedged")
+
+    reset_metrics()
+    policy = HedgingPolicy()
+    warm_up(policy)
+
+    start = time.perf_counter()
+    assert policy.send(SlowFirstCall(1.0), "GET", URL) == "fast"
+    assert time.perf_counter() - start < 0.5
+    assert get_counter("hedged_requests", family="jobs") == 1
+    assert get_counter("hedge_wins", family="jobs") == 1
+
+
+@pytest.mark.auto
+def test_hedging_budget_and_methods():
+    print()
+    logger.debug("test_hedging_budget_and_methods")
+
+    policy = HedgingPolicy(max_extra_ratio=0)
+    warm_up(policy)
+    assert policy.send(SlowFirstCall(0.2), "GET", URL) == "slow"
+
+    policy = HedgingPolicy()
+    warm_up(policy)
+    assert policy.send(SlowFirstCall(0.2), "POST", URL) == "slow"
+
+    # without known latencies nothing is hedged
+    policy = HedgingPolicy()
+    assert policy.get_delay(KEY) is None
+    assert policy.send(SlowFirstCall(0.2), "GET", URL) == "slow"
+    assert len(policy.latencies[KEY]) == 1
+
+
+@pytest.mark.auto
+def test_hedging_keys_and_threads(monkeypatch: pytest.MonkeyPatch):
+    print()
+    logger.debug("test_hedging_keys_and_threads")
+
+    # status reads and listings of the same family have their own delays
+    assert get_latency_key("GET", URL) == KEY
+    assert get_latency_key("GET", "https://platform.planqk.de/qc-catalog/jobs") == "jobs:listings"
+
+    threads = []
+
+    def record_thread(method: str, url: str, **kwargs) -> str:
+        threads.append(threading.current_thread().name)
+        return "ok"
+
+    # a request which cannot be hedged is sent in the thread of the caller
+    policy = HedgingPolicy()
+    assert policy.send(record_thread, "GET", URL) == "ok"
+    assert threads == [threading.current_thread().name]
+
+    # the primary request does not wait for a worker of the shared hedging pool
+    warm_up(policy)
+    assert policy.send(record_thread, "GET", URL) == "ok"
+    assert threads[1] == "pyplanqk-hedging-primary"
+
+    # the threads of the primary requests are bounded, beyond the bound requests are sent without a hedge
+    monkeypatch.setattr(hedging, "_primary_threads", threading.BoundedSemaphore(0))
+    assert policy.send(record_thread, "GET", URL) == "ok"
+    assert threads[2] == threading.current_thread().name
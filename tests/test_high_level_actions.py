@@ -160,6 +160,34 @@ def test_execute_service_predict(
         assert False
 
 
+@pytest.mark.auto
+def test_execute_service_timeout_cancels_job(
+    service_info: Tuple[Dict[str, Any], Dict[str, Any]],
+    api_key: Dict[str, str],
+    train_data: Dict[str, Any],
+    train_params: Dict[str, Any],
+):
+    print()
+    logger.debug("test_execute_service_timeout_cancels_job")
+
+    simple_service, config = service_info
+
+    applications = []
+    services = [simple_service]
+
+    try:
+        plnqk = PyPlanQK(api_key["apiKey"], cancel_on_abort=True)
+        service_name = simple_service["name"]
+        with pytest.raises(TimeoutError):
+            plnqk.execute_service(service_name, data=train_data, params=train_params, timeout=1)
+        assert len(plnqk.job_tracker) == 0
+        assert len(get_service_jobs(service_name, api_key)) == 0
+        cleanup_services_and_applications(applications, services, api_key)
+    except Exception as e:
+        logger.debug(e)
+        assert False
+
+
 @pytest.mark.auto
 def test_create_data_pool(api_key: Dict[str, str]):
     print()
@@ -0,0 +1,121 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pyplanqk.idempotency import IdempotencyLedger, find_submitted_job, fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.auto
+def test_fingerprint_ignores_formatting():
+    print()
+    logger.debug("test_fingerprint_ignores_formatting")
+
+    assert fingerprint('{"a": 1, "b": [1, 2]}') == fingerprint('{"b":[1,2],"a":1}')
+    assert fingerprint('{"a": 1}') != fingerprint('{"a": 2}')
+    assert fingerprint(None) is None
+    assert fingerprint('{"a": 1}', '{"x": 1}') != fingerprint('{"a": 1}', '{"x": 2}')
+    assert fingerprint(None, input_data_ref={"dataPoolId": "id"}) == fingerprint(
+        None, input_data_ref={"data_pool_id": "id"}
+    )
+
+
+@pytest.mark.auto
+def test_find_submitted_job():
+    print()
+    logger.debug("test_find_submitted_job")
+
+    submitted_after = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    parameters = json.dumps({"shots": 100})
+
+    def job(job_id: str, params: dict, created_at: datetime) -> dict:
+        return {"id": job_id, "parameters": json.dumps(params), "created_at": created_at.isoformat()}
+
+    jobs = [
+        job("old", {"shots": 100}, submitted_after - timedelta(minutes=5)),
+        job("other", {"shots": 10}, submitted_after + timedelta(seconds=1)),
+        job("claimed", {"shots": 100}, submitted_after + timedelta(seconds=1)),
+        job("late", {"shots": 100}, submitted_after + timedelta(seconds=3)),
+        job("match", {"shots": 100}, submitted_after + timedelta(seconds=2)),
+    ]
+    ledger = IdempotencyLedger()
+    ledger.record("key", "claimed")
+
+    assert find_submitted_job(jobs, parameters, submitted_after, ledger)["id"] == "match"
+    assert find_submitted_job(jobs[:3], parameters, submitted_after, ledger) is None
+
+
+@pytest.mark.auto
+def test_find_submitted_job_compares_input_data():
+    print()
+    logger.debug("test_find_submitted_job_compares_input_data")
+
+    # the clock of the platform is behind the local clock
+    submitted_after = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    created_at = (submitted_after - timedelta(seconds=10)).isoformat()
+    parameters = json.dumps({"shots": 100})
+    jobs = [
+        {"id": "other", "parameters": parameters, "inputData": '{"x": 1}', "created_at": created_at},
+        {"id": "match", "parameters": parameters, "inputData": '{"x": 2}', "created_at": created_at},
+        {"id": "unknown", "parameters": parameters, "created_at": created_at},
+    ]
+    ledger = IdempotencyLedger()
+
+    assert find_submitted_job(jobs, parameters, submitted_after, ledger, input_data='{"x":2}')["id"] == "match"
+    assert find_submitted_job(jobs, parameters, submitted_after, ledger, input_data='{"x":3}') is None
+    assert (
+        find_submitted_job(
+            jobs, parameters, submitted_after, ledger, input_data='{"x":2}', max_clock_skew=timedelta(seconds=5)
+        )
+        is None
+    )
+
+
+@pytest.mark.auto
+def test_ledger_is_bounded():
+    print()
+    logger.debug("test_ledger_is_bounded")
+
+    ledger = IdempotencyLedger(max_entries=2)
+    for index in range(3):
+        ledger.record(f"key_{index}", f"job_{index}")
+    assert ledger.get("key_0") is None
+    assert ledger.get("key_2") == "job_2"
+    assert ledger.claimed() == {"job_1", "job_2"}
+
+
+@pytest.mark.auto
+def test_ledger_submits_a_key_once():
+    print()
+    logger.debug("test_ledger_submits_a_key_once")
+
+    ledger = IdempotencyLedger()
+    submissions = []
+
+    def submit() -> str:
+        submissions.append(1)
+        time.sleep(0.1)
+        return f"job_{len(submissions)}"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ledger.submit("key", submit))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(submissions) == 1
+    assert sorted(results) == [("job_1", False)] * 7 + [("job_1", True)]
+    assert ledger.submit("key", submit) == ("job_1", False)
+
+    def fail() -> str:
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        ledger.submit("other", fail)
+    assert ledger.submit("other", submit) == ("job_2", True)
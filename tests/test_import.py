@@ -0,0 +1,34 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+logger = logging.getLogger(__name__)
+
+LAZY_MODULES = ["requests", "openapi_client", "dotenv", "dateutil"]
+
+
+@pytest.mark.auto
+def test_import_is_lazy():
+    print()
+    logger.debug("test_import_is_lazy")
+
+    code = f"import sys; import pyplanqk.high_level_actions; print([m for m in {LAZY_MODULES} if m in sys.modules])"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+@pytest.mark.auto
+def test_import_has_no_side_effects(tmp_path):
+    print()
+    logger.debug("test_import_has_no_side_effects")
+
+    (tmp_path / ".env").write_text("PLANQK_PLATFORM_URL=http://from-env-file\n")
+    code = "import os; import pyplanqk; from pyplanqk import PyPlanQK; print(os.getenv('PLANQK_PLATFORM_URL'))"
+    env = {key: value for key, value in os.environ.items() if key != "PLANQK_PLATFORM_URL"}
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=tmp_path, env=env
+    ).stdout
+    assert output.strip() == "None"
@@ -0,0 +1,371 @@
+import io
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+import pytest
+import requests
+
+from pyplanqk.concurrency import AIMDController
+from pyplanqk.helpers import wait_for_service_to_be_created
+from pyplanqk.high_level_actions import PyPlanQK
+from pyplanqk.local_platform import LocalPlatform
+from pyplanqk.metrics import get_counter, reset_metrics
+from pyplanqk.low_level_actions import (
+    create_application,
+    create_data_pool,
+    create_managed_service,
+    get_access_token,
+    get_data_pool_file_information,
+    get_data_pools,
+    get_service,
+    get_service_jobs,
+    get_services,
+    publish_service_internally,
+    remove_data_pool,
+    subscribe_application_to_service,
+    trigger_service_job,
+)
+from util import get_test_data_path
+
+logger = logging.getLogger(__name__)
+
+LOCAL_API_KEY = "local_api_key"
+
+
+@pytest.mark.auto
+def test_local_data_pool(local_platform: LocalPlatform):
+    print()
+    logger.debug("test_local_data_pool")
+
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    file = open(f"{get_test_data_path()}data.json", "rb")
+    file_info = plnqk.create_data_pool("data_pool", file)
+    assert file_info["identifier"] == "data.json"
+
+    assert len(get_data_pools(LOCAL_API_KEY)) == 1
+    assert list(get_data_pool_file_information("data_pool", LOCAL_API_KEY)) == ["data.json"]
+    assert remove_data_pool("data_pool", LOCAL_API_KEY)
+    assert len(get_data_pools(LOCAL_API_KEY)) == 0
+    assert local_platform.request_counts["add_data_source_descriptor"] == 1
+
+
+@pytest.mark.auto
+def test_local_access_token(local_platform: LocalPlatform):
+    print()
+    logger.debug("test_local_access_token")
+
+    access_token = get_access_token("consumer_key", "consumer_secret", local_platform.token_url)
+    assert len(access_token) > 0
+
+
+@pytest.mark.auto
+def test_local_service_execution(local_platform: LocalPlatform, config: Dict[str, Any], train_params: Dict[str, Any]):
+    print()
+    logger.debug("test_local_service_execution")
+
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    service = plnqk.create_service(config)
+    assert service is not None
+    assert get_service(config["name"], {"apiKey": LOCAL_API_KEY})["id"] == service["id"]
+
+    result = plnqk.execute_service(config["name"], data={"x": [1, 2]}, params=train_params)
+    assert result == {"params": train_params}
+    assert len(get_service_jobs(config["name"], {"apiKey": LOCAL_API_KEY})) == 1
+
+
+@pytest.mark.auto
+def test_local_failure_injection(local_platform: LocalPlatform):
+    print()
+    logger.debug("test_local_failure_injection")
+
+    local_platform.fail_next("create_data_pool", status=429, retry_after=2)
+    response = requests.post(f"{local_platform.url}/data-pools", json={"name": "data_pool"}, timeout=30)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+    data_pool = create_data_pool("data_pool", LOCAL_API_KEY)
+    assert data_pool["name"] == "data_pool"
+    assert local_platform.request_counts["create_data_pool"] == 2
+
+
+@pytest.mark.auto
+def test_local_idempotent_job_submission(
+    local_platform: LocalPlatform, config: Dict[str, Any], train_params: Dict[str, Any]
+):
+    print()
+    logger.debug("test_local_idempotent_job_submission")
+
+    api_key = {"apiKey": LOCAL_API_KEY}
+    PyPlanQK(LOCAL_API_KEY).create_service(config)
+    reset_metrics()
+
+    # the job was not created, so it is submitted again
+    local_platform.fail_next("create_job", status=502)
+    job = trigger_service_job(config["name"], api_key, data={"x": [1, 2]}, params=train_params, step=0.1)
+    assert job["status"] == "SUCCEEDED"
+    assert get_counter("job_resubmissions") == 1
+
+    # a job is submitted only once per key
+    first = trigger_service_job(config["name"], api_key, params=train_params, step=0.1, idempotency_key="key")
+    second = trigger_service_job(config["name"], api_key, params=train_params, step=0.1, idempotency_key="key")
+    assert first["id"] == second["id"]
+    assert len(get_service_jobs(config["name"], api_key)) == 2
+
+
+@pytest.mark.auto
+def test_local_service_batch(local_platform: LocalPlatform, config: Dict[str, Any], train_params: Dict[str, Any]):
+    print()
+    logger.debug("test_local_service_batch")
+
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    plnqk.create_service(config)
+
+    local_platform.fail_next("create_job", status=429)
+    jobs = [{"data": {"x": [i]}, "params": train_params} for i in range(6)]
+    outcomes = plnqk.execute_service_batch(config["name"], jobs, controller=AIMDController(name="jobs", max_limit=4))
+    assert [outcome["error"] for outcome in outcomes] == [None] * 6
+    assert [outcome["result"] for outcome in outcomes] == [{"params": train_params}] * 6
+
+
+@pytest.mark.auto
+def test_local_create_services(local_platform: LocalPlatform, config: Dict[str, Any]):
+    print()
+    logger.debug("test_local_create_services")
+
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    plnqk.create_service(config)
+
+    configs = [config]
+    for i in range(3):
+        other = dict(config)
+        other["name"] = f"{config['name']}_{i}"
+        other["user_code"] = open("tests/data/template.zip", "rb")
+        configs.append(other)
+    local_platform.reset_counts()
+    outcomes = plnqk.create_services(configs)
+    assert [outcome["status"] for outcome in outcomes.values()] == ["EXISTS", "SUCCESS", "SUCCESS", "SUCCESS"]
+    assert all(outcome["service"]["name"] == name for name, outcome in outcomes.items())
+    assert local_platform.request_counts["create_managed_service"] == 3
+    # the builds are awaited together
+    assert local_platform.request_counts["get_build_status"] <= 9
+
+
+@pytest.mark.auto
+def test_local_build_wait(config: Dict[str, Any]):
+    print()
+    logger.debug("test_local_build_wait")
+
+    api_key = {"apiKey": LOCAL_API_KEY}
+    with LocalPlatform(build_duration=0):
+        service = create_managed_service(config, api_key)
+        version_id = service["service_definitions"][0]["id"]
+        # an already finished build returns after the first poll without sleeping
+        start = time.monotonic()
+        build = wait_for_service_to_be_created(service["id"], version_id, api_key, step=5)
+        assert build["status"] == "SUCCESS"
+        assert build["polls"] == 1
+        assert time.monotonic() - start < 5
+
+    with LocalPlatform(build_duration=0, build_failure_rate=1):
+        config["user_code"].seek(0)
+        config["api_definition"].seek(0)
+        service = create_managed_service(config, api_key)
+        with pytest.raises(Exception, match="FAILED"):
+            wait_for_service_to_be_created(service["id"], service["service_definitions"][0]["id"], api_key)
+
+    with LocalPlatform(build_duration=60):
+        config["user_code"].seek(0)
+        config["api_definition"].seek(0)
+        service = create_managed_service(config, api_key)
+        with pytest.raises(TimeoutError):
+            wait_for_service_to_be_created(service["id"], service["service_definitions"][0]["id"], api_key, timeout=1)
+
+
+@pytest.mark.auto
+def test_local_content_hash_deploy(local_platform: LocalPlatform, config: Dict[str, Any]):
+    print()
+    logger.debug("test_local_content_hash_deploy")
+
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    service = plnqk.create_service(config)
+
+    # unchanged code is neither uploaded nor built again
+    local_platform.reset_counts()
+    config["user_code"].seek(0)
+    config["api_definition"].seek(0)
+    assert plnqk.create_service(config)["id"] == service["id"]
+    assert local_platform.request_counts["create_managed_service"] == 0
+    assert local_platform.request_counts["update_source_code"] == 0
+
+    # changed code is updated in place
+    config["user_code"] = io.BytesIO(b"changed user code")
+    config["api_definition"].seek(0)
+    assert plnqk.create_service(config)["id"] == service["id"]
+    assert local_platform.request_counts["create_managed_service"] == 0
+    assert local_platform.request_counts["delete_service"] == 0
+    assert local_platform.request_counts["update_source_code"] == 1
+
+    # without the update routes the service is created again
+    local_platform.reset_counts()
+    local_platform.fail_next("update_api_definition", status=405)
+    config["user_code"] = io.BytesIO(b"user code changed again")
+    config["api_definition"].seek(0)
+    recreated = plnqk.create_service(config)
+    assert recreated["id"] != service["id"]
+    assert service["id"] not in local_platform.services
+    assert local_platform.request_counts["update_source_code"] == 0
+    assert local_platform.request_counts["delete_service"] == 1
+    assert local_platform.request_counts["create_managed_service"] == 1
+
+
+@pytest.mark.auto
+def test_local_teardown(local_platform: LocalPlatform, config: Dict[str, Any]):
+    print()
+    logger.debug("test_local_teardown")
+
+    api_key = {"apiKey": LOCAL_API_KEY}
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    names = [config["name"], f"{config['name']}_1"]
+    other = dict(config)
+    other["name"] = names[1]
+    other["user_code"] = open("tests/data/template.zip", "rb")
+    plnqk.create_services([config, other])
+    publish_service_internally(names[0], api_key)
+    create_application("application", api_key)
+    subscribe_application_to_service("application", names[0], api_key)
+    create_data_pool("data_pool", LOCAL_API_KEY)
+
+    local_platform.reset_counts()
+    removed = plnqk.teardown(services=names, applications=["application"], data_pools=["data_pool", "missing"])
+    assert removed["services"] == {names[0]: True, names[1]: True}
+    assert removed["applications"] == {"application": True}
+    assert list(removed["subscriptions"].values()) == [True]
+    assert removed["data_pools"] == {"data_pool": True, "missing": True}
+    assert len(get_services(api_key)) == 0
+    assert len(get_data_pools(LOCAL_API_KEY)) == 0
+
+    # the names are resolved once and the resources removed by id
+    counts = local_platform.request_counts
+    assert counts["get_services"] == 3
+    assert counts["get_applications"] == 1
+    assert counts["get_service"] == 0
+    assert counts["unpublish_service"] == 1
+    assert counts["delete_application_subscription"] == 1
+    assert counts["delete_service"] == 2
+
+
+@pytest.mark.auto
+def test_local_plan_apply(local_platform: LocalPlatform, config: Dict[str, Any]):
+    print()
+    logger.debug("test_local_plan_apply")
+
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    other = dict(config)
+    other["name"] = f"{config['name']}_1"
+    other["user_code"] = open("tests/data/template.zip", "rb")
+    spec = {
+        "services": [dict(config, published=True), other],
+        "applications": [{"name": "application", "subscriptions": [config["name"]]}],
+        "data_pools": [{"name": "data_pool", "files": [f"{get_test_data_path()}data.json"]}],
+    }
+    changes = plnqk.plan(spec)
+    assert [change["key"] for change in changes] == [
+        f"create_service:{config['name']}",
+        f"publish_service:{config['name']}",
+        f"create_service:{other['name']}",
+        "create_application:application",
+        f"subscribe:application/{config['name']}",
+        "create_data_pool:data_pool",
+        "add_data:data_pool/data.json",
+    ]
+    outcomes = plnqk.apply(changes)
+    assert all(outcome["error"] is None for outcome in outcomes.values())
+    assert local_platform.request_counts["create_managed_service"] == 2
+
+    # the platform matches the spec, so nothing is changed
+    local_platform.reset_counts()
+    assert plnqk.plan(spec) == []
+    assert local_platform.request_counts["get_services"] == 3
+    assert local_platform.request_counts["get_service"] == 2
+
+    # only the difference is applied
+    spec["services"][0]["published"] = False
+    spec["applications"][0]["subscriptions"] = [other["name"]]
+    changes = plnqk.plan(spec)
+    assert [change["key"] for change in changes] == [
+        f"unpublish_service:{config['name']}",
+        f"unsubscribe:application/{config['name']}",
+        f"subscribe:application/{other['name']}",
+    ]
+    assert changes[0]["depends_on"] == [
+        f"unsubscribe:application/{config['name']}",
+        f"update_service:{config['name']}",
+    ]
+    outcomes = plnqk.apply(changes)
+    assert all(outcome["error"] is None for outcome in outcomes.values())
+    assert plnqk.plan(spec) == []
+
+    # without the update routes a changed service is created again and published again
+    spec["services"][0]["published"] = True
+    outcomes = plnqk.apply(plnqk.plan(spec))
+    assert all(outcome["error"] is None for outcome in outcomes.values())
+    service_id = get_service(config["name"], {"apiKey": LOCAL_API_KEY})["id"]
+    spec["services"][0]["user_code"] = io.BytesIO(b"changed user code")
+    local_platform.fail_next("update_api_definition", status=405)
+    changes = plnqk.plan(spec)
+    assert [change["key"] for change in changes] == [f"update_service:{config['name']}"]
+    outcomes = plnqk.apply(changes)
+    assert all(outcome["error"] is None for outcome in outcomes.values())
+    service = get_service(config["name"], {"apiKey": LOCAL_API_KEY})
+    assert service["id"] != service_id
+    assert service["service_definitions"][0]["lifecycle"] == "ACCESSIBLE"
+    assert plnqk.plan(spec) == []
+
+
+@pytest.mark.auto
+def test_local_slow_handler_does_not_block():
+    print()
+    logger.debug("test_local_slow_handler_does_not_block")
+
+    def handler(data: Any, params: Any) -> Any:
+        time.sleep(1)
+        return data
+
+    platform = LocalPlatform(handler=handler)
+    job = platform._new_job(None, {"x": 1}, None)  # pylint: disable=protected-access
+    platform.jobs[job["id"]] = job
+    platform.pending_jobs[job["id"]] = job
+
+    # the first request runs the handler, the second one is answered meanwhile
+    thread = threading.Thread(target=platform.handle, args=("GET", f"/jobs/{job['id']}", {}, {}, b""))
+    thread.start()
+    time.sleep(0.1)
+    start = time.time()
+    assert platform.handle("GET", "/applications", {}, {}, b"")[1] == 200
+    assert time.time() - start < 0.5
+    thread.join()
+
+    _, status_code, body = platform.handle("GET", f"/jobs/{job['id']}", {}, {}, b"")
+    assert status_code == 200
+    assert body["status"] == "SUCCEEDED"
+
+
+@pytest.mark.auto
+def test_local_execute_service_timeout(
+    local_platform: LocalPlatform, config: Dict[str, Any], train_params: Dict[str, Any]
+):
+    print()
+    logger.debug("test_local_execute_service_timeout")
+
+    plnqk = PyPlanQK(LOCAL_API_KEY)
+    plnqk.create_service(config)
+
+    # a job which is still running raises a timeout instead of decoding its missing result
+    local_platform.job_duration = 5
+    with pytest.raises(TimeoutError, match="not finished"):
+        plnqk.execute_service(config["name"], data={"x": [1, 2]}, params=train_params, timeout=0.5)
+    assert len(plnqk.job_tracker) == 1
+    plnqk.close()
+    assert len(plnqk.job_tracker) == 0
@@ -0,0 +1,109 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyplanqk.high_level_actions import PyPlanQK
+from pyplanqk.local_runtime import LocalRuntime
+from pyplanqk.packaging import package_user_code
+
+logger = logging.getLogger(__name__)
+
+PROGRAM = """
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Response:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def to_json(self):
+        import json
+
+        return json.dumps(self.__dict__)
+
+
+def run(data, params):
+    if params.get("fail"):
+        return Response(code="500", detail="Invalid mode.")
+    if params.get("sleep"):
+        import time
+
+        time.sleep(params["sleep"])
+    return Response(result={"sum": sum(data["values"]), "pid": os.getpid(), "cwd": os.getcwd()}, metadata=None)
+"""
+
+
+@pytest.fixture(scope="function")
+def user_code(tmp_path) -> str:
+    source_dir = tmp_path / "source"
+    os.makedirs(source_dir / "src")
+    (source_dir / "src" / "__init__.py").write_text("")
+    (source_dir / "src" / "program.py").write_text(PROGRAM)
+    return package_user_code(str(source_dir), output=str(tmp_path / "user_code.zip"), cache_dir=str(tmp_path / "cache"))
+
+
+@pytest.mark.auto
+def test_local_runtime(user_code: str, tmp_path):
+    print()
+    logger.debug("test_local_runtime")
+
+    with LocalRuntime(user_code, max_workers=2) as runtime:
+        result = runtime.run({"values": [1, 2, 3]}, {})
+        assert result["sum"] == 6
+        assert result["pid"] != os.getpid()
+        # the user code runs in its unpacked directory, like in the container of the service
+        assert os.path.realpath(result["cwd"]) == os.path.realpath(runtime.root)
+
+        with pytest.raises(Exception, match="Invalid mode"):
+            runtime.run({"values": []}, {"fail": True})
+        with pytest.raises(TimeoutError):
+            runtime.run({"values": []}, {"sleep": 1.5}, timeout=0.5)
+    assert not os.path.exists(runtime.root)
+
+    with pytest.raises(Exception, match="entry point"):
+        LocalRuntime(str(tmp_path))
+
+
+@pytest.mark.auto
+def test_execute_local_service(user_code: str):
+    print()
+    logger.debug("test_execute_local_service")
+
+    with PyPlanQK("api_key", local_services={"local_service": user_code}) as plnqk:
+        result = plnqk.execute_service("local_service", data={"values": [4, 5]}, params={})
+        assert result["sum"] == 9
+        with pytest.raises(Exception):
+            plnqk.execute_service("local_service", data_ref={"id": "data_pool"}, params={})
+        with pytest.raises(Exception, match="Idempotency keys"):
+            plnqk.execute_service("local_service", data={"values": [4, 5]}, params={}, idempotency_key="key")
+    assert len(plnqk.local_runtimes) == 0
+
+
+@pytest.mark.auto
+def test_local_runtime_stops_timed_out_jobs(user_code: str):
+    print()
+    logger.debug("test_local_runtime_stops_timed_out_jobs")
+
+    with LocalRuntime(user_code, max_workers=2) as runtime:
+        # the job next to the timed out one is run again in the new pool
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            other = executor.submit(runtime.run, {"values": [1]}, {"sleep": 2})
+            time.sleep(0.5)
+            with pytest.raises(TimeoutError):
+                runtime.run({"values": []}, {"sleep": 60}, timeout=1)
+            assert other.result()["sum"] == 1
+
+        assert runtime.run({"values": [2]}, {})["sum"] == 2
+
+        # close does not wait for running jobs
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.submit(runtime.run, {"values": []}, {"sleep": 60})
+        time.sleep(0.5)
+        start = time.time()
+    assert time.time() - start < 10
+    executor.shutdown(wait=True)
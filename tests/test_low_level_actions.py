@@ -19,6 +19,7 @@ from pyplanqk.low_level_actions import (
     get_data_pool_file_information,
     get_data_pools,
     get_service,
+    get_service_job_timings,
     get_services,
     get_version,
     publish_service_internally,
@@ -52,7 +53,8 @@ def test_create_managed_service(config: Dict[str, Any], api_key: Dict[str, str])
         version = get_version(service_name, api_key)
         version_id = version["id"]
         result = wait_for_service_to_be_created(service_id, version_id, api_key, timeout=500, step=5)
-        assert result
+        assert result["status"] == "SUCCESS"
+        assert result["polls"] >= 1
 
         cleanup_services_and_applications(applications, services, api_key)
     except Exception as e:
@@ -480,6 +482,51 @@ def test_trigger_service_job_data_upload_train(
         assert False
 
 
+@pytest.mark.auto
+@pytest.mark.slow_service
+def test_get_service_job_timings(
+    service_info: Tuple[Dict[str, Any], Dict[str, Any]],
+    train_data: Dict[str, Any],
+    train_params: Dict[str, Any],
+    api_key: Dict[str, str],
+    timeout: int,
+    step: int,
+):
+    print()
+    logger.debug("test_get_service_job_timings")
+
+    simple_service, config = service_info
+
+    applications = []
+    services = [simple_service]
+
+    try:
+        service_name = simple_service["name"]
+        job = trigger_service_job(
+            service_name=service_name,
+            data=train_data,
+            params=train_params,
+            api_key=api_key,
+            mode="DATA_UPLOAD",
+            timeout=timeout,
+            step=step,
+        )
+        assert job is not None
+
+        timings = get_service_job_timings(service_name, api_key)
+        assert timings["job_count"] == 1
+        job_timing = timings["jobs"][0]
+        assert job_timing["id"] == job["id"]
+        assert job_timing["queue_wait"] >= 0
+        assert job_timing["run_time"] >= 0
+        assert job_timing["polling_overhead"] >= 0
+
+        cleanup_services_and_applications(applications, services, api_key)
+    except Exception as e:
+        logger.debug(e)
+        assert False
+
+
 @pytest.mark.auto
 @pytest.mark.slow_service
 def test_trigger_service_job_data_pool_train(
@@ -0,0 +1,61 @@
+import logging
+import os
+import zipfile
+
+import pytest
+
+from pyplanqk.packaging import list_files, package_user_code
+from util import get_test_data_path
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="function")
+def source_dir(tmp_path) -> str:
+    with zipfile.ZipFile(os.path.join(get_test_data_path(), "template.zip")) as template:
+        template.extractall(tmp_path / "source")
+    return str(tmp_path / "source")
+
+
+@pytest.mark.auto
+def test_list_files(source_dir: str):
+    print()
+    logger.debug("test_list_files")
+
+    files = list_files(source_dir)
+    assert files == sorted(files)
+    assert "src/program.py" in files
+    assert "src/libs/utilities.py" in files
+    assert not any("__pycache__" in name or ".ipynb_checkpoints" in name for name in files)
+
+    with open(os.path.join(source_dir, ".planqkignore"), "w", encoding="utf-8") as f:
+        f.write("# local files\ninput/\n*.md\n")
+    files = list_files(source_dir)
+    assert not any(name.startswith("input/") or name.endswith(".md") for name in files)
+    assert ".planqkignore" not in files
+
+
+@pytest.mark.auto
+def test_package_user_code(source_dir: str, tmp_path):
+    print()
+    logger.debug("test_package_user_code")
+
+    cache_dir = str(tmp_path / "cache")
+    first = package_user_code(source_dir, output=str(tmp_path / "first.zip"), cache_dir=cache_dir, max_workers=4)
+    os.utime(os.path.join(source_dir, "src", "program.py"), (0, 0))
+    second = package_user_code(source_dir, output=str(tmp_path / "second.zip"), cache_dir=cache_dir, max_workers=1)
+    # timestamps and the number of workers do not change the archive
+    with open(first, "rb") as f, open(second, "rb") as g:
+        assert f.read() == g.read()
+    assert len(os.listdir(cache_dir)) == 1
+
+    with zipfile.ZipFile(first) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == list_files(source_dir)
+        with open(os.path.join(source_dir, "src", "program.py"), "rb") as f:
+            assert archive.read("src/program.py") == f.read()
+
+    with open(os.path.join(source_dir, "src", "program.py"), "a", encoding="utf-8") as f:
+        f.write("\n")
+    package_user_code(source_dir, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
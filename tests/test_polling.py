@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from pyplanqk.polling import PollScheduler
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.auto
+def test_default_step_without_history():
+    print()
+    logger.debug("test_default_step_without_history")
+
+    scheduler = PollScheduler()
+    assert scheduler.next_step("job", "service", 0, 1) == 1
+    assert scheduler.next_step("build", "service", 12, 5) == 5
+
+
+@pytest.mark.auto
+def test_sleep_until_expected_completion():
+    print()
+    logger.debug("test_sleep_until_expected_completion")
+
+    scheduler = PollScheduler(min_step=0.5, max_step=30)
+    for duration in [20, 21, 22, 23, 24]:
+        scheduler.observe("job", "service", duration)
+
+    assert scheduler.next_step("job", "service", 0, 1) == pytest.approx(20.4)
+    assert scheduler.next_step("job", "service", 21, 1) == 0.5
+    assert scheduler.next_step("job", "service", 27.6, 1) == pytest.approx(2)
+    assert scheduler.next_step("job", "service", 500, 1) == 30
+
+
+@pytest.mark.auto
+def test_fallback_to_other_services():
+    print()
+    logger.debug("test_fallback_to_other_services")
+
+    scheduler = PollScheduler(min_step=0.5)
+    scheduler.observe("build", "service", 100)
+    scheduler.seed("job", "other_service", [{"status": "SUCCEEDED", "total_time": 8}, {"status": "FAILED"}])
+
+    assert scheduler.next_step("build", "new_service", 40, 5) == 30
+    assert scheduler.next_step("job", "new_service", 2, 1) == 6
+    assert scheduler.get_durations("job", "other_service") == [8]
+
+
+@pytest.mark.auto
+def test_unnamed_durations_counted_once():
+    print()
+    logger.debug("test_unnamed_durations_counted_once")
+
+    scheduler = PollScheduler()
+    scheduler.observe("job", None, 3)
+    scheduler.observe("job", "service", 5)
+    assert scheduler.get_durations("job", None) == [3, 5]
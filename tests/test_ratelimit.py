@@ -0,0 +1,96 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import pytest
+
+from pyplanqk.local_platform import LocalPlatform
+from pyplanqk.metrics import get_counter, reset_metrics
+from pyplanqk.ratelimit import RateLimiter, TokenBucket, get_rate_class, use_rate_limiter
+from pyplanqk.transport import send
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {"X-Auth-Token": "api_key"}
+
+
+@pytest.mark.auto
+def test_get_rate_class():
+    print()
+    logger.debug("test_get_rate_class")
+
+    base = "https://platform.planqk.de/qc-catalog"
+    assert get_rate_class("POST", f"{base}/jobs") == "job_creation"
+    assert get_rate_class("POST", "https://gateway.platform.planqk.de/context/service/1.0.0") == "job_creation"
+    assert get_rate_class("GET", f"{base}/jobs/job_id") == "status_reads"
+    assert get_rate_class("GET", f"{base}/services/service_id/versions/version_id/status") == "status_reads"
+    assert get_rate_class("GET", f"{base}/services") == "listings"
+    assert get_rate_class("GET", f"{base}/services/service_id/versions/version_id/jobs") == "listings"
+    assert get_rate_class("POST", f"{base}/services") == "uploads"
+    assert get_rate_class("POST", f"{base}/data-pools/pool_id/data-source-descriptors") == "uploads"
+    assert get_rate_class("PUT", f"{base}/services/service_id/versions/version_id/source-code") == "uploads"
+    assert get_rate_class("PUT", f"{base}/jobs/job_id/cancel") == "uploads"
+    assert get_rate_class("POST", f"{base}/jobs/job_id/cancel") == "other"
+    assert get_rate_class("DELETE", f"{base}/jobs/job_id") == "other"
+
+
+@pytest.mark.auto
+def test_token_bucket_queues_callers():
+    print()
+    logger.debug("test_token_bucket_queues_callers")
+
+    now = [0.0]
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+    waits = [bucket.reserve() for _ in range(5)]
+    # the burst is free, every further caller waits one token longer than the one before
+    assert waits == pytest.approx([0, 0, 0.1, 0.2, 0.3])
+
+    now[0] = 10.0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1)
+
+
+@pytest.mark.auto
+def test_rate_limiter_limits_threads():
+    print()
+    logger.debug("test_rate_limiter_limits_threads")
+
+    reset_metrics()
+    with pytest.raises(ValueError):
+        RateLimiter({"downloads": (1, 1)})
+
+    limiter = RateLimiter({"listings": (20, 5)})
+    with LocalPlatform() as platform, use_rate_limiter(limiter):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # the get requests are not coalesced because of the different queries
+            futures = [
+                executor.submit(copy_context().run, send, "GET", f"{platform.url}/services?page={i}", headers=HEADERS)
+                for i in range(15)
+            ]
+            statuses = [future.result().status_code for future in futures]
+        duration = time.perf_counter() - start
+        assert statuses == [200] * 15
+        # 5 requests of the burst and 10 more at 20 per second
+        assert duration >= 0.45
+    # the requests of the burst are not delayed
+    assert 8 <= get_counter("rate_limited_requests", rate_class="listings") <= 10
+    assert get_counter("rate_limit_wait_seconds", rate_class="listings") >= 0.45
+
+    # classes without a limit are not limited
+    assert limiter.acquire("GET", "https://platform.planqk.de/qc-catalog/jobs/job_id") == 0
+
+
+@pytest.mark.auto
+def test_rate_limiter_shared_by_processes(tmp_path):
+    print()
+    logger.debug("test_rate_limiter_shared_by_processes")
+
+    first = RateLimiter({"job_creation": (10, 1)}, shared_directory=str(tmp_path))
+    second = RateLimiter({"job_creation": (10, 1)}, shared_directory=str(tmp_path))
+    assert first.buckets["job_creation"].reserve() == 0
+    # the second limiter takes its token from the same bucket file
+    assert second.buckets["job_creation"].reserve() == pytest.approx(0.1, abs=0.02)
+    assert (tmp_path / "job_creation.json").exists()
@@ -0,0 +1,78 @@
+import logging
+import time
+
+import pytest
+
+from pyplanqk.circuit import reset_circuit_breakers
+from pyplanqk.local_platform import LocalPlatform
+from pyplanqk.metrics import get_counter, reset_metrics
+from pyplanqk.retry import RetryPolicy, use_retry_policy
+from pyplanqk.transport import send
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {"X-Auth-Token": "api_key"}
+
+
+@pytest.mark.auto
+def test_retry_safe_request():
+    print()
+    logger.debug("test_retry_safe_request")
+
+    reset_metrics()
+    with LocalPlatform() as platform, use_retry_policy(RetryPolicy(backoff=0.01)):
+        platform.fail_next("get_services", status=502, count=2)
+        response = send("GET", f"{platform.url}/services", headers=HEADERS, timeout=30)
+        assert response.status_code == 200
+        assert platform.request_counts["get_services"] == 3
+    assert get_counter("retries", method="GET", reason="502") == 2
+
+
+@pytest.mark.auto
+def test_retry_post_only_if_not_processed():
+    print()
+    logger.debug("test_retry_post_only_if_not_processed")
+
+    with LocalPlatform() as platform, use_retry_policy(RetryPolicy(backoff=0.01)):
+        platform.fail_next("create_data_pool", status=502)
+        response = send("POST", f"{platform.url}/data-pools", json={"name": "data_pool"}, headers=HEADERS)
+        assert response.status_code == 502
+        assert platform.request_counts["create_data_pool"] == 1
+
+        platform.fail_next("create_data_pool", status=429, retry_after=0.2)
+        start = time.perf_counter()
+        response = send("POST", f"{platform.url}/data-pools", json={"name": "data_pool"}, headers=HEADERS)
+        assert response.status_code == 201
+        assert time.perf_counter() - start >= 0.2
+        assert platform.request_counts["create_data_pool"] == 3
+
+
+@pytest.mark.auto
+def test_retry_gives_up():
+    print()
+    logger.debug("test_retry_gives_up")
+
+    reset_metrics()
+    with LocalPlatform() as platform, use_retry_policy(RetryPolicy(max_attempts=3, backoff=0.01)):
+        platform.fail_next("get_services", status=503, count=5)
+        response = send("GET", f"{platform.url}/services", headers=HEADERS, timeout=30)
+        assert response.status_code == 503
+        assert platform.request_counts["get_services"] == 3
+    assert get_counter("retry_giveups") == 1
+
+    policy = RetryPolicy(max_attempts=2, backoff=0.01)
+    with use_retry_policy(policy), pytest.raises(Exception):
+        # nothing listens on port 9 of localhost
+        send("GET", "http://127.0.0.1:9/services", timeout=1)
+    assert get_counter("retries", method="GET", reason="ConnectionError") == 1
+    reset_circuit_breakers()
+
+
+@pytest.mark.auto
+def test_retry_after_is_capped():
+    print()
+    logger.debug("test_retry_after_is_capped")
+
+    policy = RetryPolicy(max_backoff=2)
+    assert policy.get_delay(1, retry_after=3600) == 2
+    assert policy.get_delay(1, retry_after=0.5) == 0.5
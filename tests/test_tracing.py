@@ -0,0 +1,130 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from pyplanqk.tracing import current_span, enable_opentelemetry, inject_trace_headers, profile, span, traced
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.auto
+def test_span_without_profile():
+    print()
+    logger.debug("test_span_without_profile")
+
+    with span("resolve_service", service_name="service") as current:
+        current.set_attribute("job_id", "id")
+
+
+@pytest.mark.auto
+def test_profile_writes_nested_chrome_trace(tmp_path):
+    print()
+    logger.debug("test_profile_writes_nested_chrome_trace")
+
+    @traced("PyPlanQK.execute_service")
+    def execute_service():
+        with span("submit", service_name="service") as submit:
+            submit.set_attribute("job_id", "id")
+        with span("poll", job_id="id") as poll:
+            poll.set_attribute("status", "SUCCEEDED")
+
+    path = tmp_path / "trace.json"
+    with profile(str(path)):
+        execute_service()
+        thread = threading.Thread(target=execute_service, name="worker")
+        thread.start()
+        thread.join()
+
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    thread_names = [event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"]
+    assert len(events) == 6
+    assert "worker" in thread_names
+
+    parent = next(event for event in events if event["name"] == "PyPlanQK.execute_service")
+    submit = next(event for event in events if event["name"] == "submit" and event["tid"] == parent["tid"])
+    assert parent["ts"] <= submit["ts"]
+    assert submit["ts"] + submit["dur"] <= parent["ts"] + parent["dur"]
+    assert submit["args"] == {"service_name": "service", "job_id": "id"}
+
+
+@pytest.mark.auto
+def test_spans_after_profile_are_not_recorded():
+    print()
+    logger.debug("test_spans_after_profile_are_not_recorded")
+
+    with profile() as recorder:
+        with span("poll"):
+            pass
+
+    with span("poll"):
+        pass
+
+    assert len(recorder.events) == 1
+
+
+@pytest.mark.auto
+def test_traced_captures_arguments():
+    print()
+    logger.debug("test_traced_captures_arguments")
+
+    @traced("get_service_job")
+    def get_service_job(job_id, api_key):
+        current_span().set_attribute("poll_count", 3)
+        return job_id
+
+    with profile() as recorder:
+        assert get_service_job("id", {"apiKey": "key"}) == "id"
+        assert get_service_job(job_id="other", api_key={"apiKey": "key"}) == "other"
+
+    assert [event["args"] for event in recorder.events] == [
+        {"job_id": "id", "poll_count": 3},
+        {"job_id": "other", "poll_count": 3},
+    ]
+
+
+@pytest.fixture
+def span_exporter():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    export = pytest.importorskip("opentelemetry.sdk.trace.export")
+    in_memory = pytest.importorskip("opentelemetry.sdk.trace.export.in_memory_span_exporter")
+
+    # the spans go to a local provider, the global tracer provider is left untouched
+    exporter = in_memory.InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(export.SimpleSpanProcessor(exporter))
+    enable_opentelemetry(True, tracer_provider=provider)
+    yield exporter
+    enable_opentelemetry(True)
+    provider.shutdown()
+
+
+@pytest.mark.auto
+def test_opentelemetry_spans(span_exporter):
+    print()
+    logger.debug("test_opentelemetry_spans")
+
+    exporter = span_exporter
+
+    @traced("trigger_service_job")
+    def trigger_service_job(service_name):
+        with span("serialize") as serialize:
+            serialize.set_attribute("payload_size", 42)
+        return inject_trace_headers({})
+
+    headers = trigger_service_job("service")
+    assert "traceparent" in headers
+
+    spans = {otel_span.name: otel_span for otel_span in exporter.get_finished_spans()}
+    assert spans["pyplanqk.trigger_service_job"].attributes["planqk.service_name"] == "service"
+    assert spans["pyplanqk.serialize"].attributes["planqk.payload_size"] == 42
+    assert spans["pyplanqk.serialize"].parent.span_id == spans["pyplanqk.trigger_service_job"].context.span_id
+
+    exporter.clear()
+    enable_opentelemetry(False)
+    assert trigger_service_job("service") == {}
+    assert len(exporter.get_finished_spans()) == 0
@@ -0,0 +1,95 @@
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from pyplanqk.local_platform import LocalPlatform
+from pyplanqk.transport import RestClient, record, replay, send
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.auto
+def test_record_and_replay(tmp_path):
+    print()
+    logger.debug("test_record_and_replay")
+
+    cassette = str(tmp_path / "cassette.json")
+    with LocalPlatform(latency=0.05) as platform:
+        with record(cassette) as recording:
+            response = send("POST", f"{platform.url}/data-pools", json={"name": "data_pool"}, timeout=30)
+            assert response.status_code == 201
+            response = send("GET", f"{platform.url}/data-pools", params={"page": 0}, timeout=30)
+            assert response.status_code == 200
+        assert len(recording.exchanges) == 2
+
+    with replay(cassette, speed=None) as replaying:
+        response = send("POST", "http://unused/data-pools", json={"name": "data_pool"})
+        assert response.json()["name"] == "data_pool"
+        response = send("GET", "http://unused/data-pools", params={"page": 0})
+        assert response.json()["content"][0]["name"] == "data_pool"
+        assert replaying.remaining() == 0
+
+    with replay(cassette, speed=1.0):
+        start = time.perf_counter()
+        send("POST", "http://unused/data-pools", json={"name": "data_pool"})
+        assert time.perf_counter() - start >= 0.05
+
+    with replay(cassette, speed=None):
+        with pytest.raises(Exception):
+            send("DELETE", "http://unused/data-pools/unknown")
+
+
+@pytest.mark.auto
+def test_rest_client():
+    print()
+    logger.debug("test_rest_client")
+
+    rest_client = RestClient()
+    with LocalPlatform() as platform:
+        response = rest_client.POST(
+            f"{platform.url}/applications",
+            headers={"Content-Type": "application/json", "X-Auth-Token": "api_key"},
+            body={"name": "application"},
+        )
+        assert response.status == 201
+        assert response.getheader("content-type").startswith("application/json")
+
+        response = rest_client.GET(f"{platform.url}/applications", headers={"X-Auth-Token": "api_key"})
+        assert b"application" in response.data
+
+
+@pytest.mark.auto
+def test_rest_client_configuration():
+    print()
+    logger.debug("test_rest_client_configuration")
+
+    configuration = SimpleNamespace(verify_ssl=True, ssl_ca_cert="ca.pem", proxy="http://proxy:3128")
+    rest_client = RestClient(configuration)
+    assert rest_client.options == {
+        "verify": "ca.pem",
+        "proxies": {"http": "http://proxy:3128", "https": "http://proxy:3128"},
+    }
+    assert RestClient(SimpleNamespace(verify_ssl=False, ssl_ca_cert="ca.pem", proxy=None)).options == {"verify": False}
+
+
+@pytest.mark.auto
+def test_record_redacts_credentials(tmp_path):
+    print()
+    logger.debug("test_record_redacts_credentials")
+
+    cassette = str(tmp_path / "cassette.json")
+    with LocalPlatform() as platform:
+        with record(cassette):
+            response = send("POST", f"{platform.url}/token", json={"grant_type": "client_credentials"}, timeout=30)
+            token = response.json()["access_token"]
+
+    with open(cassette, encoding="utf-8") as f:
+        content = f.read()
+    assert token not in content
+
+    with replay(cassette, speed=None):
+        response = send("POST", "http://unused/token", json={"grant_type": "client_credentials"})
+        assert response.json()["access_token"] == "REDACTED"
+        assert response.json()["token_type"] == "Bearer"
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import pytest
+
+from pyplanqk.metrics import get_counter, reset_metrics
+from pyplanqk.warming import WarmKeeper, get_idle_delays, learn_cold_start_threshold
+
+logger = logging.getLogger(__name__)
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_timings(idle_times: List[float], cold_after: float) -> List[Dict[str, Any]]:
+    timings = []
+    created_at = START
+    for i, idle in enumerate([0.0] + idle_times):
+        created_at = created_at + timedelta(seconds=idle)
+        queue_wait = 60.0 if idle >= cold_after else 2.0
+        started_at = created_at + timedelta(seconds=queue_wait)
+        ended_at = started_at + timedelta(seconds=5)
+        timings.append(
+            {
+                "id": str(i),
+                "status": "SUCCEEDED",
+                "created_at": created_at,
+                "started_at": started_at,
+                "ended_at": ended_at,
+                "queue_wait": queue_wait,
+                "run_time": 5.0,
+            }
+        )
+        created_at = ended_at
+    return timings
+
+
+@pytest.mark.auto
+def test_learn_cold_start_threshold():
+    print()
+    logger.debug("test_learn_cold_start_threshold")
+
+    timings = make_timings([10, 900, 30, 1200, 60, 20, 1800, 120, 600], cold_after=600)
+    samples = get_idle_delays(timings)
+    assert len(samples) == 9
+    assert samples[0] == (10, 2.0)
+    assert learn_cold_start_threshold(timings) == 600
+
+    # without cold starts or with too few jobs there is no threshold
+    assert learn_cold_start_threshold(make_timings([10, 900, 30, 1200, 60, 20], cold_after=10000)) is None
+    assert learn_cold_start_threshold(timings[:4]) is None
+
+
+@pytest.mark.auto
+def test_warm_keeper():
+    print()
+    logger.debug("test_warm_keeper")
+
+    reset_metrics()
+    now = [START.timestamp() + 100000]
+    timings = make_timings([10, 900, 30, 1200, 60, 20, 1800, 120, 600], cold_after=600)
+    pings = []
+
+    def ping(service_name: str, data: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        pings.append((service_name, params))
+        return {"run_time": 0.5, "queue_wait": 1.0}
+
+    keeper = WarmKeeper(ping, lambda service_name: timings, default_interval=300, clock=lambda: now[0])
+    keeper.add("service", {"mode": "ping"})
+    assert keeper.get_interval("service") == 300
+
+    # the learned threshold sets the interval, the service was idle since its last job
+    assert keeper.run_pending() == ["service"]
+    assert keeper.get_interval("service") == 600 * 0.8
+    assert pings == [("service", {"mode": "ping"})]
+
+    now[0] += 100
+    assert keeper.run_pending() == []
+    now[0] += 400
+    keeper.record_activity("service")
+    now[0] += 400
+    assert keeper.run_pending() == []
+    now[0] += 100
+    assert keeper.run_pending() == ["service"]
+
+    report = keeper.report()["service"]
+    assert report["pings"] == 2
+    assert report["ping_run_time"] == 1.0
+    assert report["cold_start_threshold"] == 600
+    assert get_counter("warm_pings", service_name="service") == 2
+
+    keeper.remove("service")
+    assert keeper.report() == {}
+
+
+@pytest.mark.auto
+def test_warm_keeper_thread():
+    print()
+    logger.debug("test_warm_keeper_thread")
+
+    pinged = threading.Event()
+
+    def ping(service_name: str, data: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        pinged.set()
+        return {"run_time": 0.1, "queue_wait": 0.1}
+
+    keeper = WarmKeeper(ping, lambda service_name: [], min_interval=0)
+    keeper.add("service", {}, interval=0)
+    keeper.start(check_interval=0.01)
+    assert pinged.wait(5)
+    keeper.stop()
+    assert keeper.thread is None
+
+
+@pytest.mark.auto
+def test_warm_keeper_stop_does_not_wait_for_ping():
+    print()
+    logger.debug("test_warm_keeper_stop_does_not_wait_for_ping")
+
+    pinging = threading.Event()
+    release = threading.Event()
+    pinged = []
+
+    def ping(service_name: str, data: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        pinged.append(service_name)
+        pinging.set()
+        release.wait(10)
+        return {"run_time": 0.1, "queue_wait": 0.1}
+
+    keeper = WarmKeeper(ping, lambda service_name: [], min_interval=0)
+    keeper.add("service", {}, interval=0)
+    keeper.add("other", {}, interval=0)
+    keeper.start(check_interval=0.01)
+    assert pinging.wait(5)
+    thread = keeper.thread
+
+    start = time.time()
+    keeper.stop(timeout=0.1)
+    assert time.time() - start < 1
+    assert keeper.thread is None
+
+    # the thread ends after the running ping without pinging the other service
+    release.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(pinged) == 1
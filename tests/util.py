@@ -2,6 +2,7 @@ import numpy as np
 from pyplanqk.helpers import get_path_delimiter
 
 from pyplanqk.low_level_actions import *
+from pyplanqk.teardown import teardown
 
 logger = logging.getLogger(__name__)
 
@@ -13,22 +14,10 @@ def cleanup_services_and_applications(
 ):
     print()
     logger.info("cleanup_services_and_applications")
-    for application in applications:
-        application_name = application["name"]
-        subscriptions = get_all_subscriptions(application_name, api_key)
-
-        for _ in subscriptions:
-            remove_subscription(application_name, api_key)
-
-        remove_application(application_name, api_key)
-        logger.info(f"remove_application: {application_name}")
-
-    for service in services:
-        service_name = service["name"]
-        unpublish_service(service_name, api_key)
-        logger.info(f"unpublish_service: {service_name}")
-        remove_service(service_name, api_key)
-        logger.info(f"remove_service: {service_name}")
+    removed = teardown(api_key, services=services, applications=applications)
+    logger.info(f"teardown: {removed}")
+    failed = [f"{kind}: {name}" for kind, results in removed.items() for name, ok in results.items() if not ok]
+    assert len(failed) == 0, f"teardown failed for {failed}"
 
 
 def label_data(x):